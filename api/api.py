@@ -1,15 +1,172 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
-from elasticsearch import Elasticsearch
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from elasticsearch import AsyncElasticsearch, ConnectionTimeout, NotFoundError
+from elasticsearch import ConnectionError as ESConnectionError
 from typing import Optional
+import asyncio
+import json
+import os
 import uvicorn
+from pathlib import Path
 
-app = FastAPI()
+from api.embedded import EmbeddedMatcher
+from api.export import COMPANY_FIELDS, EXPORT_FORMATS, MATCH_FIELDS, ExportFilter, export_stream, \
+    iter_index_pages, iter_profile_pages, match_row
+from api.identifier_index import IdentifierIndex
+from api.match_cache import MatchCache, cache_key
+from indexing.mapping import generation_of
+from observability.metrics import CONTENT_TYPE, REGISTRY
+from indexing.normalize import normalize_domain, normalize_phone, facebook_handle
 
-# Elasticsearch connection
-es = Elasticsearch("http://localhost:9200")
+ES_URL = os.getenv("ES_URL", "http://localhost:9200")
+# "elasticsearch", or "embedded" to match in-process from data/merged_companies.json with no cluster at all
+MATCH_BACKEND = os.getenv("MATCH_BACKEND", "elasticsearch")
 index_name = "companies"
 
+# Connection pool and timeouts for the Elasticsearch client
+ES_CONNECTIONS_PER_NODE = 64
+ES_REQUEST_TIMEOUT = 10
+SEARCH_TIMEOUT = 2
+# Records per _msearch request in /match_company/batch, and the timeout for one such request
+MSEARCH_CHUNK = 200
+MSEARCH_TIMEOUT = 30
+WARMUP_ATTEMPTS = 5
+
+# Exact website/phone/facebook hits are answered in-process from this file ("es" scrolls the index
+# instead, "off" disables it); the file is checked for changes every IDENTIFIER_RELOAD_INTERVAL seconds
+IDENTIFIER_SOURCE = os.getenv(
+    "IDENTIFIER_SOURCE", str(Path(__file__).resolve().parent.parent / "data" / "merged_companies.json"))
+IDENTIFIER_RELOAD_INTERVAL = 30
+# How often the index generation is checked; a reindex by indexing/store.py empties the match cache
+GENERATION_POLL_INTERVAL = 10
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "api_request_seconds", "Total handling time per request, by endpoint and query shape", ("endpoint", "shape"))
+ES_QUERY_SECONDS = REGISTRY.histogram(
+    "api_es_query_seconds", "Time spent waiting on Elasticsearch, by endpoint and query shape", ("endpoint", "shape"))
+MATCH_SOURCE = REGISTRY.counter(
+    "api_match_source_total", "Which layer answered a lookup: cache, identifier_index, embedded, elasticsearch, empty",
+    ("source",))
+REQUEST_ERRORS = REGISTRY.counter("api_request_errors_total", "Lookups that failed, by endpoint", ("endpoint",))
+REQUESTS_IN_FLIGHT = REGISTRY.gauge("api_requests_in_flight", "Match requests being handled")
+CACHE_ENTRIES = REGISTRY.gauge("api_match_cache_entries", "Entries in the match cache")
+CACHE_ENTRIES.set_function(lambda: len(match_cache) if match_cache is not None else 0)
+
+# Created in lifespan(), so the client lives on the server's event loop
+es: AsyncElasticsearch | None = None
+identifier_index: IdentifierIndex | None = None
+match_cache: MatchCache | None = None
+embedded: EmbeddedMatcher | None = None
+
+
+async def _warm_up() -> bool:
+    """Wait for the cluster and run one query, so the first real request finds warm connections and caches.
+
+    Only an unreachable cluster is waited for; a missing index or any other error will not fix
+    itself in seconds, so the app starts straight away.
+    """
+    for attempt in range(WARMUP_ATTEMPTS):
+        try:
+            await es.cluster.health(wait_for_status="yellow", timeout="5s")
+            await es.search(index=index_name, size=0, query={"match_all": {}})
+            return True
+        except NotFoundError:
+            # The cluster answered; there is just nothing to warm until the index is built
+            print(f"[WARN] Index {index_name} does not exist yet; skipping warm-up")
+            return True
+        except (ESConnectionError, ConnectionTimeout) as e:
+            print(f"[WARN] Elasticsearch not ready ({type(e).__name__}: {e}), attempt {attempt + 1}/{WARMUP_ATTEMPTS}")
+            await asyncio.sleep(min(2 ** attempt, 10))
+        except Exception as e:
+            print(f"[WARN] Warm-up failed ({type(e).__name__}: {e}); skipping it")
+            return False
+    return False
+
+
+async def _load_identifier_index() -> IdentifierIndex | None:
+    if IDENTIFIER_SOURCE == "off":
+        return None
+    try:
+        if IDENTIFIER_SOURCE == "es":
+            index = IdentifierIndex()
+            await index.load_from_es(es, index_name)
+        else:
+            index = await asyncio.to_thread(IdentifierIndex, Path(IDENTIFIER_SOURCE))
+    except Exception as e:
+        print(f"[WARN] Identifier index unavailable ({type(e).__name__}: {e}); every lookup goes to Elasticsearch")
+        return None
+    print(f"🔑 Identifier index: {len(index)} companies")
+    return index
+
+
+async def _watch_identifier_source(index: IdentifierIndex):
+    while True:
+        await asyncio.sleep(IDENTIFIER_RELOAD_INTERVAL)
+        try:
+            if await asyncio.to_thread(index.reload_if_changed):
+                # Cached answers may come from the old file; cleared here, on the loop, not in the reload thread
+                if match_cache is not None:
+                    match_cache.invalidate()
+                print(f"🔑 Identifier index reloaded: {len(index)} companies; match cache cleared")
+        except Exception as e:
+            print(f"[WARN] Identifier index reload failed, keeping the previous one: {type(e).__name__}: {e}")
+
+
+async def _check_generation():
+    try:
+        mapping = await es.options(request_timeout=SEARCH_TIMEOUT).indices.get_mapping(index=index_name)
+    except Exception as e:
+        print(f"[WARN] Could not read the index generation: {type(e).__name__}: {e}")
+        return
+    if match_cache.set_generation(generation_of(mapping)):
+        print(f"🔄 Index generation {match_cache.generation}; match cache cleared")
+
+
+async def _watch_generation():
+    while True:
+        await asyncio.sleep(GENERATION_POLL_INTERVAL)
+        await _check_generation()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global es, identifier_index, match_cache, embedded
+    match_cache = MatchCache()
+    watchers = []
+    if MATCH_BACKEND == "embedded":
+        embedded = await asyncio.to_thread(EmbeddedMatcher.load_or_build)
+        print(f"🧩 Embedded matcher: {len(embedded)} companies")
+        app.state.ready = True
+    else:
+        es = AsyncElasticsearch(
+            ES_URL,
+            connections_per_node=ES_CONNECTIONS_PER_NODE,
+            request_timeout=ES_REQUEST_TIMEOUT,
+            retry_on_timeout=True,
+            max_retries=2,
+        )
+        app.state.ready = await _warm_up()
+        if not app.state.ready:
+            print("[WARN] Starting without a ready Elasticsearch; /health reports 503 until it answers.")
+        await _check_generation()
+        watchers.append(asyncio.create_task(_watch_generation()))
+    identifier_index = await _load_identifier_index()
+    if identifier_index is not None and identifier_index.path is not None:
+        watchers.append(asyncio.create_task(_watch_identifier_source(identifier_index)))
+    try:
+        yield
+    finally:
+        for watcher in watchers:
+            watcher.cancel()
+        if es is not None:
+            await es.close()
+        es = identifier_index = match_cache = embedded = None
+
+
+app = FastAPI(lifespan=lifespan)
+
 
 # Input schema
 class CompanyInput(BaseModel):
@@ -19,21 +176,17 @@ class CompanyInput(BaseModel):
     facebook: Optional[str] = None
 
 
-@app.post("/match_company")
-def match_company(data: CompanyInput):
-    query = {
-        "size": 1,
-        "query": {
-            "bool": {
-                "should": [],
-                "minimum_should_match": 1
-            }
-        }
-    }
+def _exact(field: str, value: str, boost: float) -> dict:
+    # Keyword term inside a filter: no analysis, no scoring work, and cacheable by ES
+    return {"constant_score": {"filter": {"term": {field: value}}, "boost": boost}}
+
+
+def build_query(data: CompanyInput) -> dict:
+    should = []
 
-    # Weighted fuzzy match on name
+    # Weighted fuzzy match on name, plus a prefix match for partially typed names
     if data.name:
-        query["query"]["bool"]["should"].append({
+        should.append({
             "match": {
                 "company_commercial_name": {
                     "query": data.name,
@@ -42,7 +195,7 @@ def match_company(data: CompanyInput):
                 }
             }
         })
-        query["query"]["bool"]["should"].append({
+        should.append({
             "match": {
                 "company_all_available_names": {
                     "query": data.name,
@@ -51,42 +204,111 @@ def match_company(data: CompanyInput):
                 }
             }
         })
-
-    # Match on website
-    if data.website:
-        query["query"]["bool"]["should"].append({
-            "match": {
-                "domain": {
-                    "query": data.website.replace("https://", "").replace("http://", "").replace("www.", ""),
-                    "boost": 4
-                }
+        should.append({
+            "multi_match": {
+                "query": data.name,
+                "type": "bool_prefix",
+                "fields": [
+                    "company_commercial_name.prefix",
+                    "company_commercial_name.prefix._2gram",
+                    "company_commercial_name.prefix._3gram"
+                ],
+                "boost": 1
             }
         })
 
-    # Match on phone number
-    if data.phone:
-        query["query"]["bool"]["should"].append({
-            "match": {
-                "phone_numbers": {
-                    "query": data.phone.replace("(", "").replace(")", "").replace("-", "").replace(" ", ""),
-                    "boost": 5
-                }
-            }
-        })
+    # Exact matches on the normalized keys
+    domain = normalize_domain(data.website)
+    if domain:
+        should.append(_exact("domain_key", domain, 4))
+        should.append(_exact("domain_aliases", domain, 4))
 
-    # Match on facebook in social_links
-    if data.facebook:
-        query["query"]["bool"]["should"].append({
-            "match": {
-                "social_links": {
-                    "query": data.facebook,
-                    "boost": 2
-                }
+    phone = normalize_phone(data.phone)
+    if phone:
+        should.append(_exact("phone_digits", phone, 5))
+
+    handle = facebook_handle(data.facebook)
+    if handle:
+        should.append(_exact("facebook_handles", handle, 2))
+
+    return {
+        "size": 1,
+        "query": {
+            "bool": {
+                "should": should,
+                "minimum_should_match": 1
             }
-        })
+        }
+    }
+
+
+@app.get("/health")
+async def health():
+    if embedded is not None:
+        return {"ready": True}
+    try:
+        await es.options(request_timeout=SEARCH_TIMEOUT).cluster.health()
+        app.state.ready = True
+    except Exception:
+        app.state.ready = False
+    if not app.state.ready:
+        return JSONResponse({"ready": False}, status_code=503)
+    return {"ready": True}
+
+
+@app.get("/metrics")
+async def metrics():
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/stats")
+async def stats():
+    return {
+        "backend": MATCH_BACKEND,
+        "identifier_index": identifier_index.summary() if identifier_index is not None else None,
+        "match_cache": match_cache.summary() if match_cache is not None else None,
+    }
+
+
+def _cache_key(data: CompanyInput, endpoint: str) -> tuple:
+    # Batch lines carry a score, single responses do not, so each endpoint keeps its own entries
+    return (endpoint, *cache_key(data.name, data.website, data.phone, data.facebook))
+
+
+def query_shape(data: CompanyInput) -> str:
+    """Which fields a lookup carries, e.g. 'name+phone'; the label for per-shape latency."""
+    fields = [field for field in ("name", "website", "phone", "facebook") if getattr(data, field)]
+    return "+".join(fields) or "empty"
+
+
+def _exact_hit(data: CompanyInput) -> dict | None:
+    """Profile from the in-process identifier index; names are fuzzy, so name-only input always goes to ES."""
+    if identifier_index is None:
+        return None
+    return identifier_index.lookup(data.website, data.phone, data.facebook)
+
+
+async def _match(data: CompanyInput, shape: str) -> dict:
+    profile = _exact_hit(data)
+    if profile is not None:
+        MATCH_SOURCE.inc(source="identifier_index")
+        return {"match_found": True, "company_profile": profile}
+
+    if embedded is not None:
+        MATCH_SOURCE.inc(source="embedded")
+        best = embedded.match(data.name, data.website, data.phone, data.facebook)
+        return {"match_found": best is not None, "company_profile": best[1] if best else None}
+
+    query = build_query(data)
+    if not query["query"]["bool"]["should"]:
+        # Nothing usable to match on (e.g. an empty body or a phone with no digits)
+        MATCH_SOURCE.inc(source="empty")
+        return {"match_found": False, "company_profile": None}
 
     # Search in Elasticsearch
-    res = es.search(index=index_name, body=query)
+    MATCH_SOURCE.inc(source="elasticsearch")
+    with ES_QUERY_SECONDS.time(endpoint="match_company", shape=shape):
+        res = await es.options(request_timeout=SEARCH_TIMEOUT).search(index=index_name, body=query)
 
     # Return the best matching company or no match found
     if res["hits"]["hits"]:
@@ -95,5 +317,179 @@ def match_company(data: CompanyInput):
         return {"match_found": False, "company_profile": None}
 
 
+@app.post("/match_company")
+async def match_company(data: CompanyInput):
+    shape = query_shape(data)
+    with REQUESTS_IN_FLIGHT.track_inprogress(), REQUEST_SECONDS.time(endpoint="match_company", shape=shape):
+        try:
+            if match_cache is None:
+                return await _match(data, shape)
+            key = _cache_key(data, "single")
+            result = match_cache.get(key)
+            if result is not None:
+                MATCH_SOURCE.inc(source="cache")
+            else:
+                result = await _match(data, shape)
+                match_cache.put(key, result)
+            return result
+        except Exception:
+            REQUEST_ERRORS.inc(endpoint="match_company")
+            raise
+
+
+def _parse_batch(body: bytes, content_type: str) -> list[CompanyInput | str]:
+    """Records from a JSON array or NDJSON body; a record that fails to parse or validate becomes its error message.
+
+    NDJSON lines are parsed one by one, so a malformed line only fails its own record. A body
+    that is not UTF-8, or a JSON array that does not parse as a whole, is a 400.
+    """
+    try:
+        text = body.decode("utf-8")
+    except UnicodeDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Body is not UTF-8: {e}")
+
+    if "ndjson" in content_type or not text.lstrip().startswith("["):
+        records = []
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(_validate_record(json.loads(line)))
+            except json.JSONDecodeError as e:
+                records.append(f"Invalid JSON: {e}")
+        return records
+    try:
+        raw_records = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+    return [_validate_record(raw) for raw in raw_records]
+
+
+def _validate_record(raw) -> CompanyInput | str:
+    try:
+        return CompanyInput.model_validate(raw)
+    except ValidationError as e:
+        return str(e)
+
+
+def _batch_result(response: dict) -> dict:
+    if "error" in response:
+        return {"error": response["error"].get("reason", str(response["error"]))}
+    hits = response["hits"]["hits"]
+    if hits:
+        return {"match_found": True, "score": hits[0]["_score"], "company_profile": hits[0]["_source"]}
+    return {"match_found": False, "score": None, "company_profile": None}
+
+
+async def _match_chunk(records: list[CompanyInput | str]) -> list[dict]:
+    """One _msearch for a chunk of records; failures stay confined to their own record."""
+    results: list[dict | None] = [None] * len(records)
+    searches, positions = [], []
+    for offset, record in enumerate(records):
+        if isinstance(record, str):
+            results[offset] = {"error": record}
+            continue
+        if match_cache is not None:
+            cached = match_cache.get(_cache_key(record, "batch"))
+            if cached is not None:
+                MATCH_SOURCE.inc(source="cache")
+                results[offset] = cached
+                continue
+        profile = _exact_hit(record)
+        if profile is not None:
+            MATCH_SOURCE.inc(source="identifier_index")
+            # No ES score for an in-process hit
+            results[offset] = {"match_found": True, "score": None, "company_profile": profile}
+            continue
+        if embedded is not None:
+            MATCH_SOURCE.inc(source="embedded")
+            best = embedded.match(record.name, record.website, record.phone, record.facebook)
+            results[offset] = {"match_found": best is not None, "score": best[0] if best else None,
+                               "company_profile": best[1] if best else None}
+            continue
+        query = build_query(record)
+        if not query["query"]["bool"]["should"]:
+            MATCH_SOURCE.inc(source="empty")
+            results[offset] = {"match_found": False, "score": None, "company_profile": None}
+            continue
+        searches.extend([{"index": index_name}, query])
+        positions.append(offset)
+
+    if searches:
+        MATCH_SOURCE.inc(len(positions), source="elasticsearch")
+        try:
+            with ES_QUERY_SECONDS.time(endpoint="batch", shape="msearch"):
+                res = await es.options(request_timeout=MSEARCH_TIMEOUT).msearch(searches=searches)
+            for offset, response in zip(positions, res["responses"]):
+                results[offset] = _batch_result(response)
+                if match_cache is not None and "error" not in results[offset]:
+                    match_cache.put(_cache_key(records[offset], "batch"), results[offset])
+        except Exception as e:
+            REQUEST_ERRORS.inc(endpoint="batch")
+            for offset in positions:
+                results[offset] = {"error": f"{type(e).__name__}: {e}"}
+    return results
+
+
+async def _batch_pages(records: list[CompanyInput | str], flatten: bool):
+    with REQUESTS_IN_FLIGHT.track_inprogress(), REQUEST_SECONDS.time(endpoint="batch", shape="batch"):
+        for start in range(0, len(records), MSEARCH_CHUNK):
+            results = await _match_chunk(records[start:start + MSEARCH_CHUNK])
+            lines = [{"index": start + offset, **result} for offset, result in enumerate(results)]
+            yield [match_row(line) for line in lines] if flatten else lines
+
+
+def _check_format(fmt: str):
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format {fmt!r}; use one of {sorted(EXPORT_FORMATS)}")
+
+
+def _export_response(chunks, fmt: str, compress: bool, filename: str) -> StreamingResponse:
+    if compress:
+        return StreamingResponse(chunks, media_type="application/gzip",
+                                 headers={"content-disposition": f'attachment; filename="{filename}.{fmt}.gz"'})
+    return StreamingResponse(chunks, media_type=EXPORT_FORMATS[fmt])
+
+
+@app.post("/match_company/batch")
+async def match_company_batch(request: Request, format: str = "ndjson", gzip: bool = False):
+    """Match many records (JSON array or NDJSON); streams one line per record, in input order.
+
+    `format=csv` flattens each result into status columns plus the profile's fields;
+    `gzip=true` compresses the stream as it goes.
+    """
+    _check_format(format)
+    records = _parse_batch(await request.body(), request.headers.get("content-type", ""))
+    pages = _batch_pages(records, flatten=format == "csv")
+    return _export_response(export_stream(pages, format, MATCH_FIELDS, gzip), format, gzip, "matches")
+
+
+async def _tracked_export(chunks):
+    with REQUEST_SECONDS.time(endpoint="export", shape="export"):
+        try:
+            async for chunk in chunks:
+                yield chunk
+        except Exception as e:
+            # Headers are long gone: log it and cut the stream, so the client sees an incomplete download
+            REQUEST_ERRORS.inc(endpoint="export")
+            print(f"[WARN] Export aborted: {type(e).__name__}: {e}")
+            raise
+
+
+@app.get("/export")
+async def export(format: str = "ndjson", gzip: bool = False, name: Optional[str] = None,
+                 domain: Optional[str] = None, phone: Optional[str] = None, facebook: Optional[str] = None,
+                 has_phone: bool = False, has_address: bool = False):
+    """Stream every company matching the filters, page by page from a point-in-time snapshot."""
+    _check_format(format)
+    export_filter = ExportFilter(name, domain, phone, facebook, has_phone, has_address)
+    if embedded is not None:
+        pages = iter_profile_pages(embedded.profiles, export_filter)
+    else:
+        pages = iter_index_pages(es, index_name, export_filter.query())
+    chunks = export_stream(pages, format, COMPANY_FIELDS, gzip)
+    return _export_response(_tracked_export(chunks), format, gzip, "companies")
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,244 @@
+import argparse
+import json
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+
+from indexing.normalize import key_fields, normalize_domain, normalize_phone, facebook_handle
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+MERGED = BASE_DIR / "data" / "merged_companies.json"
+INDEX_FILE = BASE_DIR / "data" / "embedded_index.npz"
+
+# Same weights as build_query() in api.api
+NAME_BOOST = 3
+PREFIX_BOOST = 1
+DOMAIN_BOOST = 4
+PHONE_BOOST = 5
+FACEBOOK_BOOST = 2
+# Trigram (Dice) similarity below which a name clause counts as not matching, the way a
+# fuzzy ES match clause contributes nothing when no term is close enough
+MIN_NAME_SIMILARITY = 0.3
+# Bumped whenever the saved layout changes, so an old file is rebuilt instead of misread
+FORMAT_VERSION = 1
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize_name(name: str | None) -> str:
+    return _NON_WORD.sub(" ", (name or "").lower()).strip()
+
+
+def trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)} if text else set()
+
+
+class _TrigramField:
+    """Character-trigram inverted index over name rows (a company may have several rows).
+
+    Postings are CSR-style: the rows containing trigram t are rows[indptr[t]:indptr[t + 1]].
+    """
+
+    def __init__(self, vocab: dict[str, int], indptr: np.ndarray, rows: np.ndarray, row_doc: np.ndarray,
+                 row_size: np.ndarray, n_docs: int):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.rows = rows
+        self.row_doc = row_doc
+        self.row_size = row_size
+        self.n_docs = n_docs
+
+    @classmethod
+    def build(cls, names: list[tuple[int, str]], n_docs: int) -> "_TrigramField":
+        vocab: dict[str, int] = {}
+        pairs = []
+        row_doc, row_size = [], []
+        for row, (doc, name) in enumerate(names):
+            grams = trigrams(name)
+            row_doc.append(doc)
+            row_size.append(len(grams))
+            pairs.extend((vocab.setdefault(gram, len(vocab)), row) for gram in grams)
+        pairs = np.array(pairs, dtype=np.int32).reshape(-1, 2)
+        pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int32)
+        np.cumsum(np.bincount(pairs[:, 0], minlength=len(vocab)), out=indptr[1:])
+        return cls(vocab, indptr, pairs[:, 1].copy(), np.array(row_doc, dtype=np.int32),
+                   np.array(row_size, dtype=np.int32), n_docs)
+
+    def similarity(self, query: str) -> np.ndarray:
+        """Best Dice similarity of `query` against each company's rows (0 for none above the threshold)."""
+        best = np.zeros(self.n_docs, dtype=np.float32)
+        grams = trigrams(query)
+        ids = [self.vocab[gram] for gram in grams if gram in self.vocab]
+        if not ids:
+            return best
+        hits = np.concatenate([self.rows[self.indptr[t]:self.indptr[t + 1]] for t in ids])
+        common = np.bincount(hits, minlength=len(self.row_doc)).astype(np.float32)
+        dice = 2 * common / (len(grams) + self.row_size)
+        dice[dice < MIN_NAME_SIMILARITY] = 0
+        np.maximum.at(best, self.row_doc, dice)
+        return best
+
+    def arrays(self, prefix: str) -> dict[str, np.ndarray]:
+        vocab = np.empty(len(self.vocab), dtype="<U3")
+        for gram, i in self.vocab.items():
+            vocab[i] = gram
+        return {f"{prefix}vocab": vocab, f"{prefix}indptr": self.indptr, f"{prefix}rows": self.rows,
+                f"{prefix}row_doc": self.row_doc, f"{prefix}row_size": self.row_size}
+
+    @classmethod
+    def from_arrays(cls, data, prefix: str, n_docs: int) -> "_TrigramField":
+        vocab = {gram: i for i, gram in enumerate(data[f"{prefix}vocab"].tolist())}
+        return cls(vocab, data[f"{prefix}indptr"], data[f"{prefix}rows"], data[f"{prefix}row_doc"],
+                   data[f"{prefix}row_size"], n_docs)
+
+
+def _exact_index(keys: np.ndarray, docs: np.ndarray) -> dict[str, list[int]]:
+    index: dict[str, list[int]] = {}
+    for key, doc in zip(keys.tolist(), docs.tolist()):
+        index.setdefault(key, []).append(doc)
+    return index
+
+
+class EmbeddedMatcher:
+    """Elasticsearch-free matcher over merged_companies.json, scored like build_query().
+
+    Fuzzy name clauses become trigram similarity (times NAME_BOOST) against the commercial
+    name and against every available name; the bool_prefix clause becomes a prefix test on
+    the commercial name; exact keys add their constant boosts. The best total score wins.
+    """
+
+    def __init__(self, profiles: list[bytes], commercial: _TrigramField, all_names: _TrigramField,
+                 prefixes: np.ndarray, exact: dict[str, tuple[np.ndarray, np.ndarray]]):
+        self.profiles = profiles
+        self.commercial = commercial
+        self.all_names = all_names
+        self.prefixes = prefixes
+        self._exact_arrays = exact
+        self.domains = _exact_index(*exact["domain"])
+        self.phones = _exact_index(*exact["phone"])
+        self.facebook = _exact_index(*exact["facebook"])
+
+    def __len__(self) -> int:
+        return len(self.profiles)
+
+    @classmethod
+    def build(cls, docs) -> "EmbeddedMatcher":
+        profiles, commercial, all_names, prefixes = [], [], [], []
+        exact = {"domain": ([], []), "phone": ([], []), "facebook": ([], [])}
+        for doc in docs:
+            if not doc.get("domain"):
+                continue
+            position = len(profiles)
+            profiles.append(json.dumps(doc, separators=(",", ":")).encode())
+            name = normalize_name(doc.get("company_commercial_name"))
+            prefixes.append(name)
+            if name:
+                commercial.append((position, name))
+            for variant in (doc.get("company_all_available_names") or "").split("|"):
+                if normalize_name(variant):
+                    all_names.append((position, normalize_name(variant)))
+            keys = doc if "domain_key" in doc else key_fields(doc)
+            domains = [keys["domain_key"], *(doc.get("domain_aliases") or [])]
+            for kind, values in (("domain", domains), ("phone", keys["phone_digits"]),
+                                 ("facebook", keys["facebook_handles"])):
+                for value in values:
+                    if value:
+                        exact[kind][0].append(value)
+                        exact[kind][1].append(position)
+
+        n_docs = len(profiles)
+        exact_arrays = {kind: (np.array(keys, dtype=str), np.array(docs_, dtype=np.int32))
+                        for kind, (keys, docs_) in exact.items()}
+        return cls(profiles, _TrigramField.build(commercial, n_docs), _TrigramField.build(all_names, n_docs),
+                   np.array(prefixes, dtype=str), exact_arrays)
+
+    @classmethod
+    def from_file(cls, path: Path) -> "EmbeddedMatcher":
+        with open(path, "r") as file:
+            return cls.build(json.loads(line) for line in file if line.strip())
+
+    def save(self, path: Path):
+        """Write the prebuilt index; profiles go in as one byte buffer plus offsets (no pickling)."""
+        offsets = np.zeros(len(self.profiles) + 1, dtype=np.int64)
+        np.cumsum([len(p) for p in self.profiles], out=offsets[1:])
+        arrays = {
+            "format_version": np.array(FORMAT_VERSION),
+            "profiles": np.frombuffer(b"".join(self.profiles), dtype=np.uint8),
+            "profile_offsets": offsets,
+            "prefixes": self.prefixes,
+            **self.commercial.arrays("commercial_"),
+            **self.all_names.arrays("all_"),
+        }
+        for kind, (keys, docs) in self._exact_arrays.items():
+            arrays[f"{kind}_keys"] = keys
+            arrays[f"{kind}_docs"] = docs
+        # Temp file + rename, so a concurrent reader never sees a half-written index
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "EmbeddedMatcher":
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["format_version"]) != FORMAT_VERSION:
+                raise ValueError(f"{path} has index format {int(data['format_version'])}, expected {FORMAT_VERSION}")
+            blob = data["profiles"].tobytes()
+            offsets = data["profile_offsets"].tolist()
+            profiles = [blob[start:end] for start, end in zip(offsets, offsets[1:])]
+            n_docs = len(profiles)
+            exact = {kind: (data[f"{kind}_keys"], data[f"{kind}_docs"]) for kind in ("domain", "phone", "facebook")}
+            return cls(profiles, _TrigramField.from_arrays(data, "commercial_", n_docs),
+                       _TrigramField.from_arrays(data, "all_", n_docs), data["prefixes"], exact)
+
+    @classmethod
+    def load_or_build(cls, index_path: Path = INDEX_FILE, source: Path = MERGED) -> "EmbeddedMatcher":
+        """The prebuilt index when it is newer than the source file, otherwise rebuild and save it."""
+        try:
+            if os.stat(index_path).st_mtime >= os.stat(source).st_mtime:
+                return cls.load(index_path)
+        except (OSError, ValueError, KeyError):
+            pass
+        matcher = cls.from_file(source)
+        matcher.save(index_path)
+        return matcher
+
+    def scores(self, name: str | None = None, website: str | None = None, phone: str | None = None,
+               facebook: str | None = None) -> np.ndarray:
+        scores = np.zeros(len(self), dtype=np.float32)
+        query = normalize_name(name)
+        if query:
+            scores += NAME_BOOST * self.commercial.similarity(query)
+            scores += NAME_BOOST * self.all_names.similarity(query)
+            scores[np.char.startswith(self.prefixes, query)] += PREFIX_BOOST
+        for index, key, boost in ((self.domains, normalize_domain(website), DOMAIN_BOOST),
+                                  (self.phones, normalize_phone(phone), PHONE_BOOST),
+                                  (self.facebook, facebook_handle(facebook), FACEBOOK_BOOST)):
+            if key and key in index:
+                scores[index[key]] += boost
+        return scores
+
+    def match(self, name: str | None = None, website: str | None = None, phone: str | None = None,
+              facebook: str | None = None) -> tuple[float, dict] | None:
+        """(score, profile) of the best company, or None when nothing matches at all."""
+        if not len(self):
+            return None
+        scores = self.scores(name, website, phone, facebook)
+        best = int(np.argmax(scores))
+        if scores[best] <= 0:
+            return None
+        return float(scores[best]), json.loads(self.profiles[best])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prebuild the embedded matching index from the merged companies.")
+    parser.add_argument("--source", type=Path, default=MERGED)
+    parser.add_argument("--output", type=Path, default=INDEX_FILE)
+    args = parser.parse_args()
+
+    matcher = EmbeddedMatcher.from_file(args.source)
+    matcher.save(args.output)
+    print(f"✅ Embedded index with {len(matcher)} companies saved to {args.output}")
@@ -0,0 +1,257 @@
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import time
+import zlib
+from pathlib import Path
+
+import aiohttp
+from elasticsearch import AsyncElasticsearch
+
+from indexing.normalize import facebook_handle, key_fields, name_tokens, normalize_domain, normalize_phone
+
+ES_URL = os.getenv("ES_URL", "http://localhost:9200")
+API_URL = os.getenv("API_URL", "http://localhost:8000")
+INDEX_NAME = "companies"
+
+# Hits per search_after page: the unit of memory and of each output chunk
+EXPORT_PAGE_SIZE = 1000
+# How long the point in time survives between two pages; every page renews it
+PIT_KEEP_ALIVE = "5m"
+# Timeout for one page request (the export as a whole has none)
+EXPORT_REQUEST_TIMEOUT = 60
+# Longest silence tolerated while a batch match export streams back from the API (seconds)
+MATCH_READ_TIMEOUT = 300
+GZIP_LEVEL = 6
+_GZIP_WBITS = 31
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+# CSV columns; list values are joined with "; " as in the scraper's CSV output
+COMPANY_FIELDS = ["domain", "company_commercial_name", "company_legal_name", "company_all_available_names",
+                  "phone_numbers", "social_links", "address", "domain_aliases"]
+MATCH_FIELDS = ["index", "match_found", "score", "error"] + COMPANY_FIELDS
+
+
+class ExportFilter:
+    """Which companies an export includes, as an Elasticsearch filter or an in-process predicate.
+
+    Identifiers are normalized like match input; `name` keeps documents whose names contain
+    every word of it. All given conditions must hold.
+    """
+
+    def __init__(self, name: str | None = None, domain: str | None = None, phone: str | None = None,
+                 facebook: str | None = None, has_phone: bool = False, has_address: bool = False):
+        self.name = (name or "").strip()
+        self.domain = normalize_domain(domain)
+        self.phone = normalize_phone(phone)
+        self.facebook = facebook_handle(facebook)
+        self.has_phone = has_phone
+        self.has_address = has_address
+
+    def query(self) -> dict:
+        filters = []
+        if self.name:
+            filters.append({"multi_match": {"query": self.name, "operator": "and",
+                                            "fields": ["company_commercial_name", "company_all_available_names"]}})
+        if self.domain:
+            filters.append({"bool": {"should": [{"term": {"domain_key": self.domain}},
+                                                {"term": {"domain_aliases": self.domain}}],
+                                     "minimum_should_match": 1}})
+        if self.phone:
+            filters.append({"term": {"phone_digits": self.phone}})
+        if self.facebook:
+            filters.append({"term": {"facebook_handles": self.facebook}})
+        if self.has_phone:
+            filters.append({"exists": {"field": "phone_digits"}})
+        if self.has_address:
+            filters.append({"exists": {"field": "address"}})
+        return {"bool": {"filter": filters}} if filters else {"match_all": {}}
+
+    def matches(self, doc: dict) -> bool:
+        keys = doc if "domain_key" in doc else key_fields(doc)
+        if self.name:
+            names = " ".join(filter(None, (doc.get("company_commercial_name"), doc.get("company_all_available_names"))))
+            if not name_tokens(self.name) <= name_tokens(names):
+                return False
+        if self.domain and self.domain not in [keys["domain_key"], *(doc.get("domain_aliases") or [])]:
+            return False
+        if self.phone and self.phone not in keys["phone_digits"]:
+            return False
+        if self.facebook and self.facebook not in keys["facebook_handles"]:
+            return False
+        if self.has_phone and not keys["phone_digits"]:
+            return False
+        return not self.has_address or bool(doc.get("address"))
+
+
+async def iter_index_pages(es: AsyncElasticsearch, index: str, query: dict, page_size: int = EXPORT_PAGE_SIZE,
+                           keep_alive: str = PIT_KEEP_ALIVE):
+    """Pages of `_source` dicts from a point-in-time snapshot, walked in `_shard_doc` order.
+
+    The point in time is closed at the end; if the consumer goes away mid-export it simply
+    expires after `keep_alive`.
+    """
+    client = es.options(request_timeout=EXPORT_REQUEST_TIMEOUT)
+    pit = (await client.open_point_in_time(index=index, keep_alive=keep_alive))["id"]
+    search_after = None
+    try:
+        while True:
+            res = await client.search(pit={"id": pit, "keep_alive": keep_alive}, query=query, size=page_size,
+                                      sort=[{"_shard_doc": "asc"}], search_after=search_after,
+                                      track_total_hits=False, source=True)
+            # Elasticsearch may hand back a new id for the same point in time
+            pit = res.get("pit_id", pit)
+            hits = res["hits"]["hits"]
+            if hits:
+                yield [hit["_source"] for hit in hits]
+            if len(hits) < page_size:
+                return
+            search_after = hits[-1]["sort"]
+    finally:
+        try:
+            await client.close_point_in_time(id=pit)
+        except Exception as e:
+            print(f"[WARN] Could not close the export's point in time: {type(e).__name__}: {e}")
+
+
+async def iter_profile_pages(profiles: list[bytes], export_filter: ExportFilter, page_size: int = EXPORT_PAGE_SIZE):
+    """The same pages from in-process profiles (the embedded backend), filtered with `matches()`."""
+    for start in range(0, len(profiles), page_size):
+        rows = [doc for doc in map(json.loads, profiles[start:start + page_size]) if export_filter.matches(doc)]
+        if rows:
+            yield rows
+        # Let other requests run between pages
+        await asyncio.sleep(0)
+
+
+def match_row(result: dict) -> dict:
+    """A batch match line flattened to one CSV row: status columns, then the profile's fields."""
+    return {**(result.get("company_profile") or {}), "index": result.get("index"),
+            "match_found": result.get("match_found"), "score": result.get("score"), "error": result.get("error")}
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return "; ".join(str(item) for item in value)
+    return value
+
+
+async def encode_pages(pages, fmt: str, fields: list[str] = COMPANY_FIELDS):
+    """One bytes chunk per page of rows; a CSV starts with its header row."""
+    if fmt == "csv":
+        yield (",".join(fields) + "\r\n").encode()
+    async for rows in pages:
+        if fmt == "csv":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows([_cell(row.get(field)) for field in fields] for row in rows)
+            yield buffer.getvalue().encode()
+        else:
+            yield "".join(json.dumps(row) + "\n" for row in rows).encode()
+
+
+async def gzip_chunks(chunks, level: int = GZIP_LEVEL):
+    """Compress a byte stream as one gzip member, chunk by chunk."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _GZIP_WBITS)
+    async for chunk in chunks:
+        # zlib releases the GIL, so compressing in a thread keeps the loop free
+        data = await asyncio.to_thread(compressor.compress, chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(pages, fmt: str, fields: list[str] = COMPANY_FIELDS, compress: bool = False):
+    chunks = encode_pages(pages, fmt, fields)
+    return gzip_chunks(chunks) if compress else chunks
+
+
+class _Counted:
+    """Wraps a page stream and counts the rows that went through it."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.rows = 0
+
+    async def __aiter__(self):
+        async for rows in self.pages:
+            self.rows += len(rows)
+            yield rows
+
+
+async def write_stream(chunks, output: Path) -> int:
+    """Write chunks to `output` via a temporary file, so a failed export leaves no partial file; returns bytes."""
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output.with_name(output.name + ".tmp")
+    written = 0
+    try:
+        with open(tmp, "wb") as file:
+            async for chunk in chunks:
+                file.write(chunk)
+                written += len(chunk)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    tmp.replace(output)
+    return written
+
+
+async def export_companies(output: Path, export_filter: ExportFilter, fmt: str = "csv", compress: bool = False,
+                           es_url: str = ES_URL, index: str = INDEX_NAME,
+                           page_size: int = EXPORT_PAGE_SIZE) -> tuple[int, int]:
+    """Export matching documents straight from Elasticsearch; returns (rows, bytes written)."""
+    es = AsyncElasticsearch(es_url, request_timeout=EXPORT_REQUEST_TIMEOUT, retry_on_timeout=True, max_retries=2)
+    try:
+        pages = _Counted(iter_index_pages(es, index, export_filter.query(), page_size))
+        written = await write_stream(export_stream(pages, fmt, COMPANY_FIELDS, compress), output)
+        return pages.rows, written
+    finally:
+        await es.close()
+
+
+async def export_matches(records: Path, output: Path, fmt: str = "csv", compress: bool = False,
+                         api_url: str = API_URL) -> int:
+    """Send a JSON array or NDJSON file to a running API's batch endpoint and save the streamed results."""
+    content_type = "application/json" if records.suffix == ".json" else "application/x-ndjson"
+    params = {"format": fmt, "gzip": "true" if compress else "false"}
+    timeout = aiohttp.ClientTimeout(total=None, sock_read=MATCH_READ_TIMEOUT)
+    async with aiohttp.ClientSession(timeout=timeout, auto_decompress=False) as session:
+        with open(records, "rb") as body:
+            async with session.post(f"{api_url}/match_company/batch", data=body, params=params,
+                                    headers={"content-type": content_type}) as resp:
+                resp.raise_for_status()
+                return await write_stream(resp.content.iter_chunked(1 << 16), output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export companies (or batch match results) as CSV or NDJSON.")
+    parser.add_argument("--output", type=Path, required=True, help="output file; a .gz suffix turns on gzip")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+    parser.add_argument("--gzip", action="store_true", help="gzip the output whatever its name")
+    parser.add_argument("--name", help="only companies whose names contain all these words")
+    parser.add_argument("--domain", help="only the company with this website (aliases included)")
+    parser.add_argument("--phone", help="only companies with this phone number")
+    parser.add_argument("--facebook", help="only companies with this Facebook page")
+    parser.add_argument("--has-phone", action="store_true", help="only companies with at least one phone")
+    parser.add_argument("--has-address", action="store_true", help="only companies with an address")
+    parser.add_argument("--page-size", type=int, default=EXPORT_PAGE_SIZE, help="documents per search_after page")
+    parser.add_argument("--match", type=Path, metavar="RECORDS",
+                        help="export batch match results for this JSON/NDJSON file instead (needs the API running)")
+    args = parser.parse_args()
+
+    compress = args.gzip or args.output.suffix == ".gz"
+    start = time.perf_counter()
+    if args.match:
+        written = asyncio.run(export_matches(args.match, args.output, args.format, compress))
+        print(f"✅ Match results for {args.match} -> {args.output} ({written / 1e6:.1f} MB, "
+              f"{time.perf_counter() - start:.1f}s)")
+    else:
+        export_filter = ExportFilter(args.name, args.domain, args.phone, args.facebook, args.has_phone,
+                                     args.has_address)
+        rows, written = asyncio.run(export_companies(args.output, export_filter, args.format, compress,
+                                                     page_size=args.page_size))
+        print(f"✅ {rows} companies -> {args.output} ({written / 1e6:.1f} MB, {time.perf_counter() - start:.1f}s)")
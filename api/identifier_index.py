@@ -0,0 +1,121 @@
+import json
+import os
+from pathlib import Path
+
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_scan
+
+from indexing.normalize import key_fields, normalize_domain, normalize_phone, facebook_handle
+
+# Key value for an identifier shared by several companies; such lookups are left to Elasticsearch
+AMBIGUOUS = -1
+# Key namespaces in the single lookup dict: "d:acme.com", "p:6264836280", "f:acme"
+_DOMAIN, _PHONE, _FACEBOOK = "d:", "p:", "f:"
+
+
+class _Tables:
+    """One immutable generation of the index: compact profile blobs plus key -> profile position."""
+
+    __slots__ = ("profiles", "keys", "source_mtime")
+
+    def __init__(self, docs, source_mtime: float | None = None):
+        # Profiles are kept as compact JSON bytes (decoded only on a hit) rather than dicts
+        self.profiles: list[bytes] = []
+        self.keys: dict[str, int] = {}
+        self.source_mtime = source_mtime
+        for doc in docs:
+            if not doc.get("domain"):
+                continue
+            keys = doc if "domain_key" in doc else key_fields(doc)
+            position = len(self.profiles)
+            self.profiles.append(json.dumps(doc, separators=(",", ":")).encode())
+            self._add(_DOMAIN + keys["domain_key"], position)
+            for alias in doc.get("domain_aliases") or []:
+                self._add(_DOMAIN + alias, position)
+            for phone in keys["phone_digits"]:
+                self._add(_PHONE + phone, position)
+            for handle in keys["facebook_handles"]:
+                self._add(_FACEBOOK + handle, position)
+
+    def _add(self, key: str, position: int):
+        if key[2:]:
+            existing = self.keys.setdefault(key, position)
+            if existing != position:
+                self.keys[key] = AMBIGUOUS
+
+
+def _read_docs(path: Path):
+    with open(path, "r") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+class IdentifierIndex:
+    """In-memory exact-match index on normalized domain, phone digits and Facebook handle.
+
+    `lookup()` answers only when the given identifiers point at exactly one company;
+    name-only, ambiguous or unknown inputs return None and go to Elasticsearch.
+    Reloads build a new generation off to the side and swap it in with one assignment,
+    so concurrent lookups always see either the old or the new tables, never a mix.
+    """
+
+    def __init__(self, path: Path | None = None):
+        self.path = path
+        self._tables = _Tables(())
+        self.stats = {"lookups": 0, "hits": 0}
+        if path is not None:
+            self.reload()
+
+    def __len__(self) -> int:
+        return len(self._tables.profiles)
+
+    def _mtime(self) -> float | None:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def reload(self) -> bool:
+        """Rebuild from the data file; returns whether a new generation was swapped in."""
+        mtime = self._mtime()
+        if mtime is None:
+            return False
+        self._tables = _Tables(_read_docs(self.path), mtime)
+        return True
+
+    def reload_if_changed(self) -> bool:
+        if self.path is None or self._mtime() == self._tables.source_mtime:
+            return False
+        return self.reload()
+
+    async def load_from_es(self, es: AsyncElasticsearch, index_name: str):
+        """Build from a scroll over the live index instead of the merged file."""
+        docs = [hit["_source"] async for hit in async_scan(es, index=index_name, query={"query": {"match_all": {}}})]
+        self._tables = _Tables(docs)
+
+    def lookup(self, website: str | None = None, phone: str | None = None, facebook: str | None = None) -> dict | None:
+        """The single company all given identifiers agree on, or None when ES has to decide."""
+        keys = [_DOMAIN + normalize_domain(website), _PHONE + normalize_phone(phone),
+                _FACEBOOK + facebook_handle(facebook)]
+        keys = [key for key in keys if key[2:]]
+        if not keys:
+            return None
+
+        self.stats["lookups"] += 1
+        tables = self._tables
+        positions = {tables.keys.get(key) for key in keys}
+        # Every identifier must be known and unambiguous, and all of them must name the same company
+        if len(positions) != 1 or None in positions or AMBIGUOUS in positions:
+            return None
+        self.stats["hits"] += 1
+        return json.loads(tables.profiles[positions.pop()])
+
+    def summary(self) -> dict:
+        lookups = self.stats["lookups"]
+        return {
+            "companies": len(self),
+            "keys": len(self._tables.keys),
+            **self.stats,
+            "hit_ratio": round(self.stats["hits"] / lookups, 4) if lookups else None,
+        }
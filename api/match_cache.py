@@ -0,0 +1,80 @@
+import re
+import time
+from collections import OrderedDict
+
+from indexing.normalize import normalize_domain, normalize_phone, facebook_handle
+
+# Entries kept, and seconds an entry stays valid even without a reindex
+MAX_ENTRIES = 50_000
+TTL_SECONDS = 600
+
+_SPACES = re.compile(r"\s+")
+
+
+def cache_key(name: str | None, website: str | None, phone: str | None, facebook: str | None) -> tuple:
+    """Inputs that build the same query share a key: 'ACME  Inc' / 'https://www.acme.com/' == 'acme inc' / 'acme.com'."""
+    return (
+        _SPACES.sub(" ", (name or "").strip().lower()),
+        normalize_domain(website),
+        normalize_phone(phone),
+        facebook_handle(facebook),
+    )
+
+
+class MatchCache:
+    """LRU cache of match responses with a TTL, emptied when the index generation or the identifier file changes."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, ttl: float = TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation = None
+        self._entries: OrderedDict[tuple, tuple[float, dict]] = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple) -> dict | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return value
+
+    def put(self, key: tuple, value: dict):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def set_generation(self, generation) -> bool:
+        """Record the index generation; returns whether the cache was emptied because it changed."""
+        if generation == self.generation:
+            return False
+        if self.generation is not None or self._entries:
+            self.invalidate()
+        self.generation = generation
+        return True
+
+    def invalidate(self):
+        """Drop every entry: the data answers came from has changed (a reindex, a new identifier file)."""
+        self._entries.clear()
+        self.stats["invalidations"] += 1
+
+    def summary(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "entries": len(self),
+            "generation": self.generation,
+            **self.stats,
+            "hit_ratio": round(self.stats["hits"] / lookups, 4) if lookups else None,
+        }
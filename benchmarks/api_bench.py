@@ -0,0 +1,235 @@
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import random
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+
+from api import api
+from indexing.normalize import key_fields
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+API_INPUT = BASE_DIR / "data" / "API-input-sample.csv"
+MERGED = BASE_DIR / "data" / "merged_companies.json"
+
+CONCURRENCY_LEVELS = [1, 4, 16, 64]
+REQUESTS_PER_LEVEL = 2000
+SEED = 1
+# Upper bounds (ms) of the latency histogram buckets; the last one is open-ended
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, float("inf")]
+# Shape of the generated query mix: kind -> share
+QUERY_MIX = {
+    "name": 0.30,
+    "phone": 0.15,
+    "website": 0.20,
+    "facebook": 0.05,
+    "name+website": 0.15,
+    "name+phone": 0.10,
+    "sample": 0.05,     # rows of API-input-sample.csv as given
+}
+
+
+def build_queries(count: int, seed: int = SEED, mix: dict[str, float] = QUERY_MIX) -> list[dict]:
+    """`count` request bodies in the QUERY_MIX proportions, deterministic for a seed."""
+    rng = random.Random(seed)
+    with open(MERGED) as file:
+        docs = [json.loads(line) for line in file if line.strip()]
+    with open(API_INPUT, newline="") as file:
+        samples = [{"name": row["input name"] or None, "phone": row["input phone"] or None,
+                    "website": row["input website"] or None, "facebook": row["input_facebook"] or None}
+                   for row in csv.DictReader(file)]
+
+    def from_doc(kind: str) -> dict:
+        doc = rng.choice(docs)
+        keys = doc if "domain_key" in doc else key_fields(doc)
+        phones = keys["phone_digits"]
+        handles = keys["facebook_handles"]
+        fields = {
+            "name": doc.get("company_commercial_name"),
+            "website": f"https://www.{doc['domain']}/",
+            "phone": rng.choice(phones) if phones else None,
+            "facebook": f"https://www.facebook.com/{handles[0]}" if handles else None,
+        }
+        return {field: fields[field] for field in kind.split("+")}
+
+    kinds = rng.choices(list(mix), list(mix.values()), k=count)
+    return [rng.choice(samples) if kind == "sample" else from_doc(kind) for kind in kinds]
+
+
+class FakeElasticsearch:
+    """Stand-in for AsyncElasticsearch with a configurable latency and error rate.
+
+    Searches answer with a profile from merged_companies.json after `latency_ms`
+    (log-normally spread), so the API does its real work around a cluster-like wait.
+    """
+
+    def __init__(self, latency_ms: float = 5.0, error_rate: float = 0.0, seed: int = SEED):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        with open(MERGED) as file:
+            self._docs = [json.loads(line) for line in file if line.strip()]
+        self.cluster = self
+        self.indices = self
+        self.searches = 0
+
+    def options(self, **kwargs):
+        return self
+
+    async def _wait(self):
+        if self.latency_ms:
+            await asyncio.sleep(self._rng.lognormvariate(0, 0.5) * self.latency_ms / 1000)
+        if self._rng.random() < self.error_rate:
+            raise ConnectionError("injected Elasticsearch failure")
+
+    def _response(self) -> dict:
+        return {"hits": {"hits": [{"_score": 10.0, "_source": self._rng.choice(self._docs)}]}}
+
+    async def search(self, **kwargs):
+        self.searches += 1
+        await self._wait()
+        return self._response()
+
+    async def msearch(self, searches, **kwargs):
+        self.searches += 1
+        await self._wait()
+        return {"responses": [self._response() for _ in searches[::2]]}
+
+    async def health(self, **kwargs):
+        return {"status": "green"}
+
+    async def get_mapping(self, index, **kwargs):
+        return {index: {"mappings": {"_meta": {"generation": 1}}}}
+
+    async def close(self):
+        pass
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def _histogram(latencies_ms: list[float]) -> dict[str, int]:
+    counts = dict.fromkeys((f"<={b:g}ms" if b != float("inf") else "inf" for b in HISTOGRAM_BUCKETS_MS), 0)
+    labels = list(counts)
+    for value in latencies_ms:
+        for bound, label in zip(HISTOGRAM_BUCKETS_MS, labels):
+            if value <= bound:
+                counts[label] += 1
+                break
+    return counts
+
+
+async def run_level(client: httpx.AsyncClient, queries: list[dict], concurrency: int, requests: int) -> dict:
+    """`requests` POSTs from `concurrency` concurrent clients cycling through the query mix."""
+    source = itertools.islice(itertools.cycle(queries), requests)
+    latencies: list[float] = []
+    errors: dict[str, int] = {}
+    matched = 0
+
+    async def client_loop():
+        nonlocal matched
+        for body in source:
+            start = time.perf_counter()
+            try:
+                response = await client.post("/match_company", json=body)
+                if response.status_code != 200:
+                    errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+                elif response.json()["match_found"]:
+                    matched += 1
+            except Exception as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    ordered = sorted(latencies)
+    failed = sum(errors.values())
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": {"p50": round(_percentile(ordered, 0.5), 2), "p90": round(_percentile(ordered, 0.9), 2),
+                       "p99": round(_percentile(ordered, 0.99), 2), "max": round(ordered[-1], 2) if ordered else 0},
+        "histogram": _histogram(latencies),
+        "error_rate": round(failed / len(latencies), 4) if latencies else 0.0,
+        "errors": errors,
+        "match_rate": round(matched / len(latencies), 4) if latencies else 0.0,
+    }
+
+
+async def run_in_process(queries: list[dict], levels: list[int], requests: int, backend: str = "elasticsearch",
+                         es_latency_ms: float = 5.0, es_error_rate: float = 0.0, use_cache: bool = True,
+                         use_identifier_index: bool = True) -> list[dict]:
+    """Drive the FastAPI app through ASGITransport, with its lifespan, against the ES stand-in."""
+    # Failures are injected only once the app is up, so the warm-up does not sit in its retries
+    fake = FakeElasticsearch(es_latency_ms)
+    results = []
+    with patch.object(api, "AsyncElasticsearch", lambda *args, **kwargs: fake), \
+            patch.object(api, "MATCH_BACKEND", backend), \
+            patch.object(api, "IDENTIFIER_SOURCE", api.IDENTIFIER_SOURCE if use_identifier_index else "off"):
+        async with api.lifespan(api.app):
+            fake.error_rate = es_error_rate
+            if not use_cache:
+                api.match_cache = None
+            # Unhandled errors come back as 500s, the way a real server reports them
+            transport = httpx.ASGITransport(app=api.app, raise_app_exceptions=False)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                for level in levels:
+                    results.append(await run_level(client, queries, level, requests))
+                    results[-1]["es_searches"] = fake.searches
+                    results[-1]["stats"] = (await client.get("/stats")).json()
+    return results
+
+
+async def run_remote(url: str, queries: list[dict], levels: list[int], requests: int) -> list[dict]:
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        return [await run_level(client, queries, level, requests) for level in levels]
+
+
+def _print_table(results: list[dict]):
+    print(f"{'conc':>5} {'rps':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'errors':>7} {'matched':>8}")
+    for r in results:
+        lat = r["latency_ms"]
+        print(f"{r['concurrency']:>5} {r['throughput_rps']:>9} {lat['p50']:>8} {lat['p90']:>8} {lat['p99']:>8} "
+              f"{r['error_rate']:>7.2%} {r['match_rate']:>8.2%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the matching API.")
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--backend", choices=["elasticsearch", "embedded"], default="elasticsearch")
+    parser.add_argument("--concurrency", default=",".join(map(str, CONCURRENCY_LEVELS)),
+                        help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=REQUESTS_PER_LEVEL, help="requests per level")
+    parser.add_argument("--queries", type=int, default=1000, help="distinct queries in the mix")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--es-latency-ms", type=float, default=5.0, help="median latency of the ES stand-in")
+    parser.add_argument("--es-error-rate", type=float, default=0.0, help="share of stand-in searches that fail")
+    parser.add_argument("--no-cache", action="store_true", help="disable the match cache")
+    parser.add_argument("--no-identifier-index", action="store_true", help="send exact lookups to the backend too")
+    parser.add_argument("--save", type=Path, help="write the results JSON here")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    queries = build_queries(args.queries, args.seed)
+    if args.url:
+        results = asyncio.run(run_remote(args.url, queries, levels, args.requests))
+    else:
+        results = asyncio.run(run_in_process(queries, levels, args.requests, args.backend, args.es_latency_ms,
+                                             args.es_error_rate, not args.no_cache, not args.no_identifier_index))
+    _print_table(results)
+    if args.save:
+        meta = {key: value for key, value in vars(args).items() if key != "save"}
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps({"meta": meta, "levels": results}, indent=2, default=str) + "\n")
+        print(f"💾 Saved to {args.save}")
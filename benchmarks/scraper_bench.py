@@ -0,0 +1,269 @@
+import argparse
+import asyncio
+import contextlib
+import csv
+import io
+import json
+import multiprocessing
+import platform
+import resource
+import ssl
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.web_farm import FAILING_FAULTS, FarmResolver, WebFarm, farm_plan, render_page
+from scraper import adaptive, crawler
+from scraper.page_archive import iter_pages
+from scraper import run_scraper as scraper
+
+DOMAINS = 1000
+SEED = 1
+# Per-request crawler timeout during the benchmark; the production default (45s) would make
+# every injected timeout dominate the run
+CRAWL_TIMEOUT = 5.0
+EXTRACT_ROUNDS = 200
+# pip-system-certs (truststore) replaces ssl.SSLContext with a wrapper that reloads the system CA
+# store on every TLS handshake; with it installed the benchmark mostly measures that
+SSL_CONTEXT_PATCHED = ssl.SSLContext.__module__ != "ssl"
+# Relative change beyond which --compare reports a regression
+TOLERANCE = 0.15
+# Metric -> True when higher is better
+METRICS = {
+    "scrape.domains_per_sec": True,
+    "scrape.latency_p50_s": False,
+    "scrape.latency_p99_s": False,
+    "scrape.peak_rss_mb": False,
+    "scrape.extract_cpu_s": False,
+    "extract.pages_per_sec": True,
+}
+
+
+def _serve_farm(plan: dict[str, str], seed: int, latency_ms: float, conn):
+    async def main():
+        farm = WebFarm(plan, seed, latency_ms)
+        await farm.start()
+        conn.send((farm.http_port, farm.https_port))
+        # Block until the benchmark says stop
+        await asyncio.get_running_loop().run_in_executor(None, conn.recv)
+        conn.send(farm.requests)
+        await farm.stop()
+
+    asyncio.run(main())
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _rss_mb(who: int) -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(who).ru_maxrss / scale
+
+
+@contextlib.contextmanager
+def _patched(obj, **attrs):
+    saved = {name: getattr(obj, name) for name in attrs}
+    for name, value in attrs.items():
+        setattr(obj, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(obj, name, value)
+
+
+def run_scrape(plan: dict[str, str], http_port: int, https_port: int, workdir: Path,
+               in_flight: int, extract_workers: int, timeout: float, quiet: bool = True,
+               concurrency: int = scraper.CONCURRENCY, adaptive_controller: bool = False) -> dict:
+    """Crawl every farm domain with run_scraper and measure it, with fixed or adaptive concurrency."""
+    input_csv = workdir / "domains.csv"
+    with open(input_csv, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["domain"])
+        writer.writerows([domain] for domain in plan)
+
+    latencies: list[float] = []
+    stages: list = []
+    real_process_domain = scraper.process_domain
+    real_stage = scraper.ExtractionStage
+
+    async def timed_process_domain(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await real_process_domain(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    def recording_stage(*args, **kwargs):
+        stages.append(real_stage(*args, **kwargs))
+        return stages[-1]
+
+    async def all_alive(domains, cache, concurrency=200):
+        # The farm resolver answers (or refuses) per host; no real DNS involved
+        return list(domains), []
+
+    paths = {name: workdir / f"{name.lower()}.out" for name in
+             ("OUTPUT_CSV", "FAILED_CSV", "JOURNAL", "VARIANTS_DB", "DNS_CACHE_DB", "HTTP_CACHE_DB",
+              "METRICS_FILE", "SCRAPE_STORE")}
+    crawler.body_stats.update({key: 0 for key in crawler.body_stats})
+    controllers: list = []
+    real_controller = scraper.AdaptiveController
+
+    def recording_controller(*args, **kwargs):
+        controllers.append(real_controller(*args, **kwargs))
+        return controllers[-1]
+
+    with _patched(scraper, INPUT_CSV=input_csv, pre_resolve=all_alive, process_domain=timed_process_domain,
+                  ExtractionStage=recording_stage, AdaptiveController=recording_controller, CONCURRENCY=concurrency,
+                  PreResolvedResolver=lambda cache: FarmResolver(plan, http_port, https_port), **paths), \
+            _patched(adaptive, DEFAULT_TIMEOUT=timeout, MAX_TIMEOUT=timeout, MIN_TIMEOUT=min(adaptive.MIN_TIMEOUT, timeout)), \
+            _patched(crawler, DEFAULT_TIMEOUT=timeout), \
+            contextlib.redirect_stdout(io.StringIO() if quiet else sys.stdout):
+        start = time.perf_counter()
+        asyncio.run(scraper.run_scraper(extract_workers=extract_workers, in_flight=in_flight, use_cache=False,
+                                        adaptive=adaptive_controller))
+        elapsed = time.perf_counter() - start
+
+    with open(paths["OUTPUT_CSV"], newline="") as file:
+        scraped = sum(1 for _ in csv.DictReader(file))
+    timings = stages[0].timings.snapshot() if stages else {}
+    expected = sum(1 for fault in plan.values() if fault not in FAILING_FAULTS)
+    return {
+        "domains": len(plan),
+        "scraped": scraped,
+        "expected_scraped": expected,
+        "elapsed_s": round(elapsed, 3),
+        "domains_per_sec": round(len(plan) / elapsed, 2),
+        "latency_p50_s": round(_percentile(latencies, 0.50), 4),
+        "latency_p99_s": round(_percentile(latencies, 0.99), 4),
+        "peak_rss_mb": round(_rss_mb(resource.RUSAGE_SELF), 1),
+        # Largest extraction worker (the pool has been joined by now; the farm has not)
+        "peak_worker_rss_mb": round(_rss_mb(resource.RUSAGE_CHILDREN), 1),
+        "extract_cpu_s": round(timings.get("extract_cpu", {}).get("total", 0.0), 3),
+        "truncated_pages": crawler.body_stats["truncated"],
+        "final_concurrency_limit": controllers[0].limit if controllers else concurrency,
+    }
+
+
+def run_extract(rounds: int = EXTRACT_ROUNDS, corpus: Path | None = None) -> dict:
+    """crawler.extract_page_data on its own, over the farm's page shapes or an archived real corpus."""
+    if corpus is not None:
+        pages = [page for _, page in iter_pages(corpus, limit=rounds)]
+        rounds = len(pages)
+    else:
+        pages = [render_page(f"extract{i}.bench.test").encode() for i in range(rounds)]
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    found = sum(bool(crawler.extract_page_data(page)["phone_numbers"]) for page in pages)
+    wall, cpu = time.perf_counter() - start_wall, time.process_time() - start_cpu
+    return {
+        "pages": rounds,
+        "pages_with_phone": found,
+        "pages_per_sec": round(rounds / wall, 1),
+        "cpu_ms_per_page": round(cpu / rounds * 1000, 3),
+    }
+
+
+def run_benchmark(domains: int = DOMAINS, seed: int = SEED, latency_ms: float = 20.0, in_flight: int = 200,
+                  extract_workers: int = 2, timeout: float = CRAWL_TIMEOUT, quiet: bool = True,
+                  corpus: Path | None = None, concurrency: int = scraper.CONCURRENCY,
+                  adaptive_controller: bool = False) -> dict:
+    if SSL_CONTEXT_PATCHED:
+        print(f"[WARN] ssl.SSLContext is {ssl.SSLContext.__module__}.SSLContext (pip-system-certs?); every "
+              "handshake reloads the CA store. Benchmark in an environment without it (see README)")
+    plan = farm_plan(domains, seed)
+    parent, child = multiprocessing.Pipe()
+    # The farm gets its own process, so its CPU does not count against the crawler
+    farm = multiprocessing.Process(target=_serve_farm, args=(plan, seed, latency_ms, child), daemon=True)
+    farm.start()
+    try:
+        http_port, https_port = parent.recv()
+        with tempfile.TemporaryDirectory() as workdir:
+            scrape = run_scrape(plan, http_port, https_port, Path(workdir), in_flight, extract_workers, timeout,
+                                quiet, concurrency, adaptive_controller)
+        parent.send("stop")
+        scrape["farm_requests"] = parent.recv()
+    finally:
+        farm.join(timeout=10)
+        if farm.is_alive():
+            farm.terminate()
+
+    faults: dict[str, int] = {}
+    for fault in plan.values():
+        faults[fault] = faults.get(fault, 0) + 1
+    return {
+        "meta": {
+            "domains": domains, "seed": seed, "latency_ms": latency_ms, "in_flight": in_flight,
+            "extract_workers": extract_workers, "timeout_s": timeout, "faults": faults,
+            "controller": "adaptive" if adaptive_controller else f"fixed-{concurrency}",
+            "ssl_context_patched": SSL_CONTEXT_PATCHED,
+            "python": platform.python_version(), "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "scrape": scrape,
+        "extract": run_extract(corpus=corpus),
+    }
+
+
+def _metric(result: dict, path: str):
+    section, name = path.split(".")
+    return result.get(section, {}).get(name)
+
+
+def compare(current: dict, baseline: dict, tolerance: float = TOLERANCE) -> list[str]:
+    """Metrics that got worse than the baseline by more than `tolerance` (relative)."""
+    regressions = []
+    for path, higher_is_better in METRICS.items():
+        now, before = _metric(current, path), _metric(baseline, path)
+        if not now or not before:
+            continue
+        change = (now - before) / before
+        worse = -change if higher_is_better else change
+        marker = "❌" if worse > tolerance else "✅"
+        print(f"{marker} {path:<26} {before:>10} -> {now:>10} ({change:+.1%})")
+        if worse > tolerance:
+            regressions.append(path)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the scraper against a local synthetic web farm.")
+    parser.add_argument("--domains", type=int, default=DOMAINS)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="median farm response latency")
+    parser.add_argument("--in-flight", type=int, default=200)
+    parser.add_argument("--extract-workers", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=CRAWL_TIMEOUT, help="crawler request timeout (s)")
+    parser.add_argument("--save", type=Path, help="write the result JSON here (e.g. as a new baseline)")
+    parser.add_argument("--compare", type=Path, help="baseline JSON to compare against; exits 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--corpus", type=Path,
+                        help="page archive (run_scraper --archive) to use as the extraction corpus")
+    parser.add_argument("--extract-only", action="store_true", help="only run the extraction micro-benchmark")
+    parser.add_argument("--concurrency", type=int, default=scraper.CONCURRENCY,
+                        help="fixed connection limit (the adaptive controller starts from it)")
+    parser.add_argument("--adaptive", action="store_true", help="crawl with the adaptive concurrency controller")
+    parser.add_argument("--verbose", action="store_true", help="show the crawler's own output")
+    args = parser.parse_args()
+
+    if args.extract_only:
+        result = {"extract": run_extract(corpus=args.corpus)}
+    else:
+        result = run_benchmark(args.domains, args.seed, args.latency_ms, args.in_flight, args.extract_workers,
+                               args.timeout, quiet=not args.verbose, corpus=args.corpus,
+                               concurrency=args.concurrency, adaptive_controller=args.adaptive)
+    print(json.dumps(result, indent=2))
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(result, indent=2) + "\n")
+        print(f"💾 Saved to {args.save}")
+    if args.compare:
+        regressions = compare(result, json.loads(args.compare.read_text()), args.tolerance)
+        if regressions:
+            print(f"⚠️ Regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
@@ -0,0 +1,160 @@
+import asyncio
+import random
+import socket
+import ssl
+import subprocess
+import tempfile
+from pathlib import Path
+
+from aiohttp import web
+from aiohttp.abc import AbstractResolver, ResolveResult
+
+DOMAIN_SUFFIX = ".bench.test"
+# Share of domains per fault; the rest are healthy pages
+FAULT_MIX = {
+    "slow": 0.10,           # latency x SLOW_FACTOR
+    "timeout": 0.02,        # never answers within the crawler's timeout
+    "not_found": 0.05,      # 404 on every variant
+    "redirect": 0.05,       # 301 to /home, which serves the page
+    "bad_encoding": 0.03,   # claims utf-8, sends windows-1252 bytes
+    "huge": 0.02,           # HUGE_PAGE_BYTES, past the crawler's body cap
+    "ssl_failure": 0.05,    # https variants hit a plain-text port; only http works
+    "nxdomain": 0.02,       # the resolver does not know the host
+}
+# Domains that cannot produce a scraped row whatever the crawler does
+FAILING_FAULTS = {"timeout", "not_found", "nxdomain"}
+LATENCY_MEDIAN_MS = 20.0
+LATENCY_SIGMA = 0.6
+SLOW_FACTOR = 10
+HANG_SECONDS = 600
+PAGE_FILLER_PARAGRAPHS = 40
+HUGE_PAGE_BYTES = 3 * 1024 * 1024
+
+
+def farm_plan(count: int, seed: int = 0, mix: dict[str, float] | None = None) -> dict[str, str]:
+    """domain -> fault name ('ok' for healthy ones); the same seed always gives the same farm."""
+    mix = FAULT_MIX if mix is None else mix
+    rng = random.Random(seed)
+    faults, weights = list(mix) + ["ok"], list(mix.values()) + [max(0.0, 1 - sum(mix.values()))]
+    return {f"site{i:05d}{DOMAIN_SUFFIX}": rng.choices(faults, weights)[0] for i in range(count)}
+
+
+def render_page(domain: str, paragraphs: int = PAGE_FILLER_PARAGRAPHS) -> str:
+    """A company homepage with one phone, one address and social links among filler text."""
+    number = sum(map(ord, domain)) % 9000 + 1000
+    filler = "".join(
+        f"<p>Section {i} of {domain}: quality service since 19{i % 90 + 10}, call us for a free estimate.</p>"
+        for i in range(paragraphs)
+    )
+    return (
+        f"<html><head><title>{domain}</title></head><body>"
+        f"<header><a href='https://www.facebook.com/{domain.split('.')[0]}'>Facebook</a>"
+        f"<a href='https://www.linkedin.com/company/{domain.split('.')[0]}'>LinkedIn</a></header>"
+        f"<main>{filler}</main>"
+        f"<footer><div class='address'>{number} Main Street, Springfield, IL 62704</div>"
+        f"<p>Phone: (555) 201-{number}</p></footer></body></html>"
+    )
+
+
+def _self_signed_context(workdir: Path) -> ssl.SSLContext | None:
+    """A throwaway certificate via the openssl CLI; None when openssl is unavailable."""
+    cert, key = workdir / "farm.crt", workdir / "farm.key"
+    try:
+        subprocess.run(
+            ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=bench.test",
+             "-keyout", str(key), "-out", str(cert)],
+            check=True, capture_output=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert, key)
+    return context
+
+
+class WebFarm:
+    """The farm's aiohttp server; `start()` binds the ports, `ports` tells the resolver where they are."""
+
+    def __init__(self, plan: dict[str, str], seed: int = 0, latency_ms: float = LATENCY_MEDIAN_MS):
+        self.plan = plan
+        self.latency_ms = latency_ms
+        self._rng = random.Random(seed)
+        self._runner: web.AppRunner | None = None
+        self.http_port = self.https_port = 0
+        self.requests = 0
+
+    def _delay(self, fault: str) -> float:
+        delay = self._rng.lognormvariate(0, LATENCY_SIGMA) * self.latency_ms / 1000
+        return delay * SLOW_FACTOR if fault == "slow" else delay
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        self.requests += 1
+        host = request.host.split(":")[0].lower()
+        domain = host[4:] if host.startswith("www.") else host
+        fault = self.plan.get(domain)
+        if fault is None:
+            raise web.HTTPNotFound()
+        if fault == "timeout":
+            await asyncio.sleep(HANG_SECONDS)
+        await asyncio.sleep(self._delay(fault))
+
+        if fault == "not_found":
+            raise web.HTTPNotFound()
+        if fault == "redirect" and request.path != "/home":
+            raise web.HTTPMovedPermanently("/home")
+        if fault == "huge":
+            return web.Response(text=render_page(domain, HUGE_PAGE_BYTES // 110), content_type="text/html")
+        if fault == "bad_encoding":
+            body = render_page(domain).replace("quality", "“quality”").encode("cp1252")
+            return web.Response(body=body, content_type="text/html", charset="utf-8")
+        return web.Response(text=render_page(domain), content_type="text/html")
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_route("GET", "/{tail:.*}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+
+        http = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await http.start()
+        self.http_port = http._server.sockets[0].getsockname()[1]
+
+        with tempfile.TemporaryDirectory() as workdir:
+            context = _self_signed_context(Path(workdir))
+        if context is None:
+            # No certificate: https variants fail the handshake and the crawler falls back to http
+            print("[WARN] openssl not found; the farm serves http only")
+            self.https_port = self.http_port
+        else:
+            https = web.TCPSite(self._runner, "127.0.0.1", 0, ssl_context=context)
+            await https.start()
+            self.https_port = https._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+class FarmResolver(AbstractResolver):
+    """aiohttp resolver sending farm hosts to 127.0.0.1, with ports 80/443 rewritten to the farm's."""
+
+    def __init__(self, plan: dict[str, str], http_port: int, https_port: int):
+        self.plan = plan
+        self.http_port = http_port
+        self.https_port = https_port
+
+    async def resolve(self, host: str, port: int = 0, family: socket.AddressFamily = socket.AF_INET) -> list[ResolveResult]:
+        domain = host[4:] if host.startswith("www.") else host
+        fault = self.plan.get(domain)
+        if fault is None or fault == "nxdomain":
+            raise OSError(socket.EAI_NONAME, f"farm has no host {host}")
+        if port == 443:
+            # A TLS handshake against the plain-text port is the SSL failure
+            port = self.http_port if fault == "ssl_failure" else self.https_port
+        else:
+            port = self.http_port
+        return [ResolveResult(hostname=host, host="127.0.0.1", port=port, family=socket.AF_INET, proto=0,
+                              flags=socket.AI_NUMERICHOST)]
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,253 @@
+import argparse
+import json
+import zlib
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+from indexing.normalize import key_fields, name_tokens, normalize_domain, normalize_phone, social_handle, \
+    split_joined
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+MERGED = BASE_DIR / "data" / "merged_companies.json"
+CLUSTERS = BASE_DIR / "data" / "dedup_clusters.json"
+
+# MinHash signature length, split into LSH bands of NUM_PERM / BANDS rows. With 8 bands of 4
+# rows, pairs with name-token Jaccard 0.6 collide in some band ~65% of the time, 0.8 ~97%.
+NUM_PERM = 32
+BANDS = 8
+# Blocks up to this size are expanded pairwise; larger ones use the sorted-neighbourhood window
+MAX_BLOCK = 50
+WINDOW = 10
+# Records hashed per vectorized MinHash batch (memory is batch tokens x NUM_PERM)
+MINHASH_BATCH = 100_000
+# Match rules (see is_match): name-token Jaccard needed next to one shared identifier, next to
+# several, and with none at all
+NAME_SIMILARITY_WITH_KEY = 0.5
+NAME_SIMILARITY_WITH_KEYS = 0.2
+NAME_SIMILARITY_ALONE = 0.9
+# Shorter digit strings are extensions or scraping noise ('10111213'), not a line worth blocking on
+MIN_PHONE_DIGITS = 10
+NAME_SEPARATOR = " | "
+
+_PRIME = (1 << 31) - 1
+
+
+class Record:
+    """The features of one merged record that the matcher looks at."""
+
+    __slots__ = ("position", "domain", "label", "phones", "handles", "names", "tokens")
+
+    def __init__(self, position: int, doc: dict):
+        self.position = position
+        self.domain = normalize_domain(doc.get("domain"))
+        # acme.com / acme.net / acme.co.uk share "acme"
+        self.label = self.domain.split(".")[0] if "." in self.domain else ""
+        self.phones = {p for p in (normalize_phone(raw) for raw in split_joined(doc.get("phone_numbers")))
+                       if len(p) >= MIN_PHONE_DIGITS}
+        self.handles = {h for h in (social_handle(link) for link in split_joined(doc.get("social_links"))) if h}
+        self.names = _names(doc)
+        self.tokens = set().union(*(name_tokens(name) for name in self.names)) if self.names else set()
+
+
+def _names(doc: dict) -> list[str]:
+    names = [doc.get("company_commercial_name"), doc.get("company_legal_name")]
+    names += (doc.get("company_all_available_names") or "").split("|")
+    seen, unique = set(), []
+    for name in names:
+        if isinstance(name, str) and name.strip() and name.strip().lower() not in seen:
+            seen.add(name.strip().lower())
+            unique.append(name.strip())
+    return unique
+
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def is_match(a: Record, b: Record) -> bool:
+    """Shared identifiers backed by some name overlap, or near-identical names without a conflict.
+
+    Identifiers never decide on their own: agencies, franchises and site builders put the same
+    phone or social links (a builder's own Facebook page, an injected shop's accounts) on
+    unrelated sites. Near-identical names alone are not enough when both records list phones
+    and none of them agree (same-name businesses in different towns).
+    """
+    shared = len(a.phones & b.phones) + len(a.handles & b.handles) + (a.label != "" and a.label == b.label)
+    similarity = jaccard(a.tokens, b.tokens)
+    unnamed = not a.tokens or not b.tokens
+    if shared >= 2 and (similarity >= NAME_SIMILARITY_WITH_KEYS or unnamed):
+        return True
+    if shared and similarity >= NAME_SIMILARITY_WITH_KEY:
+        return True
+    conflicting = a.phones and b.phones and not a.phones & b.phones
+    return similarity >= NAME_SIMILARITY_ALONE and not conflicting
+
+
+def minhash_signatures(token_sets: list[set[str]], num_perm: int = NUM_PERM, seed: int = 1,
+                       batch: int = MINHASH_BATCH) -> np.ndarray:
+    """(n, num_perm) MinHash signatures; rows without tokens are all -1 and never collide."""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+    b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+    signatures = np.full((len(token_sets), num_perm), -1, dtype=np.int64)
+    for start in range(0, len(token_sets), batch):
+        chunk = token_sets[start:start + batch]
+        lengths = np.array([len(tokens) for tokens in chunk], dtype=np.int64)
+        present = np.flatnonzero(lengths)
+        if not len(present):
+            continue
+        # crc32 rather than hash(): stable across processes and runs
+        hashed = np.fromiter((zlib.crc32(token.encode()) for tokens in chunk for token in tokens),
+                             dtype=np.uint64, count=int(lengths.sum()))
+        permuted = (hashed[:, None] * a[None, :] + b[None, :]) % _PRIME
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))[present]
+        signatures[start + present] = np.minimum.reduceat(permuted, starts, axis=0).astype(np.int64)
+    return signatures
+
+
+def lsh_blocks(signatures: np.ndarray, bands: int = BANDS) -> list[np.ndarray]:
+    """Groups of row positions whose signatures agree on every row of at least one band."""
+    rows = signatures.shape[1] // bands
+    hashed = np.flatnonzero(signatures[:, 0] >= 0)
+    blocks = []
+    for band in range(bands):
+        keys = signatures[hashed, band * rows:(band + 1) * rows]
+        _, inverse, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+        inverse = inverse.ravel()
+        members = hashed[np.argsort(inverse, kind="stable")]
+        ends = np.cumsum(counts)
+        # Most buckets are singletons; only the shared ones become blocks
+        shared = counts > 1
+        blocks.extend(members[start:end] for start, end in zip((ends - counts)[shared], ends[shared]))
+    return blocks
+
+
+def key_blocks(records: list[Record]) -> list[list[int]]:
+    """Groups of positions sharing a phone, a social handle or a domain label."""
+    groups: dict[str, list[int]] = defaultdict(list)
+    for record in records:
+        for phone in record.phones:
+            groups["p:" + phone].append(record.position)
+        for handle in record.handles:
+            groups["s:" + handle].append(record.position)
+        if record.label:
+            groups["l:" + record.label].append(record.position)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+def candidate_pairs(records: list[Record], blocks, max_block: int = MAX_BLOCK, window: int = WINDOW):
+    """Distinct (i, j) pairs, i < j, out of every block: all pairs in small blocks, a name-sorted window in big ones."""
+    seen = set()
+    for block in blocks:
+        members = [int(m) for m in block]
+        if len(members) <= max_block:
+            pairs = ((members[i], members[j]) for i in range(len(members)) for j in range(i + 1, len(members)))
+        else:
+            members.sort(key=lambda m: (sorted(records[m].tokens), records[m].domain))
+            pairs = ((members[i], members[j]) for i in range(len(members))
+                     for j in range(i + 1, min(i + 1 + window, len(members))))
+        for i, j in pairs:
+            pair = (i, j) if i < j else (j, i)
+            if pair not in seen:
+                seen.add(pair)
+                yield pair
+
+
+class UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a: int, b: int):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def _completeness(doc: dict) -> tuple:
+    return (bool(doc.get("company_commercial_name")), len(split_joined(doc.get("phone_numbers"))),
+            bool(doc.get("address")), len(split_joined(doc.get("social_links"))), -len(doc.get("domain") or ""))
+
+
+def _union_joined(values) -> str | None:
+    seen = {}
+    for value in values:
+        for part in split_joined(value):
+            seen.setdefault(part, None)
+    return "; ".join(seen) or None
+
+
+def canonical_profile(docs: list[dict]) -> dict:
+    """Fold a cluster into its most complete record; the others add phones, links, names and aliases."""
+    ordered = sorted(docs, key=_completeness, reverse=True)
+    primary = dict(ordered[0])
+    names: dict[str, None] = {}
+    for doc in ordered:
+        for name in _names(doc):
+            names.setdefault(name, None)
+    primary["phone_numbers"] = _union_joined(doc.get("phone_numbers") for doc in ordered)
+    primary["social_links"] = _union_joined(doc.get("social_links") for doc in ordered)
+    primary["address"] = next((doc["address"] for doc in ordered if doc.get("address")), None)
+    for field in ("company_commercial_name", "company_legal_name"):
+        primary[field] = next((doc[field] for doc in ordered if doc.get(field)), None)
+    primary["company_all_available_names"] = NAME_SEPARATOR.join(names) or None
+    primary.update(key_fields(primary))
+    primary["domain_aliases"] = sorted({normalize_domain(doc.get("domain")) for doc in ordered[1:]}
+                                       - {primary["domain_key"], ""})
+    return primary
+
+
+def deduplicate(docs: list[dict]) -> tuple[list[dict], list[list[str]]]:
+    """(canonical profiles, clusters of more than one domain). Records without a domain pass through."""
+    records = [Record(position, doc) for position, doc in enumerate(docs)]
+    blocks = key_blocks(records)
+    blocks += lsh_blocks(minhash_signatures([record.tokens for record in records]))
+
+    union_find = UnionFind(len(docs))
+    for i, j in candidate_pairs(records, blocks):
+        if docs[i].get("domain") and docs[j].get("domain") and is_match(records[i], records[j]):
+            union_find.union(i, j)
+
+    clusters: dict[int, list[int]] = defaultdict(list)
+    for position in range(len(docs)):
+        clusters[union_find.find(position)].append(position)
+
+    profiles, merged = [], []
+    for members in clusters.values():
+        if len(members) == 1:
+            profiles.append({**docs[members[0]], "domain_aliases": []})
+            continue
+        profiles.append(canonical_profile([docs[m] for m in members]))
+        merged.append(sorted(docs[m]["domain"] for m in members))
+    return profiles, merged
+
+
+def dedup_file(input_path: Path, output_path: Path, clusters_path: Path = CLUSTERS) -> tuple[int, int, int]:
+    """Rewrite a merged JSON-lines file as canonical profiles; returns (records, profiles, clusters)."""
+    with open(input_path, "r", encoding="utf-8") as file:
+        docs = [json.loads(line) for line in file if line.strip()]
+    profiles, clusters = deduplicate(docs)
+    tmp = output_path.with_name(output_path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as file:
+        file.writelines(json.dumps(profile, ensure_ascii=False) + "\n" for profile in profiles)
+    tmp.replace(output_path)
+    clusters_path.write_text(json.dumps(clusters, indent=1) + "\n")
+    return len(docs), len(profiles), len(clusters)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collapse duplicate companies in a merged file.")
+    parser.add_argument("--input", type=Path, default=MERGED)
+    parser.add_argument("--output", type=Path, default=MERGED)
+    args = parser.parse_args()
+
+    records, profiles, clusters = dedup_file(args.input, args.output)
+    print(f"🧬 {records} records -> {profiles} profiles ({clusters} clusters merged) -> {args.output}")
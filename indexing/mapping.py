@@ -0,0 +1,68 @@
+import time
+
+from elasticsearch import Elasticsearch
+
+TEMPLATE_NAME = "companies"
+INDEX_PATTERNS = ["companies*"]
+
+
+def _name_field() -> dict:
+    # Analyzed text for fuzzy matching, plus a search-as-you-type subfield (edge n-grams
+    # and shingles) for prefix lookups and a keyword for exact sorting/aggregations
+    return {
+        "type": "text",
+        "fields": {
+            "prefix": {"type": "search_as_you_type"},
+            "keyword": {"type": "keyword", "ignore_above": 256},
+        },
+    }
+
+
+INDEX_TEMPLATE = {
+    "settings": {
+        "number_of_shards": 1,
+        "analysis": {
+            "normalizer": {
+                "lowercase": {"type": "custom", "filter": ["lowercase"]},
+            },
+        },
+    },
+    "mappings": {
+        "dynamic": False,
+        "properties": {
+            "domain": {"type": "keyword"},
+            "company_commercial_name": _name_field(),
+            "company_legal_name": _name_field(),
+            "company_all_available_names": _name_field(),
+            "phone_numbers": {"type": "text"},
+            "social_links": {"type": "text"},
+            "address": {"type": "text"},
+            # Exact-match keys, filled at ingest from indexing.normalize.key_fields
+            "domain_key": {"type": "keyword", "normalizer": "lowercase"},
+            "phone_digits": {"type": "keyword"},
+            "facebook_handles": {"type": "keyword", "normalizer": "lowercase"},
+            # Other domains of the same business, folded in by indexing.dedup
+            "domain_aliases": {"type": "keyword", "normalizer": "lowercase"},
+        },
+    },
+}
+
+
+def ensure_index_template(es: Elasticsearch):
+    """Install (or update) the template applied to every `companies*` index at creation."""
+    es.indices.put_index_template(
+        name=TEMPLATE_NAME, index_patterns=INDEX_PATTERNS, template=INDEX_TEMPLATE, priority=100
+    )
+
+
+def bump_generation(es: Elasticsearch, index_name: str) -> int:
+    """Stamp a new generation into the index's mapping `_meta`; readers (the API match cache) drop
+    anything they cached from an older generation."""
+    generation = time.time_ns()
+    es.indices.put_mapping(index=index_name, meta={"generation": generation})
+    return generation
+
+
+def generation_of(mapping: dict):
+    """The generation from a get_mapping response, or None for an index never stamped."""
+    return next(iter(mapping.values()))["mappings"].get("_meta", {}).get("generation")
@@ -1,11 +1,22 @@
 from pathlib import Path
+import argparse
+import hashlib
+import json
+from collections.abc import MutableMapping
 import pandas as pd
 from urllib.parse import urlparse
 
+from indexing.dedup import CLUSTERS, dedup_file
+from indexing.normalize import key_fields
+from scraper.kvstore import SqliteDict
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 SCRAPED_DATA = BASE_DIR / "data" / "scraped_data.csv"
 SAMPLE = BASE_DIR / "data" / "sample-websites-company-names.csv"
 MERGED = BASE_DIR / "data" / "merged_companies.json"
+# domain -> fingerprint of the record last merged, and the pending changes for store.py --delta
+FINGERPRINTS = BASE_DIR / "data" / "merge_fingerprints.sqlite"
+DELTA = BASE_DIR / "data" / "merged_delta.json"
 
 # Extract domain from df1
 def extract_domain(url):
@@ -15,14 +26,10 @@ def extract_domain(url):
     except:
         return ''
 
-if __name__ == "__main__":
-
-    # Load both datasets
-    df_scraped = pd.read_csv(SCRAPED_DATA)
-    df_sample = pd.read_csv(SAMPLE)
 
+def merge_frames(df_scraped: pd.DataFrame, df_sample: pd.DataFrame) -> pd.DataFrame:
     # Extract domain in df_scraped for merging
-    df_scraped['domain'] = df_scraped['domain'].apply(extract_domain)
+    df_scraped = df_scraped.assign(domain=df_scraped['domain'].apply(extract_domain))
 
     # Select only necessary columns from each to avoid duplicates and control final structure
     df_scraped_reduced = df_scraped[['domain', 'phone_numbers', 'social_links', 'address']]
@@ -31,7 +38,76 @@ if __name__ == "__main__":
     # Merge with full outer join on 'domain'
     merged_df = pd.merge(df_scraped_reduced, df_sample_reduced, on='domain', how='outer')
 
+    # Normalized exact-match keys (keyword fields in the index mapping)
+    keys = pd.DataFrame([key_fields(record) for record in merged_df.to_dict("records")], index=merged_df.index)
+    return pd.concat([merged_df, keys], axis=1)
+
+
+def record_fingerprint(doc: dict) -> str:
+    """Stable hash of a merged record; key order and float formatting cannot change it."""
+    canonical = json.dumps(doc, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+
+def write_delta(docs, fingerprints: MutableMapping, delta_path: Path) -> dict[str, int]:
+    """Append upserts for new/changed domains and deletes for vanished ones to `delta_path`.
+
+    The delta is appended, not overwritten, so merges run before the indexer catches up all
+    reach it; fingerprints only advance once their delta line is on disk.
+    """
+    latest = {doc["domain"]: doc for doc in docs if doc.get("domain")}
+    counts = {"inserted": 0, "changed": 0, "deleted": 0, "unchanged": 0}
+    updates = {}
+    with open(delta_path, "a", encoding="utf-8") as delta:
+        for domain, doc in latest.items():
+            fingerprint = record_fingerprint(doc)
+            previous = fingerprints.get(domain)
+            if previous == fingerprint:
+                counts["unchanged"] += 1
+                continue
+            counts["changed" if previous else "inserted"] += 1
+            delta.write(json.dumps({"op": "upsert", "domain": domain, "doc": doc}, ensure_ascii=False) + "\n")
+            updates[domain] = fingerprint
+        deleted = [domain for domain in fingerprints if domain not in latest]
+        for domain in deleted:
+            delta.write(json.dumps({"op": "delete", "domain": domain}) + "\n")
+        counts["deleted"] = len(deleted)
+
+    for domain, fingerprint in updates.items():
+        fingerprints[domain] = fingerprint
+    for domain in deleted:
+        del fingerprints[domain]
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge scraped data with company names and emit the change delta.")
+    parser.add_argument("--full", action="store_true",
+                        help="forget previous fingerprints and pending delta (pair with a full store.py load)")
+    parser.add_argument("--no-dedup", action="store_true", help="keep one record per domain, even for duplicates")
+    args = parser.parse_args()
+
+    # Load both datasets
+    df_scraped = pd.read_csv(SCRAPED_DATA)
+    df_sample = pd.read_csv(SAMPLE)
+    merged_df = merge_frames(df_scraped, df_sample)
+
     # Save for ElasticSearch ingestion
     merged_df.to_json(MERGED, orient="records", lines=True)
-
     print(f"✅ Merged data saved with {len(merged_df)} records.")
+
+    # Collapse businesses listed under several domains before anything is indexed
+    if not args.no_dedup:
+        records, profiles, clusters = dedup_file(MERGED, MERGED)
+        print(f"🧬 Dedup: {records} records -> {profiles} profiles, {clusters} clusters merged (see {CLUSTERS})")
+
+    # Fingerprint exactly what the indexer will read back from the merged file
+    fingerprints = SqliteDict(FINGERPRINTS, "merge_fingerprints")
+    if args.full:
+        fingerprints.clear()
+        DELTA.unlink(missing_ok=True)
+    with open(MERGED, "r") as file:
+        counts = write_delta((json.loads(line) for line in file), fingerprints, DELTA)
+    fingerprints.close()
+    print(f"🧮 Delta: {counts['inserted']} inserted, {counts['changed']} changed, {counts['deleted']} deleted, "
+          f"{counts['unchanged']} unchanged → {DELTA}")
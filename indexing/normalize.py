@@ -0,0 +1,107 @@
+import re
+from urllib.parse import urlparse, parse_qs, unquote
+
+_NON_DIGITS = re.compile(r"\D")
+_SCHEME = re.compile(r"^(?:https?:?/*)+", re.IGNORECASE)
+# facebook.com paths that are not a page/profile handle
+_FACEBOOK_NON_HANDLES = {"", "sharer", "sharer.php", "share", "share.php", "dialog", "plugins", "tr", "login",
+                         "watch", "events", "hashtag", "groups", "#"}
+
+
+def split_joined(value) -> list[str]:
+    """Values the scraper stores as '; '-joined strings (or missing) as a list."""
+    if isinstance(value, list):
+        return [v for v in value if v]
+    if not isinstance(value, str):
+        return []
+    return [part.strip() for part in value.split(";") if part.strip()]
+
+
+def normalize_phone(phone: str | None) -> str:
+    """Digits only, with the US/Canada country code dropped: '+1 (626) 483-6280' -> '6264836280'."""
+    # Blank CSV cells reach here as NaN floats
+    digits = _NON_DIGITS.sub("", phone if isinstance(phone, str) else "")
+    if len(digits) == 11 and digits.startswith("1"):
+        digits = digits[1:]
+    return digits if len(digits) >= 7 else ""
+
+
+def normalize_domain(url: str | None) -> str:
+    """Bare lower-case host: 'https://www.Acme.com/about' -> 'acme.com'."""
+    if not isinstance(url, str) or not url:
+        return ""
+    host = _SCHEME.sub("", url.strip().lower())
+    host = re.split(r"[/?#:]", host, maxsplit=1)[0].rstrip(".")
+    return host[4:] if host.startswith("www.") else host
+
+
+def facebook_handle(url: str | None) -> str:
+    """Page/profile handle from a Facebook URL: 'https://www.facebook.com/Acme-123/' -> 'acme-123'."""
+    if not isinstance(url, str) or "facebook.com" not in url.lower():
+        return ""
+    # Old hashbang links: facebook.com/home.php#!/pages/<name>/<id>
+    url = unquote(url).replace("#!/", "/")
+    parsed = urlparse(url if "://" in url else f"https://{url}")
+    if "facebook.com" not in parsed.netloc.lower():
+        return ""
+    segments = [s for s in parsed.path.split("/") if s]
+    if segments and segments[0] == "home.php":
+        segments = segments[1:]
+    if segments and segments[0] == "profile.php":
+        return parse_qs(parsed.query).get("id", [""])[0]
+    if segments and segments[0] in ("pages", "pg", "people"):
+        # /pages/<name>/<id>: the numeric id is the stable part
+        return segments[-1].lower() if len(segments) > 1 else ""
+    if not segments or segments[0].lower() in _FACEBOOK_NON_HANDLES:
+        return ""
+    return segments[0].lower()
+
+
+def key_fields(doc: dict) -> dict:
+    """Exact-match keys indexed next to a company record (keyword fields in the mapping)."""
+    phones = {normalize_phone(p) for p in split_joined(doc.get("phone_numbers"))}
+    handles = {facebook_handle(link) for link in split_joined(doc.get("social_links"))}
+    return {
+        "domain_key": normalize_domain(doc.get("domain")),
+        "phone_digits": sorted(p for p in phones if p),
+        "facebook_handles": sorted(h for h in handles if h),
+    }
+
+
+# Legal forms and filler words that say nothing about which business a name refers to
+NAME_STOPWORDS = {"inc", "llc", "ltd", "co", "corp", "corporation", "company", "the", "and", "of", "pc", "pllc",
+                  "lp", "llp", "plc", "gmbh", "incorporated", "limited"}
+_NAME_TOKEN = re.compile(r"[a-z0-9]+")
+# Path segments on social sites that are not an account
+_SOCIAL_NON_HANDLES = {"share", "sharer", "intent", "home", "p", "watch", "hashtag", "explore", "search", "embed"}
+
+
+def name_tokens(name: str | None) -> set[str]:
+    """Distinctive lower-case words of a company name: 'The Acme Co., Inc.' -> {'acme'}."""
+    return {token for token in _NAME_TOKEN.findall((name or "").lower()) if token not in NAME_STOPWORDS}
+
+
+def social_handle(url: str | None) -> str:
+    """'<platform>:<account>' for a social profile link, '' for anything else.
+
+    'https://www.linkedin.com/company/Acme/' -> 'linkedin:acme', facebook via facebook_handle.
+    """
+    if not url:
+        return ""
+    handle = facebook_handle(url)
+    if handle:
+        return f"facebook:{handle}"
+    parsed = urlparse(url if "://" in url else f"https://{url}")
+    host = parsed.netloc.lower()
+    segments = [s.lower() for s in parsed.path.split("/") if s]
+    for platform in ("linkedin", "twitter", "instagram", "youtube"):
+        if f"{platform}.com" in host:
+            break
+    else:
+        return ""
+    if platform == "linkedin" or (platform == "youtube" and segments and segments[0] in ("channel", "c", "user")):
+        # linkedin.com/company/<slug>, linkedin.com/in/<slug>, youtube.com/channel/<id>
+        segments = segments[1:]
+    if not segments or segments[0] in _SOCIAL_NON_HANDLES:
+        return ""
+    return f"{platform}:{segments[0].lstrip('@')}"
@@ -1,11 +1,149 @@
 from elasticsearch import Elasticsearch, helpers
+import argparse
 import json
+import os
+import time
 from pathlib import Path
 
+from indexing.mapping import bump_generation, ensure_index_template
+from indexing.merge import DELTA
+from indexing.normalize import key_fields
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 MERGED = BASE_DIR / "data" / "merged_companies.json"
+# Readers (the API) use this name; it is an alias over one timestamped index, companies-<YYYYmmddHHMMSS>
+INDEX_NAME = "companies"
+
+# Documents per _bulk request and concurrent bulk requests
+CHUNK_SIZE = 1000
+THREADS = 4
+
+
+def iter_actions(path: Path, index_name: str):
+    """Stream bulk actions from the merged JSON lines; `domain` is the document id."""
+    with open(path, "r") as file:
+        for line in file:
+            doc = json.loads(line)
+            if not doc.get("domain"):
+                continue
+            # Older merged files predate the key fields; derive them here too
+            if "domain_key" not in doc:
+                doc.update(key_fields(doc))
+            # Same id on every run, so a rerun overwrites instead of duplicating
+            yield {"_op_type": "index", "_index": index_name, "_id": doc["domain"], "_source": doc}
+
+
+def iter_delta_actions(path: Path, index_name: str):
+    """Bulk actions for a merge delta; only the last operation per domain is sent, so order across
+    parallel chunks cannot matter."""
+    latest = {}
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                change = json.loads(line)
+                latest[change["domain"]] = change
+    for domain, change in latest.items():
+        if change["op"] == "delete":
+            yield {"_op_type": "delete", "_index": index_name, "_id": domain}
+        else:
+            doc = change["doc"]
+            if "domain_key" not in doc:
+                doc.update(key_fields(doc))
+            yield {"_op_type": "index", "_index": index_name, "_id": domain, "_source": doc}
+
+
+def apply_delta(es: Elasticsearch, path: Path, index_name: str = INDEX_NAME,
+                chunk_size: int = CHUNK_SIZE) -> tuple[int, int]:
+    """Apply a merge delta in place; returns (applied, failed). Deleting an absent document is not a failure."""
+    applied = failed = 0
+    for ok, item in helpers.streaming_bulk(es, iter_delta_actions(path, index_name), chunk_size=chunk_size,
+                                           raise_on_error=False, raise_on_exception=False):
+        result = next(iter(item.values()))
+        if ok or (result.get("status") == 404 and result.get("result") == "not_found"):
+            applied += 1
+        else:
+            failed += 1
+            print("[ERROR] Delta item failed:", item)
+    es.indices.refresh(index=index_name)
+    return applied, failed
+
+
+def swap_alias(es: Elasticsearch, alias: str, new_index: str) -> list[str]:
+    """Point `alias` at `new_index` in one atomic update; returns the indices it was taken from.
+
+    A concrete index still named like the alias (from before aliases were used) is dropped in the
+    same update, so readers never see the name missing.
+    """
+    actions = [{"add": {"index": new_index, "alias": alias}}]
+    previous = []
+    if es.indices.exists_alias(name=alias):
+        previous = [name for name in es.indices.get_alias(name=alias) if name != new_index]
+        actions = [{"remove": {"index": name, "alias": alias}} for name in previous] + actions
+    elif es.indices.exists(index=alias):
+        actions = [{"remove_index": {"index": alias}}] + actions
+    es.indices.update_aliases(actions=actions)
+    return previous
+
+
+def _load_settings(es: Elasticsearch, index_name: str) -> dict:
+    current = es.indices.get_settings(index=index_name)[index_name]["settings"]["index"]
+    # Missing keys mean "default"; putting None back restores the default
+    return {
+        "refresh_interval": current.get("refresh_interval"),
+        "number_of_replicas": current.get("number_of_replicas"),
+    }
+
+
+def bulk_load(es: Elasticsearch, actions, index_name: str = INDEX_NAME, chunk_size: int = CHUNK_SIZE,
+              threads: int = THREADS) -> tuple[int, int]:
+    """Bulk index `actions` with refresh and replicas off for the duration; returns (indexed, failed)."""
+    original = _load_settings(es, index_name)
+    es.indices.put_settings(index=index_name, settings={"refresh_interval": "-1", "number_of_replicas": 0})
+    indexed = failed = 0
+    try:
+        if threads > 1:
+            results = helpers.parallel_bulk(es, actions, chunk_size=chunk_size, thread_count=threads,
+                                            raise_on_error=False)
+        else:
+            results = helpers.streaming_bulk(es, actions, chunk_size=chunk_size, raise_on_error=False)
+        for ok, item in results:
+            if ok:
+                indexed += 1
+            else:
+                failed += 1
+                print("[ERROR] Bulk item failed:", item)
+    finally:
+        es.indices.put_settings(index=index_name, settings=original)
+        es.indices.refresh(index=index_name)
+    return indexed, failed
+
+
+def full_rebuild(es: Elasticsearch, path: Path = MERGED, alias: str = INDEX_NAME, chunk_size: int = CHUNK_SIZE,
+                 threads: int = THREADS, keep_old: bool = False) -> tuple[str, int, int]:
+    """Load everything into a fresh index and swap the alias over to it; returns (index, indexed, failed)."""
+    new_index = f"{alias}-{time.strftime('%Y%m%d%H%M%S')}"
+    # The index template carries the explicit mapping; it applies when the index is created
+    ensure_index_template(es)
+    es.indices.create(index=new_index)
+    indexed, failed = bulk_load(es, iter_actions(path, new_index), new_index, chunk_size, threads)
+    # Stamp before the swap, so the API sees the new generation together with the new data
+    bump_generation(es, new_index)
+    previous = swap_alias(es, alias, new_index)
+    if not keep_old:
+        for name in previous:
+            es.indices.delete(index=name)
+    return new_index, indexed, failed
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk load merged company records into Elasticsearch.")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="documents per bulk request")
+    parser.add_argument("--threads", type=int, default=THREADS, help="parallel bulk requests (1 = streaming)")
+    parser.add_argument("--delta", action="store_true",
+                        help=f"apply only the changes merge.py recorded in {DELTA.name} to the live index")
+    parser.add_argument("--keep-old", action="store_true", help="keep the previous index after a full rebuild")
+    args = parser.parse_args()
+
     # Connect to Elasticsearch
     es = Elasticsearch("http://localhost:9200")
     try:
@@ -13,18 +151,26 @@ if __name__ == "__main__":
     except Exception as e:
         print("Connection error:", e)
 
-    # Specify target index name
-    index_name = "companies"
-
-    # Create index with default settings if it doesn't exist
-    if not es.indices.exists(index=index_name):
-        es.indices.create(index=index_name)
-
-    # Read and index each JSON line
-    with open(MERGED, "r") as file:
-        for line in file:
-            doc = json.loads(line)
-            es.index(index=index_name, document=doc)
-
-    print("Data indexing completed successfully.")
-
+    start = time.perf_counter()
+    if args.delta:
+        if not DELTA.exists():
+            print(f"Nothing to apply: {DELTA} does not exist.")
+            raise SystemExit(0)
+        applied, failed = apply_delta(es, DELTA, INDEX_NAME, args.chunk_size)
+        elapsed = time.perf_counter() - start
+        if failed:
+            # Keep the delta; rerunning it is safe because every operation is idempotent
+            print(f"[WARN] {failed} delta operations failed; {DELTA} kept for a retry.")
+        else:
+            os.remove(DELTA)
+        # Tells the API its cached matches are stale
+        bump_generation(es, INDEX_NAME)
+        print(f"Delta applied: {applied} operations, {failed} failed in {elapsed:.2f}s.")
+    else:
+        new_index, indexed, failed = full_rebuild(es, MERGED, INDEX_NAME, args.chunk_size, args.threads,
+                                                  args.keep_old)
+        elapsed = time.perf_counter() - start
+        # The full load already contains every pending change
+        DELTA.unlink(missing_ok=True)
+        print(f"Data indexing completed into {new_index} (alias '{INDEX_NAME}'): {indexed} indexed, "
+              f"{failed} failed in {elapsed:.2f}s ({indexed / elapsed if elapsed else 0:.0f} docs/sec).")
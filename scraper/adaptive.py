@@ -0,0 +1,189 @@
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+# Global limit on in-flight requests; starts where hand tuning left it (see README)
+INITIAL_CONCURRENCY = 20
+MIN_CONCURRENCY = 4
+MAX_CONCURRENCY = 200
+
+# Per scheme + hostname, so the URL variants a domain races each get their own limiter;
+# starts at one slot per variant so a host's first requests are never queued
+INITIAL_HOST_CONCURRENCY = 4
+MAX_HOST_CONCURRENCY = 8
+
+# Timeouts derived from observed latency: TIMEOUT_FACTOR x p95, clamped
+DEFAULT_TIMEOUT = 45
+MIN_TIMEOUT = 5
+MAX_TIMEOUT = 60
+TIMEOUT_FACTOR = 3
+MIN_LATENCY_SAMPLES = 20
+MIN_HOST_SAMPLES = 5
+
+# Multiplicative decrease, applied at most once per DECREASE_COOLDOWN per limiter
+DECREASE_FACTOR = 0.7
+DECREASE_COOLDOWN = 2.0
+# The global limit only reacts to aggregate signals, taken over the last CONGESTION_WINDOW
+# outcomes from hosts that have answered before (a dead host's timeouts say nothing about us):
+# it shrinks when more than CONGESTION_ERROR_RATE of them failed, or when the recent latency
+# p50 is LATENCY_INFLATION x the lowest p50 seen so far
+CONGESTION_WINDOW = 100
+MIN_CONGESTION_SAMPLES = 20
+CONGESTION_ERROR_RATE = 0.25
+LATENCY_WINDOW = 50
+LATENCY_INFLATION = 3.0
+
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+
+
+def _percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class _Limiter:
+    """Semaphore whose limit can move while requests are in flight (AIMD)."""
+
+    def __init__(self, limit: float, minimum: float, maximum: float, slow_start: bool = False):
+        self.limit = limit
+        self.minimum = minimum
+        self.maximum = maximum
+        # Until the first decrease, grow by one per success (doubling per window), like TCP slow start
+        self.slow_start = slow_start
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def increase(self):
+        # Otherwise +1 per `limit` successes, i.e. roughly +1 per round trip of the whole window
+        step = 1 if self.slow_start else 1 / max(1.0, self.limit)
+        self.limit = min(self.maximum, self.limit + step)
+
+    def decrease(self) -> bool:
+        now = time.monotonic()
+        if now - self._last_decrease < DECREASE_COOLDOWN:
+            return False
+        self.limit = max(self.minimum, self.limit * DECREASE_FACTOR)
+        self._last_decrease = now
+        self.slow_start = False
+        return True
+
+
+class AdaptiveController:
+    """Sets global and per-host concurrency and per-request timeouts from what the hosts do.
+
+    A host's limit grows additively while it answers and shrinks multiplicatively on its
+    timeouts, 429s and 5xx. The global limit ignores single hosts: it grows while the crawl
+    as a whole is healthy and shrinks only on aggregate congestion (see CONGESTION_WINDOW).
+    Timeouts follow the observed latency p95 of the host (or of all hosts until a host has
+    enough samples).
+    """
+
+    def __init__(self, initial: int = INITIAL_CONCURRENCY):
+        self._global = _Limiter(initial, MIN_CONCURRENCY, MAX_CONCURRENCY, slow_start=True)
+        self._hosts: dict[str, _Limiter] = {}
+        self._host_latency: dict[str, deque] = {}
+        self._host_errors: dict[str, int] = {}
+        self._latency = deque(maxlen=500)
+        self._outcomes = deque(maxlen=CONGESTION_WINDOW)
+        self._latency_floor: float | None = None
+
+    def _key(self, url: str) -> str:
+        # Per hostname, not per IP: CDNs and shared hosting put thousands of unrelated sites on one address
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.hostname}" if parsed.hostname else url
+
+    def _host(self, key: str) -> _Limiter:
+        if key not in self._hosts:
+            self._hosts[key] = _Limiter(INITIAL_HOST_CONCURRENCY, 1, MAX_HOST_CONCURRENCY)
+        return self._hosts[key]
+
+    @property
+    def limit(self) -> int:
+        return int(self._global.limit)
+
+    def timeout_for(self, url: str) -> float:
+        samples = self._host_latency.get(self._key(url))
+        if not samples or len(samples) < MIN_HOST_SAMPLES:
+            samples = self._latency
+            if len(samples) < MIN_LATENCY_SAMPLES:
+                return DEFAULT_TIMEOUT
+        return min(MAX_TIMEOUT, max(MIN_TIMEOUT, TIMEOUT_FACTOR * _percentile(samples, 0.95)))
+
+    def backoff_delay(self, url: str, attempt: int) -> float:
+        """Exponential backoff with full jitter, longer for hosts that keep failing."""
+        streak = self._host_errors.get(self._key(url), 0)
+        ceiling = min(BACKOFF_CAP, BACKOFF_BASE * 2 ** (attempt - 1 + streak))
+        return random.uniform(0, ceiling)
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        # Wait on the host first so a busy host does not sit on global slots
+        host = self._host(self._key(url))
+        await host.acquire()
+        try:
+            await self._global.acquire()
+            try:
+                yield
+            finally:
+                await self._global.release()
+        finally:
+            await host.release()
+
+    def _congested(self) -> bool:
+        """Aggregate congestion: failures spread over answering hosts, or latency inflating everywhere."""
+        if len(self._outcomes) >= MIN_CONGESTION_SAMPLES:
+            failing_hosts = {key for key, failed in self._outcomes if failed}
+            failure_rate = sum(failed for _, failed in self._outcomes) / len(self._outcomes)
+            # One struggling host can fill the window by itself; it takes several to mean "us"
+            if failure_rate > CONGESTION_ERROR_RATE and len(failing_hosts) > 2:
+                return True
+        if len(self._latency) >= LATENCY_WINDOW:
+            recent = _percentile(list(self._latency)[-LATENCY_WINDOW:], 0.5)
+            self._latency_floor = recent if self._latency_floor is None else min(self._latency_floor, recent)
+            return recent > LATENCY_INFLATION * max(self._latency_floor, 0.01)
+        return False
+
+    def record(self, url: str, status: int | None, latency: float, timed_out: bool = False):
+        key = self._key(url)
+        host = self._host(key)
+        overloaded = timed_out or status == 429 or (status is not None and status >= 500)
+        # Only hosts that have answered before take part in the global signal
+        answered_before = key in self._host_latency
+
+        if overloaded:
+            self._host_errors[key] = self._host_errors.get(key, 0) + 1
+            host.decrease()
+            if answered_before:
+                self._outcomes.append((key, True))
+        else:
+            self._host_errors.pop(key, None)
+            self._latency.append(latency)
+            self._host_latency.setdefault(key, deque(maxlen=50)).append(latency)
+            self._outcomes.append((key, False))
+            host.increase()
+
+        if self._congested():
+            self._global.decrease()
+        elif not overloaded:
+            self._global.increase()
+
+    def summary(self) -> str:
+        p50 = _percentile(self._latency, 0.5) if self._latency else 0.0
+        p95 = _percentile(self._latency, 0.95) if self._latency else 0.0
+        return (f"🎛️ Adaptive concurrency: limit={self.limit} hosts={len(self._hosts)} "
+                f"latency p50={p50:.2f}s p95={p95:.2f}s")
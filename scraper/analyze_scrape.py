@@ -1,34 +1,148 @@
+import argparse
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 from pathlib import Path
 
+from scraper.scrape_store import read_scrape_store, scrape_store_rows
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 SCRAPED_CSV = BASE_DIR / "data" / "scraped_data.csv"
+FAILED_CSV = BASE_DIR / "data" / "failed_domains.csv"
 INPUT_CSV = BASE_DIR / "data" / "sample-websites.csv"
+SCRAPE_STORE = BASE_DIR / "data" / "scrape"
+
+# Only these columns are read from the store; url, domain and scraped_at stay on disk
+STORE_COLUMNS = ["result", "http_status", "phone_numbers", "social_links", "address", "fetch_seconds",
+                 "total_seconds"]
+QUANTILES = [0.5, 0.9, 0.99]
+
+
+def _rate(count: int, total: int) -> float:
+    return count / total * 100 if total else 0
+
+
+def _latency(column: pa.ChunkedArray) -> dict[str, float]:
+    if column.null_count == len(column):
+        return {}
+    values = pc.quantile(column, q=QUANTILES).to_pylist()
+    summary = {f"p{int(q * 100)}": round(value, 3) for q, value in zip(QUANTILES, values)}
+    summary["max"] = round(pc.max(column).as_py(), 3)
+    return summary
+
+
+def metrics_from_store(directory: Path) -> dict:
+    """Fill rates, failure breakdown and latency quantiles, computed column-wise over the store."""
+    table = read_scrape_store(directory, columns=STORE_COLUMNS)
+    result = pc.cast(table["result"], pa.string())
+    scraped = table.filter(pc.equal(result, "scraped"))
+    failed = table.filter(pc.not_equal(result, "scraped"))
+
+    breakdown = failed.group_by(["result", "http_status"]).aggregate([([], "count_all")])
+    failures = sorted(
+        ((row["result"], row["http_status"], row["count_all"]) for row in breakdown.to_pylist()),
+        key=lambda item: -item[2],
+    )
+    def count(mask) -> int:
+        return pc.sum(pc.fill_null(mask, False)).as_py() or 0
 
-def compute_metrics():
-    df_scraped = pd.read_csv(SCRAPED_CSV)
-    df_input = pd.read_csv(INPUT_CSV)
+    return {
+        "finished": table.num_rows,
+        "scraped": scraped.num_rows,
+        "phone_fill": count(pc.greater(pc.list_value_length(scraped["phone_numbers"]), 0)),
+        "social_fill": count(pc.greater(pc.list_value_length(scraped["social_links"]), 0)),
+        "address_fill": count(pc.greater(pc.utf8_length(pc.utf8_trim_whitespace(scraped["address"])), 0)),
+        "failures": failures,
+        "fetch_seconds": _latency(scraped["fetch_seconds"]),
+        "total_seconds": _latency(table["total_seconds"]),
+    }
 
-    total_domains = len(df_input)
-    scraped_domains = len(df_scraped)
 
-    coverage = scraped_domains / total_domains * 100
+def metrics_from_csv(scraped_csv: Path, failed_csv: Path) -> dict:
+    """Same fill rates from the CSV outputs (runs older than the store); no timings there."""
+    df_scraped = pd.read_csv(scraped_csv, dtype=str)
 
-    phone_fill = df_scraped['phone_numbers'].apply(lambda x: isinstance(x, str) and x.strip() != "").sum()
-    phone_fill_rate = phone_fill / scraped_domains * 100 if scraped_domains else 0
+    def filled(column: str) -> int:
+        return int(df_scraped[column].fillna("").str.strip().ne("").sum())
 
-    social_fill = df_scraped['social_links'].apply(lambda x: isinstance(x, str) and x.strip() != "").sum()
-    social_fill_rate = social_fill / scraped_domains * 100 if scraped_domains else 0
+    failures = []
+    if failed_csv.exists():
+        statuses = pd.read_csv(failed_csv, usecols=["http_status"], dtype=str)["http_status"]
+        failures = [("failed", None if pd.isna(status) else int(float(status)), int(count))
+                    for status, count in statuses.value_counts(dropna=False).items()]
+    return {
+        "finished": len(df_scraped) + sum(count for _, _, count in failures),
+        "scraped": len(df_scraped),
+        "phone_fill": filled("phone_numbers"),
+        "social_fill": filled("social_links"),
+        "address_fill": filled("address"),
+        "failures": failures,
+        "fetch_seconds": {},
+        "total_seconds": {},
+    }
 
-    address_fill = df_scraped['address'].apply(lambda x: isinstance(x, str) and x.strip() != "").sum()
-    address_fill_rate = address_fill / scraped_domains * 100 if scraped_domains else 0
+
+def _csv_rows(scraped_csv: Path, failed_csv: Path) -> int | None:
+    """Rows across the CSV outputs; None when there are none to check the store against."""
+    if not scraped_csv.exists():
+        return None
+    rows = len(pd.read_csv(scraped_csv, usecols=["domain"]))
+    if failed_csv.exists():
+        rows += len(pd.read_csv(failed_csv, usecols=["domain"]))
+    return rows
+
+
+def store_matches_csv(store: Path, scraped_csv: Path, failed_csv: Path) -> bool:
+    """Whether the store can be trusted: every part readable and as many rows as the CSV outputs.
+
+    A crash loses the store's buffered rows but not the CSVs', so after an interrupted run the
+    CSVs are the complete record.
+    """
+    if not any(store.glob("part-*.parquet")):
+        return False
+    stored = scrape_store_rows(store)
+    if stored is None:
+        print(f"[WARN] {store} has an unreadable part file; analyzing the CSV outputs instead")
+        return False
+    expected = _csv_rows(scraped_csv, failed_csv)
+    if expected is not None and stored != expected:
+        print(f"[WARN] {store} holds {stored} rows but the CSV outputs hold {expected} (interrupted run?); "
+              "analyzing the CSV outputs instead")
+        return False
+    return True
+
+
+def compute_metrics(store: Path = SCRAPE_STORE, scraped_csv: Path = SCRAPED_CSV, failed_csv: Path = FAILED_CSV,
+                    input_csv: Path = INPUT_CSV, use_store: bool = True) -> dict:
+    if use_store and store_matches_csv(store, scraped_csv, failed_csv):
+        metrics = metrics_from_store(store)
+    else:
+        metrics = metrics_from_csv(scraped_csv, failed_csv)
+    metrics["total_domains"] = len(pd.read_csv(input_csv, usecols=["domain"]))
+
+    total_domains, scraped_domains = metrics["total_domains"], metrics["scraped"]
+    coverage = _rate(scraped_domains, total_domains)
+    phone_fill, social_fill, address_fill = metrics["phone_fill"], metrics["social_fill"], metrics["address_fill"]
 
     print("\n📊 Scrape Analysis:")
     print(f"Total domains:       {total_domains}")
     print(f"Successfully scraped: {scraped_domains} ({coverage:.2f}% coverage)")
-    print(f"Phone fill rate:     {phone_fill} / {scraped_domains} ({phone_fill_rate:.2f}%)")
-    print(f"Social link rate:    {social_fill} / {scraped_domains} ({social_fill_rate:.2f}%)")
-    print(f"Address fill rate:    {address_fill} / {scraped_domains} ({address_fill_rate:.2f}%)")
+    print(f"Phone fill rate:     {phone_fill} / {scraped_domains} ({_rate(phone_fill, scraped_domains):.2f}%)")
+    print(f"Social link rate:    {social_fill} / {scraped_domains} ({_rate(social_fill, scraped_domains):.2f}%)")
+    print(f"Address fill rate:    {address_fill} / {scraped_domains} ({_rate(address_fill, scraped_domains):.2f}%)")
+    if metrics["failures"]:
+        print("\n❌ Failures:")
+        for result, status, count in metrics["failures"]:
+            print(f"  {result:<13} status={status if status is not None else '-':<5} {count}")
+    for name in ("fetch_seconds", "total_seconds"):
+        if metrics[name]:
+            print(f"⏱️ {name}: " + ", ".join(f"{key}={value}s" for key, value in metrics[name].items()))
+    return metrics
+
 
 if __name__ == "__main__":
-    compute_metrics()
+    parser = argparse.ArgumentParser(description="Coverage, fill rates, failures and latencies of a scrape run.")
+    parser.add_argument("--store", type=Path, default=SCRAPE_STORE, help="Parquet scrape store directory")
+    parser.add_argument("--csv", action="store_true", help="analyze the CSV outputs even if a store exists")
+    args = parser.parse_args()
+    compute_metrics(store=args.store, use_store=not args.csv)
@@ -1,9 +1,22 @@
 import aiohttp
 import asyncio
+import codecs
 import re
+import ssl
+import time
+from collections.abc import MutableMapping
+from pathlib import Path
 from bs4 import BeautifulSoup
 
+from observability.metrics import REGISTRY
+from scraper.adaptive import AdaptiveController, DEFAULT_TIMEOUT
+from scraper.http_cache import HttpCache
+from scraper.kvstore import SqliteDict
+
+NOT_MODIFIED = 304
+
 PHONE_REGEX_PATTERNS = [
+    r'1-800-\d{3}-\d{4}',
     r'\+\d{1,3} \d{3} \d{3} \d{4}',
     r'\d{3}-\d{3}-\d{4}',
     r'\(\d{3}\) \d{3}-\d{4}',
@@ -12,124 +25,427 @@ PHONE_REGEX_PATTERNS = [
     r'\d{3} \d{3} \d{4}',
     r'\(\d{2}\) \d{4,5}-\d{4}',
     r'\d{10}',
-    r'1-800-\d{3}-\d{4}',
 ]
 
+# All phone formats folded into one alternation so the visible text is scanned once.
+# Every alternative is a fixed sequence of bounded digit runs, so matching stays linear.
+PHONE_REGEX = re.compile("|".join(f"(?:{pattern})" for pattern in PHONE_REGEX_PATTERNS))
+
 SOCIAL_DOMAINS = ["facebook.com", "linkedin.com", "twitter.com", "instagram.com", "youtube.com"]
 
-ADDRESS_REGEX = re.compile(r'\d{1,5}\s+\w+(\s\w+)*,\s*[A-Z]{2}\s*\d{5}')
+# Bounded word runs: each start position backtracks over at most ADDRESS_MAX_WORDS words,
+# instead of through every word of a long text block. No possessive quantifiers: the
+# deployed interpreter is Python 3.10, whose re module rejects them.
+ADDRESS_MAX_WORDS = 24
+ADDRESS_REGEX = re.compile(
+    r'\b\d{1,5}\s+\w+(?:\s\w+){0,%d},\s*[A-Z]{2}\s*\d{5}' % ADDRESS_MAX_WORDS
+)
 
-def extract_phone_numbers(html: str) -> list[str]:
-    # Parse HTML and extract visible text
-    soup = BeautifulSoup(html, "html.parser")
-    # Remove script and style tags (not visible)
+EMAIL_REGEX = re.compile(r'[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+')
+
+
+def _parse(html: str | bytes) -> BeautifulSoup:
+    """Parse a page once and drop the tags that never hold visible text.
+
+    Raw bytes go straight to lxml with the sniffed charset, so the body is decoded once.
+    """
+    if isinstance(html, bytes):
+        soup = BeautifulSoup(html, "lxml", from_encoding=getattr(html, "encoding", None))
+    else:
+        soup = BeautifulSoup(html, "lxml")
     for tag in soup(["script", "style"]):
         tag.decompose()
+    return soup
 
-    visible_text = soup.get_text(separator=" ", strip=True)
-    # Set to collect unique phone numbers
-    matches = set()
-    for pattern in PHONE_REGEX_PATTERNS:
-        regex = re.compile(pattern)
-        found = regex.findall(visible_text)
-        matches.update(found)
-    return list(matches)
 
-def extract_social_links(html: str) -> list[str]:
-    soup = BeautifulSoup(html, "lxml")
-    links = []
+def _find_phones(visible_text: str) -> list[str]:
+    return list(set(PHONE_REGEX.findall(visible_text)))
+
+
+def _find_social_links(soup: BeautifulSoup) -> list[str]:
+    links = set()
     for a in soup.find_all("a", href=True):
         href = a['href']
         if any(domain in href for domain in SOCIAL_DOMAINS):
-            links.append(href)
-    return list(set(links))
+            links.add(href)
+    return list(links)
 
-def extract_address(html: str) -> str | None:
-    soup = BeautifulSoup(html, "lxml")
-    email_pattern = re.compile(r'[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+')
-
-    # First, <address> tag
-    address_elements = soup.find_all("address")
-    for element in address_elements:
-        address_text = element.get_text(separator=" ", strip=True)
-        if address_text and not email_pattern.search(address_text):
-            return address_text
-
-    # Then, div/span with 'address' class
-    possible_address_divs = soup.find_all(
-        lambda tag: tag.name in ['div', 'span']
+
+def _is_address_class(tag) -> bool:
+    return (
+        tag.name in ['div', 'span']
         and tag.has_attr('class')
         and any('address' in cls.lower() for cls in tag['class'])
     )
-    for element in possible_address_divs:
-        address_text = element.get_text(separator=" ", strip=True)
-        if address_text and not email_pattern.search(address_text):
-            return address_text
 
-    # Finally, regex search in raw HTML text
-    match = ADDRESS_REGEX.search(soup.get_text(separator=" ", strip=True))
+
+def _find_address(soup: BeautifulSoup, visible_text: str) -> str | None:
+    # First <address> tags, then div/span with an 'address' class
+    for candidates in (soup.find_all("address"), soup.find_all(_is_address_class)):
+        for element in candidates:
+            address_text = element.get_text(separator=" ", strip=True)
+            if address_text and not EMAIL_REGEX.search(address_text):
+                return address_text
+
+    # Finally, regex search in the visible text
+    match = ADDRESS_REGEX.search(visible_text)
     if match:
         return match.group()
     return None
 
-async def _decode_response(response) -> str | None:
-    """Try to decode response text, with fallbacks on decoding errors."""
+
+def extract_page_data(html: str | bytes) -> dict:
+    """Parse the page once and run every extractor over the same tree."""
+    soup = _parse(html)
+    visible_text = soup.get_text(separator=" ", strip=True)
+    return {
+        "phone_numbers": _find_phones(visible_text),
+        "social_links": _find_social_links(soup),
+        "address": _find_address(soup, visible_text),
+    }
+
+
+def extract_phone_numbers(html: str) -> list[str]:
+    return _find_phones(_parse(html).get_text(separator=" ", strip=True))
+
+
+def extract_social_links(html: str) -> list[str]:
+    return _find_social_links(_parse(html))
+
+
+def extract_address(html: str) -> str | None:
+    soup = _parse(html)
+    return _find_address(soup, soup.get_text(separator=" ", strip=True))
+
+# Bodies are streamed and cut off at this size; contact details sit well within it
+MAX_BODY_BYTES = 2 * 1024 * 1024
+READ_CHUNK_BYTES = 64 * 1024
+# How far into the body to look for a <meta charset>
+CHARSET_SNIFF_BYTES = 4096
+META_CHARSET_REGEX = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([A-Za-z0-9_\-:.]+)', re.IGNORECASE)
+
+# Counters for what the body reader saw, reported at the end of a run
+FETCH_PHASE_SECONDS = REGISTRY.histogram(
+    "scraper_fetch_phase_seconds", "Seconds per fetch phase: dns, connect, ttfb, download, parse", ("phase",))
+FETCH_FAILURES = REGISTRY.counter(
+    "scraper_fetch_failures_total", "Failed fetch attempts by class (timeout, dns, ssl, connect, http_4xx, ...)",
+    ("reason",))
+FETCH_RETRIES = REGISTRY.counter("scraper_fetch_retries_total", "Fetch attempts repeated after a failure")
+SSL_FALLBACKS = REGISTRY.counter("scraper_ssl_fallbacks_total", "Fetches retried after an SSL error")
+CHARSET_SOURCE = REGISTRY.counter(
+    "scraper_charset_source_total", "Where page encodings came from; 'detected' is the parser's fallback detection",
+    ("source",))
+FETCHES_IN_FLIGHT = REGISTRY.gauge("scraper_fetches_in_flight", "HTTP requests currently open")
+
+body_stats = {"pages": 0, "bytes": 0, "truncated": 0, "oversized": 0,
+              "charset_header": 0, "charset_meta": 0, "charset_unknown": 0}
+
+
+class RawPage(bytes):
+    """Undecoded page body plus the charset sniffed for it; the parser decodes it once.
+
+    `url` (after redirects) and `headers` describe the response, for the page archive.
+    """
+    encoding: str | None = None
+    truncated: bool = False
+    url: str | None = None
+    headers: list[tuple[str, str]] = []
+
+
+def _known_codec(name: str | None) -> str | None:
+    if not name:
+        return None
     try:
-        return await response.text()
-    except UnicodeDecodeError:
-        print(f"[WARN] UnicodeDecodeError, trying fallback decoding.")
-        raw = await response.read()
-        for encoding in ['iso-8859-1', 'windows-1252']:
-            try:
-                return raw.decode(encoding)
-            except UnicodeDecodeError:
-                continue
-        print(f"[ERROR] Failed to decode response with fallback encodings.")
+        return codecs.lookup(name).name
+    except LookupError:
         return None
 
-async def _fetch(session: aiohttp.ClientSession, url: str, ssl_flag) -> tuple[str | None, int | None]:
-    """Single fetch attempt with specified SSL verification flag."""
-    async with session.get(url, timeout=45, ssl=ssl_flag) as response:
-        status = response.status
-        if status == 200:
-            html = await _decode_response(response)
-            return html, status
-        print(f"[WARN] {url} returned status {status}")
-        return None, status
-
-async def fetch_html(session: aiohttp.ClientSession, url: str, retries=2, delay=1) -> tuple[str | None, int | None]:
+
+def _sniff_charset(header_charset: str | None, head: bytes) -> str | None:
+    """Charset from the Content-Type header, else from a <meta> tag near the top of the page."""
+    encoding = _known_codec(header_charset)
+    if encoding:
+        body_stats["charset_header"] += 1
+        CHARSET_SOURCE.inc(source="header")
+        return encoding
+    match = META_CHARSET_REGEX.search(head[:CHARSET_SNIFF_BYTES])
+    encoding = _known_codec(match.group(1).decode("ascii", "ignore")) if match else None
+    if encoding:
+        body_stats["charset_meta"] += 1
+        CHARSET_SOURCE.inc(source="meta")
+        return encoding
+    # Left to the parser's own detection (BOM, utf-8, windows-1252)
+    body_stats["charset_unknown"] += 1
+    CHARSET_SOURCE.inc(source="detected")
+    return None
+
+
+async def _read_body(response, max_bytes: int = MAX_BODY_BYTES) -> RawPage:
+    """Stream the body up to max_bytes, stopping early instead of buffering a huge page."""
+    declared = response.content_length
+    if declared is not None and declared > max_bytes:
+        body_stats["oversized"] += 1
+
+    body = bytearray()
+    truncated = False
+    start = time.perf_counter()
+    async for chunk in response.content.iter_chunked(READ_CHUNK_BYTES):
+        body += chunk
+        if len(body) >= max_bytes:
+            truncated = len(body) > max_bytes or not response.content.at_eof()
+            del body[max_bytes:]
+            break
+    FETCH_PHASE_SECONDS.observe(time.perf_counter() - start, phase="download")
+
+    page = RawPage(body)
+    page.encoding = _sniff_charset(response.charset, page)
+    page.truncated = truncated
+    page.url, page.headers = str(response.url), list(response.headers.items())
+    body_stats["pages"] += 1
+    body_stats["bytes"] += len(page)
+    if truncated:
+        body_stats["truncated"] += 1
+    return page
+
+
+def body_stats_summary() -> str:
+    s = body_stats
+    return (f"📦 Bodies: {s['pages']} pages, {s['bytes'] / 1e6:.1f} MB, {s['truncated']} truncated, "
+            f"{s['oversized']} oversized; charset header={s['charset_header']} "
+            f"meta={s['charset_meta']} sniffed={s['charset_unknown']}")
+
+def fetch_trace_config() -> aiohttp.TraceConfig:
+    """Session hooks timing the DNS, connect and time-to-first-byte phases of every request."""
+    trace = aiohttp.TraceConfig()
+
+    async def on_request_start(session, ctx, params):
+        ctx.start = ctx.headers_sent = time.perf_counter()
+        ctx.dns = 0.0
+
+    async def on_dns_start(session, ctx, params):
+        ctx.dns_start = time.perf_counter()
+
+    async def on_dns_end(session, ctx, params):
+        ctx.dns = time.perf_counter() - ctx.dns_start
+        FETCH_PHASE_SECONDS.observe(ctx.dns, phase="dns")
+
+    async def on_connect_start(session, ctx, params):
+        ctx.connect_start = time.perf_counter()
+
+    async def on_connect_end(session, ctx, params):
+        # Connection setup minus the DNS lookup made inside it: TCP plus TLS
+        FETCH_PHASE_SECONDS.observe(time.perf_counter() - ctx.connect_start - ctx.dns, phase="connect")
+
+    async def on_headers_sent(session, ctx, params):
+        ctx.headers_sent = time.perf_counter()
+
+    async def on_request_end(session, ctx, params):
+        FETCH_PHASE_SECONDS.observe(time.perf_counter() - ctx.headers_sent, phase="ttfb")
+
+    trace.on_request_start.append(on_request_start)
+    trace.on_dns_resolvehost_start.append(on_dns_start)
+    trace.on_dns_resolvehost_end.append(on_dns_end)
+    trace.on_connection_create_start.append(on_connect_start)
+    trace.on_connection_create_end.append(on_connect_end)
+    trace.on_request_headers_sent.append(on_headers_sent)
+    trace.on_request_end.append(on_request_end)
+    return trace
+
+
+def _unverified_ssl_context() -> ssl.SSLContext:
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+# Shared by every fetch (the crawler never verifies certificates), so no request builds its own
+UNVERIFIED_SSL = _unverified_ssl_context()
+
+
+def failure_reason(error: BaseException | None = None, status: int | None = None) -> str:
+    """Failure class for metrics, from the exception raised or the HTTP status returned."""
+    if error is None:
+        if status is None:
+            return "no_status"
+        return f"http_{status // 100}xx" if 400 <= status < 600 else "http_other"
+    if isinstance(error, asyncio.TimeoutError):
+        return "timeout"
+    if isinstance(error, aiohttp.ClientConnectorDNSError):
+        return "dns"
+    if isinstance(error, (aiohttp.ClientConnectorSSLError, aiohttp.ClientSSLError)):
+        return "ssl"
+    if isinstance(error, aiohttp.ClientConnectorError):
+        return "connect"
+    if isinstance(error, aiohttp.ClientPayloadError):
+        return "payload"
+    if isinstance(error, aiohttp.ClientError):
+        return "client"
+    return "other"
+
+
+async def _fetch(session: aiohttp.ClientSession, url: str, ssl_flag, timeout: float | None = None,
+                 cache: HttpCache | None = None) -> tuple[RawPage | None, int | None]:
+    """Single fetch attempt with specified SSL verification flag; `timeout` defaults to DEFAULT_TIMEOUT.
+
+    With a cache, the request is conditional and a 304 comes back as (None, 304).
+    """
+    timeout = timeout or DEFAULT_TIMEOUT
+    request_headers = cache.conditional_headers(url) if cache is not None else None
+    with FETCHES_IN_FLIGHT.track_inprogress():
+        ssl_context = UNVERIFIED_SSL if ssl_flag is False else ssl_flag
+        async with session.get(url, timeout=timeout, ssl=ssl_context, headers=request_headers) as response:
+            status = response.status
+            if status == NOT_MODIFIED and request_headers:
+                return None, status
+            if status == 200:
+                html = await _read_body(response)
+                if cache is not None:
+                    cache.remember_response(url, str(response.url), response.headers.get("ETag"),
+                                            response.headers.get("Last-Modified"))
+                return html, status
+            print(f"[WARN] {url} returned status {status}")
+            FETCH_FAILURES.inc(reason=failure_reason(status=status))
+            return None, status
+
+
+def _is_fetched(html: RawPage | None, status: int | None) -> bool:
+    """A usable page, or confirmation that the cached one is still current."""
+    return html is not None or status == NOT_MODIFIED
+
+async def _controlled_fetch(session: aiohttp.ClientSession, url: str, ssl_flag,
+                            controller: AdaptiveController | None,
+                            cache: HttpCache | None = None) -> tuple[RawPage | None, int | None]:
+    """_fetch inside an adaptive concurrency slot, feeding the outcome back to the controller."""
+    if controller is None:
+        return await _fetch(session, url, ssl_flag=ssl_flag, cache=cache)
+    async with controller.slot(url):
+        start = time.perf_counter()
+        try:
+            html, status = await _fetch(session, url, ssl_flag=ssl_flag, timeout=controller.timeout_for(url),
+                                        cache=cache)
+        except asyncio.TimeoutError:
+            controller.record(url, None, time.perf_counter() - start, timed_out=True)
+            raise
+        controller.record(url, status, time.perf_counter() - start)
+        return html, status
+
+async def fetch_html(session: aiohttp.ClientSession, url: str, retries=2, delay=1,
+                     controller: AdaptiveController | None = None,
+                     cache: HttpCache | None = None) -> tuple[RawPage | None, int | None]:
     last_status = None
     for attempt in range(1, retries + 1):
         try:
-            html, status = await _fetch(session, url, ssl_flag=False)
+            html, status = await _controlled_fetch(session, url, False, controller, cache)
             last_status = status
-            if html is not None:
+            if _is_fetched(html, status):
                 return html, status
         except aiohttp.ClientConnectorSSLError as e:
             print(f"[SSL ERROR] {url} → {e}, retrying without SSL verification.")
+            FETCH_FAILURES.inc(reason="ssl")
+            SSL_FALLBACKS.inc()
             try:
-                html, status = await _fetch(session, url, ssl_flag=False)
+                html, status = await _controlled_fetch(session, url, False, controller, cache)
                 last_status = status
-                if html is not None:
+                if _is_fetched(html, status):
                     return html, status
             except Exception as e2:
                 print(f"[SSL RETRY FAIL] {url} → {type(e2).__name__}: {e2}")
+                FETCH_FAILURES.inc(reason=failure_reason(e2))
         except Exception as e:
             print(f"[ERROR] {url} → {type(e).__name__}: {e}")
+            FETCH_FAILURES.inc(reason=failure_reason(e))
 
         if attempt < retries:
-            await asyncio.sleep(delay * attempt)  # Exponential backoff
+            FETCH_RETRIES.inc()
+            # Jittered exponential backoff from the controller, fixed steps without one
+            await asyncio.sleep(controller.backoff_delay(url, attempt) if controller else delay * attempt)
 
     return None, last_status
 
-async def try_fetch_with_fallback(session: aiohttp.ClientSession, domain: str) -> tuple[str, str | None, int | None]:
-    for protocol in ["https://", "http://"]:
-        for prefix in ["www.", ""]:
-            url = f"{protocol}{prefix}{domain}"
-            html, status = await fetch_html(session, url)
-            if html:
-                return url, html, status
-            elif status:  # Record non-None status if no html
-                last_status = status
-    return f"https://{domain}", None, last_status if 'last_status' in locals() else None
+URL_VARIANTS = ["https://www.", "https://", "http://www.", "http://"]
+# Head start each variant gets before the next one is launched in racing mode
+RACE_STAGGER_DELAY = 1.0
+
+# domain -> URL variant prefix that answered last time; tried first on later runs
+preferred_variants: MutableMapping[str, str] = {}
+
+
+def load_preferred_variants(path: Path):
+    """Back preferred_variants with an on-disk store so it persists without growing in memory."""
+    global preferred_variants
+    preferred_variants = SqliteDict(path, "url_variants")
+
+
+def save_preferred_variants():
+    if isinstance(preferred_variants, SqliteDict):
+        preferred_variants.commit()
+
 
+def _ordered_variants(domain: str) -> list[str]:
+    preferred = preferred_variants.get(domain)
+    if preferred not in URL_VARIANTS:
+        return list(URL_VARIANTS)
+    return [preferred] + [v for v in URL_VARIANTS if v != preferred]
+
+
+async def _race_variants(session: aiohttp.ClientSession, urls: list[str], stagger: float,
+                         controller: AdaptiveController | None = None,
+                         cache: HttpCache | None = None) -> tuple[str | None, RawPage | None, int | None]:
+    """Happy-eyeballs style: start variants `stagger` seconds apart, keep the first 200, cancel the rest."""
+    pending: dict[asyncio.Task, str] = {}
+    queue = list(urls)
+    last_status = None
+    try:
+        while queue or pending:
+            if queue:
+                url = queue.pop(0)
+                pending[asyncio.create_task(fetch_html(session, url, controller=controller, cache=cache))] = url
+            # A failed attempt ends the wait early, so the next variant starts right away
+            done, _ = await asyncio.wait(
+                pending, timeout=stagger if queue else None, return_when=asyncio.FIRST_COMPLETED
+            )
+            # Several may finish together; prefer them in variant order
+            for task in sorted(done, key=lambda t: urls.index(pending[t])):
+                url = pending.pop(task)
+                try:
+                    html, status = task.result()
+                except Exception as e:
+                    print(f"[ERROR] {url} → {type(e).__name__}: {e}")
+                    continue
+                if html or status == NOT_MODIFIED:
+                    return url, html, status
+                if status:
+                    last_status = status
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+    return None, None, last_status
+
+
+async def try_fetch_with_fallback(session: aiohttp.ClientSession, domain: str, race: bool = True,
+                                  stagger: float = RACE_STAGGER_DELAY,
+                                  controller: AdaptiveController | None = None,
+                                  cache: HttpCache | None = None) -> tuple[str, RawPage | None, int | None]:
+    """Returns (url, html, status); with a cache, (url, None, 304) means the stored page is current."""
+    variants = _ordered_variants(domain)
+    urls = [f"{variant}{domain}" for variant in variants]
+
+    if race:
+        url, html, status = await _race_variants(session, urls, stagger, controller, cache)
+        if html or status == NOT_MODIFIED:
+            preferred_variants[domain] = variants[urls.index(url)]
+            return url, html, status
+        return f"https://{domain}", None, status
+
+    last_status = None
+    for variant, url in zip(variants, urls):
+        html, status = await fetch_html(session, url, controller=controller, cache=cache)
+        if html or status == NOT_MODIFIED:
+            preferred_variants[domain] = variant
+            return url, html, status
+        elif status:  # Record non-None status if no html
+            last_status = status
+    return f"https://{domain}", None, last_status
@@ -0,0 +1,214 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import aiohttp
+
+from scraper.crawler import fetch_trace_config, load_preferred_variants, save_preferred_variants
+from scraper.dns_cache import DnsCache, pre_resolve
+from scraper.extraction import ExtractionStage, EXTRACT_WORKERS
+from scraper.http_cache import HttpCache
+from scraper.render import RenderPool
+from scraper.scrape_store import ScrapeStore, clear_scrape_store
+from scraper.work_queue import WorkQueue, LEASE_SECONDS
+from scraper import run_scraper as scraper
+
+# Domains a worker leases at a time
+WORKER_BATCH = 50
+# How often an idle worker or the coordinator checks the queue again
+POLL_INTERVAL = 5.0
+# A local worker that keeps crashing is restarted at most this many times, waiting
+# RESTART_BACKOFF_BASE x 2^n seconds (capped) before restart n; a worker that ran for
+# WORKER_STABLE_SECONDS before crashing gets its budget back
+WORKER_MAX_RESTARTS = 5
+RESTART_BACKOFF_BASE = 5.0
+RESTART_BACKOFF_CAP = 300.0
+WORKER_STABLE_SECONDS = 600.0
+
+
+async def _renew_leases(queue: WorkQueue, owner: str):
+    while True:
+        await asyncio.sleep(LEASE_SECONDS / 3)
+        queue.renew(owner)
+
+
+async def run_worker(queue_path: Path, batch_size: int = WORKER_BATCH, in_flight: int = scraper.IN_FLIGHT_DOMAINS,
+                     extract_workers: int = EXTRACT_WORKERS, owner: str | None = None, render_contexts: int = 0,
+                     use_cache: bool = True, adaptive: bool = False):
+    """Lease domains from the shared queue as crawl slots free up, until the queue is drained.
+
+    At most `in_flight` domains are crawled at once, and no more than that are ever leased, so
+    one slow domain holds one slot rather than a whole batch.
+    """
+    owner = owner or f"{socket.gethostname()}-{os.getpid()}"
+    queue = WorkQueue(queue_path)
+    load_preferred_variants(scraper.VARIANTS_DB)
+    dns_cache = DnsCache(scraper.DNS_CACHE_DB)
+    http_cache = HttpCache(scraper.HTTP_CACHE_DB) if use_cache else None
+    controller, connector = scraper.make_controller(adaptive, dns_cache)
+    renderer = RenderPool(render_contexts, user_agent=scraper.headers["User-Agent"]) if render_contexts else None
+    done = 0
+
+    async def crawl(session, stage, index: int, domain: str):
+        nonlocal done
+        try:
+            row, failure = await scraper.process_domain(session, domain, index + 1, stage, controller, http_cache,
+                                                        renderer)
+        except Exception as e:
+            print(f"[ERROR] {domain} → {type(e).__name__}: {e}")
+            row, failure = None, (domain, None)
+        if row:
+            queue.complete(owner, index, scraper.csv_row(row))
+        else:
+            queue.fail(owner, index, *failure)
+        done += 1
+
+    async def start(session, stage, batch: list[tuple[int, str]]) -> set[asyncio.Task]:
+        _, unresolvable = await pre_resolve([domain for _, domain in batch], dns_cache)
+        await dns_cache.flush()
+        unresolvable = set(unresolvable)
+        tasks = set()
+        for index, domain in batch:
+            if domain in unresolvable:
+                queue.fail(owner, index, domain, None)
+            else:
+                tasks.add(asyncio.create_task(crawl(session, stage, index, domain)))
+        return tasks
+
+    renewer = asyncio.create_task(_renew_leases(queue, owner))
+    pending: set[asyncio.Task] = set()
+    try:
+        if renderer is not None:
+            await renderer.start()
+        with ExtractionStage(workers=extract_workers) as stage:
+            async with aiohttp.ClientSession(headers=scraper.headers, connector=connector, trust_env=True,
+                                             trace_configs=[fetch_trace_config()]) as session:
+                while True:
+                    free = in_flight - len(pending)
+                    batch = queue.lease(owner, min(batch_size, free)) if free > 0 else []
+                    if batch:
+                        pending |= await start(session, stage, batch)
+                        if len(pending) < in_flight:
+                            continue  # top the slots up before waiting
+                    if pending:
+                        finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                        for task in finished:
+                            task.result()  # a queue write that failed should stop the worker, not vanish
+                    elif queue.outstanding() == 0:
+                        break
+                    else:
+                        # Others still hold leases; wait in case one expires and comes back to us
+                        await asyncio.sleep(POLL_INTERVAL)
+            print(f"[{owner}] " + stage.timings.summary())
+    finally:
+        for task in pending:
+            task.cancel()
+        renewer.cancel()
+        if renderer is not None:
+            await renderer.close()
+        dns_cache.save()
+        save_preferred_variants()
+        if http_cache is not None:
+            http_cache.commit()
+        queue.close()
+    print(f"[{owner}] ✅ worker finished, {done} domains crawled")
+
+
+class _LocalWorker:
+    """A worker process started by the coordinator, restarted with backoff when it crashes."""
+
+    def __init__(self, number: int, command: list[str]):
+        self.number = number
+        self.command = command
+        self.restarts = 0
+        self.restart_at: float | None = None
+        self.given_up = False
+        self._start()
+
+    def _start(self):
+        self.started = time.monotonic()
+        self.process = subprocess.Popen(self.command, cwd=scraper.BASE_DIR)
+
+    def check(self):
+        """Schedule or carry out a restart if the process crashed; give up once the budget is spent."""
+        if self.given_up:
+            return
+        now = time.monotonic()
+        if self.restart_at is not None:
+            if now >= self.restart_at:
+                self.restart_at = None
+                self.restarts += 1
+                self._start()
+            return
+        # Workers exit cleanly only once the queue is drained; anything else is a crash
+        if self.process.poll() in (None, 0):
+            return
+        if now - self.started >= WORKER_STABLE_SECONDS:
+            self.restarts = 0
+        if self.restarts >= WORKER_MAX_RESTARTS:
+            self.given_up = True
+            print(f"[ERROR] worker {self.number} exited with {self.process.returncode} after "
+                  f"{self.restarts} restarts; not restarting it again")
+            return
+        delay = min(RESTART_BACKOFF_CAP, RESTART_BACKOFF_BASE * 2 ** self.restarts)
+        self.restart_at = now + delay
+        print(f"[WARN] worker {self.number} exited with {self.process.returncode}, restarting in {delay:.0f}s")
+
+
+def run_coordinator(queue_path: Path, workers: int, worker_args: list[str] | None = None):
+    """Queue the input domains, start local workers and export the results once the queue drains.
+
+    Workers on other hosts can join by running `run_scraper --worker <queue>` against the same file.
+    """
+    queue = WorkQueue(queue_path)
+    # The store holds the previous single-process run; until this run exports its own, it must not be read
+    clear_scrape_store(scraper.SCRAPE_STORE)
+    added = queue.enqueue(scraper.iter_domains(scraper.INPUT_CSV))
+    print(f"📥 Queued {added} new domains in {queue_path} ({queue.outstanding()} outstanding)")
+
+    command = [sys.executable, "-m", "scraper.run_scraper", "--worker", str(queue_path), *(worker_args or [])]
+    local_workers = [_LocalWorker(number, command) for number in range(workers)]
+    try:
+        while queue.outstanding():
+            print(f"📊 Queue: {queue.counts()}")
+            for worker in local_workers:
+                worker.check()
+            if local_workers and all(worker.given_up for worker in local_workers):
+                print("[ERROR] every local worker has given up; exporting what the queue holds")
+                break
+            time.sleep(POLL_INTERVAL)
+    finally:
+        for worker in local_workers:
+            worker.process.wait()
+
+    scraped, failed = queue.export(scraper.OUTPUT_CSV, scraper.FAILED_CSV)
+    stored = export_store(queue, scraper.SCRAPE_STORE)
+    queue.close()
+    print(f"\n✅ {scraped} scraped rows saved to {scraper.OUTPUT_CSV}")
+    if failed:
+        print(f"⚠️ {failed} failed domains saved to {scraper.FAILED_CSV}")
+    print(f"🗃️ {stored} result rows stored in {scraper.SCRAPE_STORE}")
+
+
+def export_store(queue: WorkQueue, directory: Path) -> int:
+    """Replace the Parquet scrape store with the queue's outcomes, so analyze_scrape reads this run.
+
+    Workers share no store (part numbering would collide), so the coordinator writes it once at
+    the end. The queue does not keep timings, so those columns stay empty.
+    """
+    store = ScrapeStore(directory)
+    try:
+        for index, domain, row, failure in queue.iter_outcomes():
+            if row is not None:
+                store.append(index, domain, "scraped", url=row["domain"],
+                             phone_numbers=scraper._as_list(row["phone_numbers"]),
+                             social_links=scraper._as_list(row["social_links"]), address=row["address"])
+            else:
+                store.append(index, domain, "failed", http_status=failure["http_status"])
+    finally:
+        store.close()
+    return store.rows
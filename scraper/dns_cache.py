@@ -0,0 +1,134 @@
+import asyncio
+import socket
+import threading
+import time
+from pathlib import Path
+
+from aiohttp.abc import AbstractResolver, ResolveResult
+from aiohttp.resolver import ThreadedResolver
+
+from scraper.kvstore import SqliteDict
+
+DNS_CONCURRENCY = 200
+DNS_TIMEOUT = 10
+POSITIVE_TTL = 24 * 3600
+NEGATIVE_TTL = 6 * 3600
+
+# getaddrinfo errors that mean "this name does not exist", as opposed to a flaky resolver
+_NXDOMAIN_ERRORS = {socket.EAI_NONAME, getattr(socket, "EAI_NODATA", socket.EAI_NONAME)}
+_NUMERIC_FLAGS = socket.AI_NUMERICHOST | socket.AI_NUMERICSERV
+
+
+class DnsCache:
+    """Host -> resolved addresses with a TTL, persisted in SQLite between runs.
+
+    An empty address list is a negative (NXDOMAIN) entry. Lookups and updates only touch an
+    in-memory dict, loaded once when the cache is opened; new entries reach SQLite in batches
+    through `flush()` (off the event loop) or `save()`.
+    """
+
+    def __init__(self, path: Path | None = None):
+        self.path = path
+        self._store = SqliteDict(path if path is not None else ":memory:", "dns")
+        now = time.time()
+        self._entries = {host: entry for host, entry in self._store.items() if entry["expires"] >= now}
+        self._dirty: dict[str, dict] = {}
+        self._write_lock = threading.Lock()
+
+    def get(self, host: str) -> list[str] | None:
+        """Cached addresses, [] for a cached NXDOMAIN, or None if unknown/expired."""
+        entry = self._entries.get(host)
+        if entry is None or entry["expires"] < time.time():
+            return None
+        return entry["addrs"]
+
+    def put(self, host: str, addrs: list[str]):
+        ttl = POSITIVE_TTL if addrs else NEGATIVE_TTL
+        entry = {"addrs": addrs, "expires": time.time() + ttl}
+        self._entries[host] = entry
+        self._dirty[host] = entry
+
+    def _write(self, entries: dict[str, dict]):
+        with self._write_lock:
+            self._store.put_many(entries)
+
+    def _take_dirty(self) -> dict[str, dict]:
+        dirty, self._dirty = self._dirty, {}
+        return dirty
+
+    async def flush(self):
+        """Write the entries added since the last flush, in one transaction on a worker thread."""
+        dirty = self._take_dirty()
+        if dirty:
+            await asyncio.to_thread(self._write, dirty)
+
+    def save(self):
+        dirty = self._take_dirty()
+        if dirty:
+            self._write(dirty)
+
+
+async def _resolve_host(host: str) -> list[str] | None:
+    """Addresses for host, [] on NXDOMAIN, None on transient errors (not cached)."""
+    loop = asyncio.get_running_loop()
+    try:
+        infos = await asyncio.wait_for(
+            loop.getaddrinfo(host, None, type=socket.SOCK_STREAM), timeout=DNS_TIMEOUT
+        )
+    except socket.gaierror as e:
+        return [] if e.errno in _NXDOMAIN_ERRORS else None
+    except (asyncio.TimeoutError, OSError):
+        return None
+    return sorted({info[4][0] for info in infos})
+
+
+async def pre_resolve(domains: list[str], cache: DnsCache, concurrency: int = DNS_CONCURRENCY) -> tuple[list[str], list[str]]:
+    """Resolve `domain` and `www.domain` for every domain concurrently.
+
+    Returns (domains worth fetching, domains where both names are NXDOMAIN).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def resolve(host: str) -> list[str] | None:
+        cached = cache.get(host)
+        if cached is not None:
+            return cached
+        async with semaphore:
+            addrs = await _resolve_host(host)
+        if addrs is not None:
+            cache.put(host, addrs)
+        return addrs
+
+    async def check(domain: str) -> bool:
+        bare, www = await asyncio.gather(resolve(domain), resolve(f"www.{domain}"))
+        return bare != [] or www != []
+
+    alive_flags = await asyncio.gather(*(check(domain) for domain in domains))
+    alive = [d for d, ok in zip(domains, alive_flags) if ok]
+    dead = [d for d, ok in zip(domains, alive_flags) if not ok]
+    return alive, dead
+
+
+class PreResolvedResolver(AbstractResolver):
+    """aiohttp resolver that answers from the pre-resolved DnsCache, falling back to getaddrinfo."""
+
+    def __init__(self, cache: DnsCache):
+        self._cache = cache
+        self._fallback = ThreadedResolver()
+
+    async def resolve(self, host: str, port: int = 0, family: socket.AddressFamily = socket.AF_INET) -> list[ResolveResult]:
+        addrs = self._cache.get(host)
+        results = []
+        for addr in addrs or []:
+            addr_family = socket.AF_INET6 if ":" in addr else socket.AF_INET
+            if family not in (socket.AF_UNSPEC, addr_family):
+                continue
+            results.append(ResolveResult(
+                hostname=host, host=addr, port=port, family=addr_family, proto=0, flags=_NUMERIC_FLAGS
+            ))
+        if results:
+            return results
+        return await self._fallback.resolve(host, port, family)
+
+    async def close(self) -> None:
+        await self._fallback.close()
@@ -0,0 +1,88 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from scraper.crawler import extract_page_data, FETCH_PHASE_SECONDS
+
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", os.cpu_count() or 1))
+# Pages allowed to wait on the pool per worker before fetch coroutines are held back
+EXTRACT_QUEUE_PER_WORKER = 2
+
+
+def _timed_extract(html: str | bytes) -> tuple[dict, float]:
+    """Runs inside a worker process; returns the extraction and its CPU time."""
+    start = time.process_time()
+    data = extract_page_data(html)
+    return data, time.process_time() - start
+
+
+class StageTimings:
+    """Running count / total / max seconds per pipeline stage."""
+
+    def __init__(self):
+        self._stats: dict[str, list[float]] = {}
+
+    def record(self, stage: str, seconds: float):
+        stats = self._stats.setdefault(stage, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] = max(stats[2], seconds)
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        return {
+            stage: {"count": count, "total": total, "avg": total / count, "max": peak}
+            for stage, (count, total, peak) in self._stats.items()
+        }
+
+    def summary(self) -> str:
+        lines = ["⏱️ Stage timings:"]
+        for stage, s in self.snapshot().items():
+            lines.append(
+                f"  {stage:<14} n={s['count']:<6} total={s['total']:.2f}s "
+                f"avg={s['avg'] * 1000:.1f}ms max={s['max'] * 1000:.1f}ms"
+            )
+        return "\n".join(lines)
+
+
+class ExtractionStage:
+    """HTML extraction backed by a process pool, so parsing never blocks the event loop.
+
+    At most `workers * queue_per_worker` pages are in the pool at once; further
+    callers wait in `extract()`, which holds their fetch coroutine back (backpressure).
+    With `workers=0` extraction runs inline, which is handy for debugging.
+    """
+
+    def __init__(self, workers: int = EXTRACT_WORKERS, queue_per_worker: int = EXTRACT_QUEUE_PER_WORKER):
+        self.workers = workers
+        self.timings = StageTimings()
+        self._executor = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+        self._slots = asyncio.Semaphore(max(1, workers * queue_per_worker))
+
+    async def extract(self, html: str | bytes) -> dict:
+        if self._executor is None:
+            data, cpu = _timed_extract(html)
+            self.timings.record("extract_cpu", cpu)
+            FETCH_PHASE_SECONDS.observe(cpu, phase="parse")
+            return data
+
+        wait_start = time.perf_counter()
+        async with self._slots:
+            self.timings.record("extract_wait", time.perf_counter() - wait_start)
+            start = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            data, cpu = await loop.run_in_executor(self._executor, _timed_extract, html)
+            self.timings.record("extract", time.perf_counter() - start)
+            self.timings.record("extract_cpu", cpu)
+            FETCH_PHASE_SECONDS.observe(cpu, phase="parse")
+        return data
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,86 @@
+import hashlib
+import time
+from pathlib import Path
+
+from scraper.kvstore import SqliteDict
+
+# Responses seen but not yet stored (in-flight pages and the odd losing race variant)
+MAX_PENDING = 10000
+
+
+def content_hash(html: str | bytes) -> str:
+    if isinstance(html, str):
+        html = html.encode("utf-8", "surrogatepass")
+    return hashlib.blake2b(html, digest_size=16).hexdigest()
+
+
+class HttpCache:
+    """Per-URL validators, content hash and extraction result for conditional recrawls.
+
+    Entries are keyed by the final URL after redirects; the URL we asked for maps to it
+    through an alias table. Validators seen on a response are only committed together
+    with the extraction result, so a 304 can never point at a stale extraction.
+    """
+
+    def __init__(self, path: Path | None = None):
+        location = path if path is not None else ":memory:"
+        self._pages = SqliteDict(location, "http_pages")
+        self._aliases = SqliteDict(location, "http_aliases")
+        self._pending: dict[str, tuple[str, str | None, str | None]] = {}
+        self.stats = {"not_modified": 0, "unchanged": 0, "extracted": 0}
+
+    def _final_url(self, url: str) -> str:
+        if url in self._pending:
+            return self._pending[url][0]
+        return self._aliases.get(url, url)
+
+    def lookup(self, url: str) -> dict | None:
+        return self._pages.get(self._final_url(url))
+
+    def conditional_headers(self, url: str) -> dict[str, str]:
+        entry = self.lookup(url)
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def remember_response(self, url: str, final_url: str, etag: str | None, last_modified: str | None):
+        if len(self._pending) >= MAX_PENDING:
+            self._pending.pop(next(iter(self._pending)))
+        self._pending[url] = (final_url, etag, last_modified)
+
+    def unchanged_extraction(self, url: str, html: str | bytes) -> dict | None:
+        """Stored extraction if the body hashes the same as last time."""
+        entry = self.lookup(url)
+        if entry and entry["content_hash"] == content_hash(html):
+            return entry["extraction"]
+        return None
+
+    def store(self, url: str, html: str | bytes, extraction: dict):
+        final_url, etag, last_modified = self._pending.pop(url, (self._final_url(url), None, None))
+        self._aliases[url] = final_url
+        self._pages[final_url] = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_hash": content_hash(html),
+            "extraction": extraction,
+            "fetched_at": time.time(),
+        }
+
+    def update_extraction(self, url: str, extraction: dict):
+        """Replace the stored extraction of an already stored page, keeping its validators."""
+        final_url = self._final_url(url)
+        entry = self._pages.get(final_url)
+        if entry is not None:
+            self._pages[final_url] = {**entry, "extraction": extraction}
+
+    def commit(self):
+        self._aliases.commit()
+        self._pages.commit()
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"🗄️ HTTP cache: {s['not_modified']} not modified, {s['unchanged']} unchanged, "
+                f"{s['extracted']} extracted")
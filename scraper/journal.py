@@ -0,0 +1,65 @@
+import os
+from pathlib import Path
+
+# Write a watermark checkpoint every time it advances by this many rows
+CHECKPOINT_EVERY = 1000
+
+
+class CrawlJournal:
+    """Append-only record of finished input rows, used to resume an interrupted run.
+
+    Each line is a finished row index; a `W <n>` line records that every row below n
+    is finished. Only rows finished above the watermark are held in memory, which is
+    bounded by the number of domains in flight.
+    """
+
+    def __init__(self, path: Path, resume: bool = False):
+        self.path = path
+        self.watermark = 0
+        self._done: set[int] = set()
+        if resume and path.exists():
+            self._replay()
+        self._compact()
+        self._file = open(path, "a")
+        self._last_checkpoint = self.watermark
+
+    def _replay(self):
+        with open(self.path, "r") as file:
+            for line in file:
+                line = line.strip()
+                if line.startswith("W "):
+                    self.watermark = max(self.watermark, int(line[2:]))
+                    self._done = {i for i in self._done if i >= self.watermark}
+                elif line:
+                    self._done.add(int(line))
+        self._done = {i for i in self._done if i >= self.watermark}
+        self._advance()
+
+    def _compact(self):
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp, "w") as file:
+            file.write(f"W {self.watermark}\n")
+            for i in sorted(self._done):
+                file.write(f"{i}\n")
+        os.replace(tmp, self.path)
+
+    def _advance(self):
+        while self.watermark in self._done:
+            self._done.remove(self.watermark)
+            self.watermark += 1
+
+    def is_done(self, index: int) -> bool:
+        return index < self.watermark or index in self._done
+
+    def mark(self, index: int):
+        self._done.add(index)
+        self._file.write(f"{index}\n")
+        self._advance()
+        if self.watermark - self._last_checkpoint >= CHECKPOINT_EVERY:
+            self._file.write(f"W {self.watermark}\n")
+            self._last_checkpoint = self.watermark
+        self._file.flush()
+
+    def close(self):
+        self._file.write(f"W {self.watermark}\n")
+        self._file.close()
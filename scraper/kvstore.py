@@ -0,0 +1,66 @@
+import json
+import sqlite3
+from collections.abc import MutableMapping
+from pathlib import Path
+
+# Seconds to wait on a write lock held by another process sharing the file
+BUSY_TIMEOUT = 30
+
+
+class SqliteDict(MutableMapping):
+    """str -> JSON value mapping kept in SQLite, so per-domain state does not grow in memory."""
+
+    def __init__(self, path: Path | str = ":memory:", table: str = "kv"):
+        # Autocommit: with WAL and synchronous=NORMAL a commit is cheap (no fsync), and no
+        # write lock is held between updates, so several crawler processes can share a file
+        # Not bound to the creating thread, so callers may write batches from asyncio.to_thread;
+        # they are responsible for not using one instance from two threads at once
+        self._conn = sqlite3.connect(str(path), timeout=BUSY_TIMEOUT, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._table = table
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def __getitem__(self, key: str):
+        row = self._conn.execute(f"SELECT value FROM {self._table} WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return json.loads(row[0])
+
+    def __setitem__(self, key: str, value):
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO {self._table} (key, value) VALUES (?, ?)", (key, json.dumps(value))
+        )
+
+    def __delitem__(self, key: str):
+        if self._conn.execute(f"DELETE FROM {self._table} WHERE key = ?", (key,)).rowcount == 0:
+            raise KeyError(key)
+
+    def __iter__(self):
+        for (key,) in self._conn.execute(f"SELECT key FROM {self._table}"):
+            yield key
+
+    def items(self) -> list[tuple[str, object]]:
+        """Every (key, value) pair from a single query."""
+        return [(key, json.loads(value)) for key, value in self._conn.execute(f"SELECT key, value FROM {self._table}")]
+
+    def put_many(self, entries: dict):
+        """Write several keys in one transaction."""
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(f"INSERT OR REPLACE INTO {self._table} (key, value) VALUES (?, ?)",
+                                   [(key, json.dumps(value)) for key, value in entries.items()])
+
+    def __len__(self) -> int:
+        return self._conn.execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0]
+
+    def clear(self):
+        self._conn.execute(f"DELETE FROM {self._table}")
+
+    def commit(self):
+        """Kept for callers that flush explicitly; every write is already committed."""
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
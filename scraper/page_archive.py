@@ -0,0 +1,195 @@
+import asyncio
+import mmap
+import time
+import uuid
+import zlib
+from pathlib import Path
+
+from scraper.crawler import RawPage
+
+# zlib level per record: 6 is close to 9's ratio on HTML at a fraction of the CPU
+COMPRESS_LEVEL = 6
+_GZIP_WBITS = 31
+INDEX_FIELDS = ["offset", "length", "index", "domain", "status", "url"]
+
+
+def index_path(path: Path) -> Path:
+    return path.with_name(path.name + ".idx")
+
+
+def encode_record(url: str, status: int, headers: list[tuple[str, str]], body: bytes,
+                  extra: dict[str, str] | None = None) -> bytes:
+    """One uncompressed WARC/1.1 response record."""
+    http = [f"HTTP/1.1 {status}"] + [f"{name}: {value}" for name, value in headers
+                                     if name.lower() not in ("content-length", "transfer-encoding",
+                                                             "content-encoding")]
+    block = ("\r\n".join(http) + f"\r\nContent-Length: {len(body)}\r\n\r\n").encode("utf-8", "replace") + body
+    warc = {
+        "WARC-Type": "response",
+        "WARC-Record-ID": f"<urn:uuid:{uuid.uuid4()}>",
+        "WARC-Date": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "WARC-Target-URI": url,
+        "Content-Type": "application/http;msgtype=response",
+        **(extra or {}),
+        "Content-Length": str(len(block)),
+    }
+    head = "WARC/1.1\r\n" + "".join(f"{name}: {value}\r\n" for name, value in warc.items()) + "\r\n"
+    return head.encode("utf-8", "replace") + block + b"\r\n\r\n"
+
+
+def _parse_headers(lines: list[bytes]) -> list[tuple[str, str]]:
+    headers = []
+    for line in lines:
+        name, _, value = line.decode("utf-8", "replace").partition(":")
+        headers.append((name.strip(), value.strip()))
+    return headers
+
+
+def decode_record(record: bytes) -> tuple[dict[str, str], RawPage]:
+    """(WARC headers, page) from one uncompressed record; the page carries url, headers and charset."""
+    warc_head, _, rest = record.partition(b"\r\n\r\n")
+    warc = dict(_parse_headers(warc_head.split(b"\r\n")[1:]))
+    block = rest[:int(warc["Content-Length"])]
+    http_head, _, body = block.partition(b"\r\n\r\n")
+    http_lines = http_head.split(b"\r\n")
+
+    page = RawPage(body)
+    page.url = warc["WARC-Target-URI"]
+    page.headers = _parse_headers(http_lines[1:])
+    page.encoding = warc.get("X-Sniffed-Charset") or None
+    page.truncated = warc.get("X-Truncated") == "1"
+    warc["status"] = http_lines[0].split()[1].decode()
+    return warc, page
+
+
+def compress(record: bytes, level: int = COMPRESS_LEVEL) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _GZIP_WBITS)
+    return compressor.compress(record) + compressor.flush()
+
+
+def decompress(member: bytes) -> bytes:
+    return zlib.decompress(member, _GZIP_WBITS)
+
+
+def read_index(path: Path) -> list[dict]:
+    """Index entries in archive order; an incomplete last line (crash mid-write) is ignored."""
+    location = index_path(path)
+    if not location.exists():
+        return []
+    entries = []
+    with open(location, encoding="utf-8") as file:
+        for line in file:
+            fields = line.rstrip("\n").split("\t")
+            if not line.endswith("\n") or len(fields) != len(INDEX_FIELDS):
+                break
+            entry = dict(zip(INDEX_FIELDS, fields))
+            for name in ("offset", "length", "index", "status"):
+                entry[name] = int(entry[name])
+            entries.append(entry)
+    return entries
+
+
+def latest_per_domain(entries: list[dict]) -> list[dict]:
+    """The newest record of every domain (the archive spans runs), in input row order."""
+    latest = {entry["domain"]: entry for entry in entries}
+    return sorted(latest.values(), key=lambda entry: entry["index"])
+
+
+class PageArchive:
+    """Writer side: `append()` compresses a page off the event loop and appends it with its index line.
+
+    The archive is never rewritten, so it accumulates every run; readers take the latest
+    record per domain. A page that came back 304 is not stored again.
+    """
+
+    def __init__(self, path: Path, level: int = COMPRESS_LEVEL):
+        self.path = path
+        self.level = level
+        self.pages = 0
+        self.bytes_in = self.bytes_out = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entries = read_index(path)
+        end = entries[-1]["offset"] + entries[-1]["length"] if entries else 0
+        self._file = open(path, "ab")
+        if self._file.tell() != end:
+            # A record written without its index line (or a torn one): cut back to the last indexed record
+            print(f"[WARN] Truncating {path.name} to its last indexed record ({self._file.tell() - end} bytes)")
+            self._file.truncate(end)
+            self._file.seek(end)
+        self._index = open(index_path(path), "w" if not entries else "a", encoding="utf-8")
+        if entries and index_path(path).stat().st_size != self._index_size(entries):
+            # Drop a partial trailing line
+            self._index.close()
+            index_path(path).write_text("".join(self._index_line(entry) for entry in entries), encoding="utf-8")
+            self._index = open(index_path(path), "a", encoding="utf-8")
+
+    @staticmethod
+    def _index_line(entry: dict) -> str:
+        return "\t".join(str(entry[name]).replace("\t", " ").replace("\n", " ") for name in INDEX_FIELDS) + "\n"
+
+    def _index_size(self, entries: list[dict]) -> int:
+        return sum(len(self._index_line(entry).encode("utf-8")) for entry in entries)
+
+    async def append(self, index: int, domain: str, url: str, status: int, page: bytes):
+        extra = {"X-Crawl-Domain": domain}
+        if getattr(page, "encoding", None):
+            extra["X-Sniffed-Charset"] = page.encoding
+        if getattr(page, "truncated", False):
+            extra["X-Truncated"] = "1"
+        record = encode_record(getattr(page, "url", None) or url, status, getattr(page, "headers", []),
+                               bytes(page), extra)
+        # zlib releases the GIL, so compressing in a thread keeps the loop free
+        member = await asyncio.to_thread(compress, record, self.level)
+
+        offset = self._file.tell()
+        self._file.write(member)
+        self._file.flush()
+        self._index.write(self._index_line({"offset": offset, "length": len(member), "index": index,
+                                            "domain": domain, "status": status, "url": url}))
+        self._index.flush()
+        self.pages += 1
+        self.bytes_in += len(record)
+        self.bytes_out += len(member)
+
+    def summary(self) -> str:
+        ratio = self.bytes_in / self.bytes_out if self.bytes_out else 0
+        return (f"🗜️ Page archive: {self.pages} pages, {self.bytes_out / 1e6:.1f} MB written "
+                f"({ratio:.1f}x compression) to {self.path}")
+
+    def close(self):
+        self._file.close()
+        self._index.close()
+
+
+class ArchiveReader:
+    """Random access to archived pages through a read-only memory map of the archive."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if path.stat().st_size else b""
+
+    def read(self, offset: int, length: int) -> tuple[dict[str, str], RawPage]:
+        return decode_record(decompress(self._map[offset:offset + length]))
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_pages(path: Path, limit: int | None = None, latest_only: bool = True):
+    """Yield (index entry, page) from an archive, e.g. as an extraction benchmark corpus."""
+    entries = read_index(path)
+    if latest_only:
+        entries = latest_per_domain(entries)
+    with ArchiveReader(path) as reader:
+        for entry in entries[:limit]:
+            _, page = reader.read(entry["offset"], entry["length"])
+            yield entry, page
@@ -0,0 +1,210 @@
+import asyncio
+import re
+import time
+
+from observability.metrics import REGISTRY
+from scraper.crawler import FETCH_PHASE_SECONDS
+
+# Browser contexts kept open; also the number of pages rendering at once
+RENDER_CONTEXTS = 4
+# Hard cap on one render, navigation and settling included (seconds)
+RENDER_TIMEOUT = 15.0
+# How long a render waits for the network to go quiet before taking the DOM as it is
+SETTLE_TIMEOUT = 3.0
+# Pages served by one context before it is replaced, so leaked page state stays bounded
+PAGES_PER_CONTEXT = 50
+# Requests of these types are aborted: they cost bandwidth and never carry contact data
+BLOCKED_RESOURCES = {"image", "font", "media"}
+# Less visible text than this, next to scripts, reads as a page rendered client-side
+SHELL_MAX_TEXT = 400
+
+# Site builders and SPA frameworks whose static HTML is a bootstrap shell
+SHELL_MARKERS = re.compile(
+    r"wix-warmup-data|wixBiSession|static\.parastorage\.com|data-reactroot|__NEXT_DATA__|ng-version="
+    r"|<div id=\"(?:root|app|__next)\">\s*</div>|(?:enable|requires) javascript",
+    re.IGNORECASE,
+)
+_SCRIPT_OR_STYLE = re.compile(r"<(script|style|noscript)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_TAG = re.compile(r"<[^>]*>")
+
+RENDERS_TOTAL = REGISTRY.counter("scraper_renders_total", "Browser renders, by outcome", ("outcome",))
+
+
+def looks_like_js_shell(html: str | bytes) -> bool:
+    """True when the static HTML is a client-side bootstrap rather than the page itself."""
+    if isinstance(html, bytes):
+        html = html.decode("utf-8", errors="replace")
+    if SHELL_MARKERS.search(html):
+        return True
+    if "<script" not in html.lower():
+        return False
+    text = _TAG.sub(" ", _SCRIPT_OR_STYLE.sub(" ", html))
+    return len(" ".join(text.split())) < SHELL_MAX_TEXT
+
+
+def needs_render(html: str | bytes, data: dict) -> bool:
+    """Escalate when the static page gave no phone or address and is empty or a JS shell.
+
+    A phone or address already found means the static page carries its contact block, so the
+    browser is not worth it; a cached extraction that came from an earlier render counts too.
+    """
+    if data["phone_numbers"] or data["address"]:
+        return False
+    return not data["social_links"] or looks_like_js_shell(html)
+
+
+def found_more(static: dict, rendered: dict) -> bool:
+    """True when the rendered page has contact data the static one lacked."""
+    return bool(set(rendered["phone_numbers"]) - set(static["phone_numbers"])
+                or set(rendered["social_links"]) - set(static["social_links"])
+                or (rendered["address"] and not static["address"]))
+
+
+def merge_extractions(static: dict, rendered: dict) -> dict:
+    return {
+        "phone_numbers": sorted(set(static["phone_numbers"]) | set(rendered["phone_numbers"])),
+        "social_links": sorted(set(static["social_links"]) | set(rendered["social_links"])),
+        "address": rendered["address"] or static["address"],
+    }
+
+
+async def _block_heavy_resources(route):
+    if route.request.resource_type in BLOCKED_RESOURCES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+class RenderPool:
+    """Headless Chromium with a fixed pool of browser contexts, for pages that need JavaScript.
+
+    `render()` leases a context, opens one page, and returns the DOM after load (or whatever is
+    there when RENDER_TIMEOUT hits). When Playwright or its browser is missing, `start()` warns
+    and every `render()` returns None, so the crawl goes on with static results only.
+    """
+
+    def __init__(self, contexts: int = RENDER_CONTEXTS, timeout: float = RENDER_TIMEOUT,
+                 user_agent: str | None = None):
+        self.size = contexts
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.stats = {"rendered": 0, "improved": 0, "failed": 0}
+        self._playwright = None
+        self._browser = None
+        self._contexts: asyncio.Queue = asyncio.Queue()
+        self._pages_served: dict = {}
+
+    @property
+    def available(self) -> bool:
+        return self._browser is not None
+
+    async def start(self):
+        try:
+            from playwright.async_api import async_playwright
+        except ImportError:
+            print("[WARN] playwright is not installed; the render tier is off")
+            return
+        try:
+            self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=True)
+            for _ in range(self.size):
+                self._contexts.put_nowait(await self._new_context())
+        except Exception as e:
+            print(f"[WARN] Could not start headless Chromium ({type(e).__name__}: {e}); the render tier is off")
+            await self.close()
+
+    async def _new_context(self):
+        context = await self._browser.new_context(user_agent=self.user_agent)
+        await context.route("**/*", _block_heavy_resources)
+        self._pages_served[context] = 0
+        return context
+
+    async def _render_page(self, context, url: str) -> str:
+        page = await context.new_page()
+        try:
+            await page.goto(url, wait_until="domcontentloaded", timeout=self.timeout * 1000)
+            try:
+                await page.wait_for_load_state("networkidle", timeout=SETTLE_TIMEOUT * 1000)
+            except Exception:
+                pass  # long-polling and trackers never go idle; the DOM is usually complete by now
+            return await page.content()
+        finally:
+            await page.close()
+
+    async def _acquire(self):
+        """A context from the pool; a slot left empty by a failed recycle gets a fresh one (None if that fails too)."""
+        context = await self._contexts.get()
+        if context is not None:
+            return context
+        try:
+            return await self._new_context()
+        except Exception as e:
+            print(f"[RENDER] Could not open a browser context → {type(e).__name__}: {e}")
+            self._contexts.put_nowait(None)
+            return None
+
+    async def _recycle(self, context):
+        """Close a worn-out context and return its replacement, or None (an empty slot) if opening one fails."""
+        self._pages_served.pop(context, None)
+        try:
+            await context.close()
+            return await self._new_context()
+        except Exception as e:
+            print(f"[RENDER] Could not recycle a browser context → {type(e).__name__}: {e}")
+            return None
+
+    async def render(self, url: str) -> str | None:
+        if not self.available:
+            return None
+        context = await self._acquire()
+        if context is None:
+            self.stats["failed"] += 1
+            RENDERS_TOTAL.inc(outcome="failed")
+            return None
+        start = time.perf_counter()
+        try:
+            html = await asyncio.wait_for(self._render_page(context, url), timeout=self.timeout)
+            self.stats["rendered"] += 1
+            return html
+        except Exception as e:
+            print(f"[RENDER] {url} → {type(e).__name__}: {e}")
+            self.stats["failed"] += 1
+            RENDERS_TOTAL.inc(outcome="failed")
+            return None
+        finally:
+            FETCH_PHASE_SECONDS.observe(time.perf_counter() - start, phase="render")
+            self._pages_served[context] += 1
+            try:
+                if self._pages_served[context] >= PAGES_PER_CONTEXT and self.available:
+                    context = await self._recycle(context)
+            finally:
+                # The slot always goes back, even empty, or later renders would wait on it forever
+                self._contexts.put_nowait(context)
+
+    def record(self, improved: bool):
+        """Count whether a successful render found contact data the static page lacked."""
+        self.stats["improved"] += improved
+        RENDERS_TOTAL.inc(outcome="improved" if improved else "unchanged")
+
+    def summary(self) -> str:
+        s = self.stats
+        return f"🖥️ Render tier: {s['rendered']} rendered, {s['improved']} improved, {s['failed']} failed"
+
+    async def close(self):
+        while not self._contexts.empty():
+            context = self._contexts.get_nowait()
+            if context is not None:
+                await context.close()
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
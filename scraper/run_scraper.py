@@ -1,8 +1,19 @@
+import argparse
+import csv
 import time
-import pandas as pd
 import asyncio
 import aiohttp
-from scraper.crawler import try_fetch_with_fallback, extract_phone_numbers, extract_social_links, extract_address
+from observability.metrics import REGISTRY, start_metrics_server, write_metrics
+from scraper.crawler import try_fetch_with_fallback, extract_page_data, load_preferred_variants, \
+    save_preferred_variants, body_stats_summary, fetch_trace_config, NOT_MODIFIED
+from scraper.adaptive import AdaptiveController
+from scraper.dns_cache import DnsCache, PreResolvedResolver, pre_resolve
+from scraper.extraction import ExtractionStage, EXTRACT_WORKERS
+from scraper.http_cache import HttpCache
+from scraper.journal import CrawlJournal
+from scraper.page_archive import PageArchive
+from scraper.render import RenderPool, RENDER_CONTEXTS, found_more, merge_extractions, needs_render
+from scraper.scrape_store import ScrapeStore
 from pathlib import Path
 import random
 
@@ -10,7 +21,25 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 INPUT_CSV = BASE_DIR / "data" / "sample-websites.csv"
 OUTPUT_CSV = BASE_DIR / "data" / "scraped_data.csv"
 FAILED_CSV = BASE_DIR / "data" / "failed_domains.csv"
+JOURNAL = BASE_DIR / "data" / "scrape_journal.log"
+VARIANTS_DB = BASE_DIR / "data" / "url_variants.sqlite"
+DNS_CACHE_DB = BASE_DIR / "data" / "dns_cache.sqlite"
+HTTP_CACHE_DB = BASE_DIR / "data" / "http_cache.sqlite"
+# Typed Parquet copy of every result (lists, status, timings) for analyze_scrape.py
+SCRAPE_STORE = BASE_DIR / "data" / "scrape"
+# Raw fetched pages (WARC-style, gzip per record) for offline re-extraction with scraper.reextract
+PAGE_ARCHIVE = BASE_DIR / "data" / "pages.warc.gz"
+# Prometheus text dump of the run's metrics, rewritten every METRICS_DUMP_INTERVAL seconds
+METRICS_FILE = BASE_DIR / "data" / "scrape_metrics.prom"
+METRICS_DUMP_INTERVAL = 15
 CONCURRENCY = 20
+# Domains admitted into the pipeline at once; memory is bounded by this, not by input size
+IN_FLIGHT_DOMAINS = 200
+# Input rows read and DNS pre-resolved together
+DNS_BATCH = 1000
+
+OUTPUT_FIELDS = ["domain", "phone_numbers", "social_links", "address"]
+FAILED_FIELDS = ["domain", "http_status"]
 
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/122.0.0.0 Safari/537.36",
@@ -20,57 +49,323 @@ USER_AGENTS = [
 
 headers = {"User-Agent": random.choice(USER_AGENTS)}
 
-failed_domains = []
+DOMAINS_TOTAL = REGISTRY.counter("scraper_domains_total", "Domains finished, by result", ("result",))
+DOMAINS_IN_FLIGHT = REGISTRY.gauge("scraper_domains_in_flight", "Domains currently being crawled")
+CONCURRENCY_LIMIT = REGISTRY.gauge("scraper_concurrency_limit", "Current global fetch concurrency limit")
+
+
+async def _extract(url: str, html: str | bytes, stage: ExtractionStage | None, cache: HttpCache | None) -> dict:
+    if cache is not None:
+        data = cache.unchanged_extraction(url, html)
+        if data is not None:
+            cache.stats["unchanged"] += 1
+            cache.store(url, html, data)
+            return data
+
+    # Hand the page to the extraction pool so parsing does not stall other fetches
+    data = await stage.extract(html) if stage is not None else extract_page_data(html)
+    if cache is not None:
+        cache.stats["extracted"] += 1
+        cache.store(url, html, data)
+    return data
 
-async def process_domain(session, domain: str, i: int):
+
+async def process_domain(session, domain: str, i: int, stage: ExtractionStage | None = None,
+                         controller: AdaptiveController | None = None,
+                         cache: HttpCache | None = None,
+                         renderer: RenderPool | None = None,
+                         archive: PageArchive | None = None) -> tuple[dict | None, tuple | None]:
+    """Crawl one domain; returns (scraped row, None) or (None, (domain, http_status)).
+
+    The row keeps phones and social links as lists; `csv_row()` flattens it for the CSV output.
+    With a `renderer`, a page whose static HTML yields no contact data is rendered in a browser.
+    With an `archive`, every fetched body is appended to it (a 304 has none to add).
+    """
     domain = domain.strip()
     print(f"[{i}] Crawling: {domain}")
 
-    url, html, status = await try_fetch_with_fallback(session, domain)
-    if not html:
-        print(f"[{i}] ❌ Failed: {domain} (Status: {status})")
-        failure = (domain, status)
-        if failure not in failed_domains:
-            failed_domains.append(failure)
-        return None
+    fetch_start = time.perf_counter()
+    url, html, status = await try_fetch_with_fallback(session, domain, controller=controller, cache=cache)
+    fetch_seconds = time.perf_counter() - fetch_start
+    if stage is not None:
+        stage.timings.record("fetch", fetch_seconds)
 
-    phones = extract_phone_numbers(html)
-    socials = extract_social_links(html)
-    address = extract_address(html)
+    cached = cache.lookup(url) if cache is not None and status == NOT_MODIFIED else None
+    if cached is not None:
+        # 304: the page is unchanged, reuse what we extracted last time
+        cache.stats["not_modified"] += 1
+        data = cached["extraction"]
+    elif not html:
+        print(f"[{i}] ❌ Failed: {domain} (Status: {status})")
+        return None, (domain, status)
+    else:
+        if archive is not None:
+            await archive.append(i - 1, domain, url, status, html)  # i counts input rows from 1
+        data = await _extract(url, html, stage, cache)
+        if renderer is not None and needs_render(html, data):
+            data = await _render(url, html, data, stage, cache, renderer)
 
     return {
         "domain": url,
-        "phone_numbers": "; ".join(phones),
-        "social_links": "; ".join(socials),
-        "address": address if address else ""
-    }
+        "phone_numbers": list(data["phone_numbers"]),
+        "social_links": list(data["social_links"]),
+        "address": data["address"] if data["address"] else "",
+        "http_status": status,
+        "fetch_seconds": fetch_seconds,
+    }, None
+
+
+async def _render(url: str, html: str | bytes, data: dict, stage: ExtractionStage | None, cache: HttpCache | None,
+                  renderer: RenderPool) -> dict:
+    start = time.perf_counter()
+    rendered = await renderer.render(url)
+    if stage is not None:
+        stage.timings.record("render", time.perf_counter() - start)
+    if rendered is None:
+        return data
+
+    rendered_data = await stage.extract(rendered) if stage is not None else extract_page_data(rendered)
+    improved = found_more(data, rendered_data)
+    renderer.record(improved)
+    if not improved:
+        return data
+    merged = merge_extractions(data, rendered_data)
+    if cache is not None:
+        # Keyed by the static body: while it stays the same, later runs reuse this without a browser
+        cache.update_extraction(url, merged)
+    return merged
+
+
+def csv_row(row: dict) -> dict:
+    """The OUTPUT_FIELDS of a scraped row, with list values joined by "; "."""
+    flat = {}
+    for field in OUTPUT_FIELDS:
+        value = row.get(field)
+        flat[field] = "; ".join(value) if isinstance(value, list) else value
+    return flat
+
+
+def _as_list(value) -> list[str]:
+    # Rows built elsewhere (older callers, tests) may still carry "; "-joined strings
+    if isinstance(value, str):
+        return [part.strip() for part in value.split(";") if part.strip()]
+    return list(value or [])
+
 
+def iter_domains(path: Path):
+    """Lazily yield (row index, domain) from the input CSV; blank domains come through as ''."""
+    with open(path, "r", newline="", encoding="utf-8") as file:
+        for i, row in enumerate(csv.DictReader(file)):
+            yield i, (row.get("domain") or "").strip()
 
-async def run_scraper():
-    df = pd.read_csv(INPUT_CSV)
-    domains = df['domain'].dropna().tolist()
 
-    results = []
+class _CsvAppender:
+    """CSV output that is flushed row by row, so a crash keeps everything written so far."""
 
-    connector = aiohttp.TCPConnector(limit=CONCURRENCY)
-    async with aiohttp.ClientSession(headers=headers, connector=connector, trust_env=True) as session:
-        tasks = [process_domain(session, domain, i + 1) for i, domain in enumerate(domains)]
-        for future in asyncio.as_completed(tasks):
-            result = await future
-            if result:
-                results.append(result)
+    def __init__(self, path: Path, fieldnames: list[str], append: bool):
+        write_header = not append or not path.exists() or path.stat().st_size == 0
+        self._file = open(path, "a" if append else "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames)
+        self.rows = 0
+        if write_header:
+            self._writer.writeheader()
 
-    pd.DataFrame(results).to_csv(OUTPUT_CSV, index=False)
-    print(f"\n✅ Scraped data saved to {OUTPUT_CSV}")
+    def write(self, row: dict):
+        self._writer.writerow(row)
+        self._file.flush()
+        self.rows += 1
 
-    if failed_domains:
-        pd.DataFrame(failed_domains, columns=["domain", "http_status"]).to_csv(FAILED_CSV, index=False)
-        print(f"⚠️ {len(failed_domains)} failed domains saved to {FAILED_CSV}")
+    def close(self):
+        self._file.close()
+
+
+async def _dump_metrics():
+    while True:
+        await asyncio.sleep(METRICS_DUMP_INTERVAL)
+        write_metrics(METRICS_FILE)
+
+
+def make_controller(adaptive: bool, dns_cache: DnsCache) -> tuple[AdaptiveController | None, aiohttp.TCPConnector]:
+    """The fetch concurrency setup: a fixed CONCURRENCY connection pool, or an AdaptiveController."""
+    resolver = PreResolvedResolver(dns_cache)
+    if not adaptive:
+        return None, aiohttp.TCPConnector(limit=CONCURRENCY, resolver=resolver)
+    # The controller owns concurrency (global and per host), so the connector pool is unbounded
+    return AdaptiveController(initial=CONCURRENCY), aiohttp.TCPConnector(limit=0, resolver=resolver)
+
+
+async def run_scraper(extract_workers: int = EXTRACT_WORKERS, resume: bool = False,
+                      in_flight: int = IN_FLIGHT_DOMAINS, use_cache: bool = True, metrics_port: int | None = None,
+                      render_contexts: int = 0, archive_pages: bool = False, adaptive: bool = False):
+    """Crawl INPUT_CSV; `render_contexts` > 0 turns on the headless-browser tier with that many contexts.
+
+    `archive_pages` appends every fetched page to PAGE_ARCHIVE for `scraper.reextract`. Fetches
+    share CONCURRENCY connections unless `adaptive` hands concurrency to the AdaptiveController.
+    """
+    load_preferred_variants(VARIANTS_DB)
+    dns_cache = DnsCache(DNS_CACHE_DB)
+    http_cache = HttpCache(HTTP_CACHE_DB) if use_cache else None
+    journal = CrawlJournal(JOURNAL, resume=resume)
+    if resume:
+        print(f"↩️ Resuming: rows below {journal.watermark} already done")
+
+    results = _CsvAppender(OUTPUT_CSV, OUTPUT_FIELDS, append=resume)
+    failures = _CsvAppender(FAILED_CSV, FAILED_FIELDS, append=resume)
+    store = ScrapeStore(SCRAPE_STORE, append=resume)
+    archive = PageArchive(PAGE_ARCHIVE) if archive_pages else None
+    queue: asyncio.Queue = asyncio.Queue(maxsize=in_flight)
+
+    def record_failure(index: int, domain: str, status: int | None, result: str = "failed",
+                       total_seconds: float | None = None):
+        failures.write({"domain": domain, "http_status": status})
+        store.append(index, domain, result, http_status=status, total_seconds=total_seconds)
+        journal.mark(index)
+        DOMAINS_TOTAL.inc(result=result)
+
+    async def admit(batch: list[tuple[int, str]]):
+        # Pre-flight DNS: hosts that do not exist never take a fetch slot
+        _, unresolvable = await pre_resolve([domain for _, domain in batch], dns_cache)
+        await dns_cache.flush()
+        unresolvable = set(unresolvable)
+        for index, domain in batch:
+            if domain in unresolvable:
+                record_failure(index, domain, None, "unresolvable")
+            else:
+                await queue.put((index, domain))  # blocks while the pipeline is full
+
+    async def produce():
+        batch = []
+        for index, domain in iter_domains(INPUT_CSV):
+            if journal.is_done(index):
+                continue
+            if not domain:
+                journal.mark(index)
+                continue
+            batch.append((index, domain))
+            if len(batch) >= DNS_BATCH:
+                await admit(batch)
+                batch = []
+        if batch:
+            await admit(batch)
+        for _ in range(in_flight):
+            await queue.put(None)
+
+    async def work(session, stage, controller, renderer):
+        while (item := await queue.get()) is not None:
+            index, domain = item
+            start = time.perf_counter()
+            try:
+                with DOMAINS_IN_FLIGHT.track_inprogress():
+                    row, failure = await process_domain(session, domain, index + 1, stage, controller, http_cache,
+                                                        renderer, archive)
+            except Exception as e:
+                print(f"[ERROR] {domain} → {type(e).__name__}: {e}")
+                row, failure = None, (domain, None)
+            total_seconds = time.perf_counter() - start
+            if row:
+                results.write(csv_row(row))
+                store.append(index, domain, "scraped", url=row["domain"], http_status=row.get("http_status"),
+                             phone_numbers=_as_list(row["phone_numbers"]), social_links=_as_list(row["social_links"]),
+                             address=row["address"], fetch_seconds=row.get("fetch_seconds"),
+                             total_seconds=total_seconds)
+                journal.mark(index)
+                DOMAINS_TOTAL.inc(result="scraped")
+            else:
+                record_failure(index, *failure, total_seconds=total_seconds)
+
+    controller, connector = make_controller(adaptive, dns_cache)
+    CONCURRENCY_LIMIT.set_function(lambda: controller.limit if controller else CONCURRENCY)
+    metrics_server = await start_metrics_server(metrics_port) if metrics_port else None
+    dumper = asyncio.create_task(_dump_metrics())
+    renderer = RenderPool(render_contexts, user_agent=headers["User-Agent"]) if render_contexts else None
+    try:
+        if renderer is not None:
+            await renderer.start()
+        with ExtractionStage(workers=extract_workers) as stage:
+            async with aiohttp.ClientSession(headers=headers, connector=connector, trust_env=True,
+                                             trace_configs=[fetch_trace_config()]) as session:
+                await asyncio.gather(produce(), *(work(session, stage, controller, renderer)
+                                                         for _ in range(in_flight)))
+            print("\n" + stage.timings.summary())
+            if controller is not None:
+                print(controller.summary())
+            print(body_stats_summary())
+            if http_cache is not None:
+                print(http_cache.summary())
+            if renderer is not None:
+                print(renderer.summary())
+            if archive is not None:
+                print(archive.summary())
+    finally:
+        dumper.cancel()
+        if renderer is not None:
+            await renderer.close()
+        write_metrics(METRICS_FILE)
+        if metrics_server is not None:
+            await metrics_server.cleanup()
+        results.close()
+        failures.close()
+        store.close()
+        if archive is not None:
+            archive.close()
+        journal.close()
+        dns_cache.save()
+        save_preferred_variants()
+        if http_cache is not None:
+            http_cache.commit()
+
+    print(f"\n✅ {results.rows} scraped rows saved to {OUTPUT_CSV}")
+    if failures.rows:
+        print(f"⚠️ {failures.rows} failed domains saved to {FAILED_CSV}")
+    print(f"🗃️ {store.rows} result rows stored in {store.directory}")
+    print(f"📈 Metrics written to {METRICS_FILE}")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl company websites and extract contact data.")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted run from its journal")
+    parser.add_argument("--in-flight", type=int, default=IN_FLIGHT_DOMAINS, help="domains admitted at once")
+    parser.add_argument("--extract-workers", type=int, default=EXTRACT_WORKERS, help="extraction processes (0 = inline)")
+    parser.add_argument("--no-cache", action="store_true", help="ignore the HTTP cache and re-extract every page")
+    parser.add_argument("--coordinator", type=Path, metavar="QUEUE_DB",
+                        help="queue the input in a shared SQLite work queue and run --workers local workers")
+    parser.add_argument("--worker", type=Path, metavar="QUEUE_DB", help="crawl batches leased from a shared work queue")
+    parser.add_argument("--workers", type=int, default=4, help="local worker processes started by --coordinator")
+    parser.add_argument("--metrics-port", type=int, help="also serve live metrics on http://0.0.0.0:PORT/metrics")
+    parser.add_argument("--render", action="store_true",
+                        help="render pages whose static HTML has no contact data in headless Chromium")
+    parser.add_argument("--archive", action="store_true",
+                        help=f"append fetched pages to {PAGE_ARCHIVE.name} for offline re-extraction")
+    parser.add_argument("--render-contexts", type=int, default=RENDER_CONTEXTS, help="browser contexts for --render")
+    parser.add_argument("--adaptive", action="store_true",
+                        help=f"adapt concurrency and timeouts per host instead of a fixed {CONCURRENCY} connections "
+                             "(experimental, see the benchmark section of the README)")
+    args = parser.parse_args()
+
+    render_contexts = args.render_contexts if args.render else 0
     start_time = time.time()
-    asyncio.run(run_scraper())
+    if args.coordinator:
+        from scraper.distributed import run_coordinator
+        worker_args = ["--in-flight", str(args.in_flight), "--extract-workers", str(args.extract_workers)]
+        if args.render:
+            worker_args += ["--render", "--render-contexts", str(args.render_contexts)]
+        if args.no_cache:
+            worker_args.append("--no-cache")
+        if args.adaptive:
+            worker_args.append("--adaptive")
+        if args.archive:
+            print("[WARN] --archive is not supported with --coordinator; pages are not archived")
+        run_coordinator(args.coordinator, args.workers, worker_args)
+    elif args.worker:
+        from scraper.distributed import run_worker
+        asyncio.run(run_worker(args.worker, in_flight=args.in_flight, extract_workers=args.extract_workers,
+                               render_contexts=render_contexts, use_cache=not args.no_cache,
+                               adaptive=args.adaptive))
+    else:
+        asyncio.run(run_scraper(extract_workers=args.extract_workers, resume=args.resume, in_flight=args.in_flight,
+                                use_cache=not args.no_cache, metrics_port=args.metrics_port,
+                                render_contexts=render_contexts, archive_pages=args.archive,
+                                adaptive=args.adaptive))
     end_time = time.time()
     elapsed = end_time - start_time
     print(f"\n⏱️ Total execution time: {elapsed:.2f} seconds")
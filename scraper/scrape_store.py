@@ -0,0 +1,102 @@
+import time
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Rows buffered before they are written out as one finished part file; a crash loses at most these
+ROW_GROUP_ROWS = 10_000
+
+SCHEMA = pa.schema([
+    ("index", pa.int64()),
+    ("domain", pa.string()),
+    ("url", pa.string()),
+    ("result", pa.dictionary(pa.int8(), pa.string())),   # scraped / failed / unresolvable
+    ("http_status", pa.int16()),
+    ("phone_numbers", pa.list_(pa.string())),
+    ("social_links", pa.list_(pa.string())),
+    ("address", pa.string()),
+    ("fetch_seconds", pa.float32()),
+    ("total_seconds", pa.float32()),
+    ("scraped_at", pa.timestamp("ms")),
+])
+
+
+class ScrapeStore:
+    """Typed, columnar record of a crawl: Parquet part files under `directory`.
+
+    Rows stream in through `append()`. Every `row_group_rows` rows (and on `close()`) the buffer
+    is written as a complete part file, renamed into place only once its footer is on disk, so a
+    crash loses at most the buffered rows and never leaves a part that cannot be read. The CSV
+    outputs plus the journal stay the crash-safe record; a resumed run adds parts next to the
+    earlier ones.
+    """
+
+    def __init__(self, directory: Path, append: bool = False, row_group_rows: int = ROW_GROUP_ROWS):
+        directory.mkdir(parents=True, exist_ok=True)
+        if not append:
+            clear_scrape_store(directory)
+        parts = sorted(directory.glob("part-*.parquet"))
+        self._next_part = int(parts[-1].stem.split("-")[1]) + 1 if parts else 0
+        self.directory = directory
+        self.row_group_rows = row_group_rows
+        self.rows = 0
+        self._buffer: dict[str, list] = {name: [] for name in SCHEMA.names}
+
+    def append(self, index: int, domain: str, result: str, url: str | None = None, http_status: int | None = None,
+               phone_numbers: list[str] | None = None, social_links: list[str] | None = None,
+               address: str | None = None, fetch_seconds: float | None = None, total_seconds: float | None = None):
+        values = (index, domain, url, result, http_status, phone_numbers, social_links, address or None,
+                  fetch_seconds, total_seconds, time.time_ns() // 1_000_000)
+        for name, value in zip(SCHEMA.names, values):
+            self._buffer[name].append(value)
+        self.rows += 1
+        if len(self._buffer["index"]) >= self.row_group_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer["index"]:
+            return
+        path = self.directory / f"part-{self._next_part:05d}.parquet"
+        tmp = path.with_name(path.name + ".tmp")
+        pq.write_table(pa.Table.from_pydict(self._buffer, schema=SCHEMA), tmp, compression="zstd")
+        tmp.replace(path)
+        self._next_part += 1
+        self._buffer = {name: [] for name in SCHEMA.names}
+
+    def close(self):
+        self.flush()
+
+
+def clear_scrape_store(directory: Path):
+    """Delete every part file, so readers fall back to the CSV outputs until a new store is written."""
+    for part in [*directory.glob("part-*.parquet"), *directory.glob("part-*.parquet.tmp")]:
+        part.unlink()
+
+
+def scrape_store_rows(directory: Path) -> int | None:
+    """Rows across all part files, from their footers; None when any part cannot be read."""
+    rows = 0
+    for path in sorted(directory.glob("part-*.parquet")):
+        try:
+            rows += pq.read_metadata(path).num_rows
+        except (pa.ArrowInvalid, OSError):
+            return None
+    return rows
+
+
+def read_scrape_store(directory: Path, columns: list[str] | None = None) -> pa.Table:
+    """All part files as one table, reading only `columns` from disk.
+
+    A part without a footer (written by an older version that crashed) is skipped with a warning.
+    """
+    parts = []
+    for path in sorted(directory.glob("part-*.parquet")):
+        try:
+            pq.read_metadata(path)
+        except (pa.ArrowInvalid, OSError) as e:
+            print(f"[WARN] Skipping unreadable scrape part {path.name}: {e}")
+            continue
+        parts.append(str(path))
+    return ds.dataset(parts, format="parquet", schema=SCHEMA).to_table(columns=columns)
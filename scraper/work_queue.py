@@ -0,0 +1,163 @@
+import csv
+import sqlite3
+import time
+from pathlib import Path
+
+# Seconds a worker owns a leased batch; it renews while crawling, so this only matters
+# when a worker dies and its batch has to go back to the queue
+LEASE_SECONDS = 300
+# A domain leased this many times without a result is given up on as a failure
+MAX_ATTEMPTS = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    idx INTEGER PRIMARY KEY,
+    domain TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, idx);
+CREATE TABLE IF NOT EXISTS results (
+    idx INTEGER PRIMARY KEY,
+    domain TEXT, phone_numbers TEXT, social_links TEXT, address TEXT
+);
+CREATE TABLE IF NOT EXISTS failures (
+    idx INTEGER PRIMARY KEY,
+    domain TEXT, http_status INTEGER
+);
+"""
+
+
+class WorkQueue:
+    """Durable crawl queue in a single SQLite file, shared by any number of worker processes.
+
+    Tasks move pending -> leased -> done/failed. A lease that is not renewed before it
+    expires is reclaimed by the next `lease()` call, so a crashed worker's batch is retried.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._conn = sqlite3.connect(str(path), timeout=60, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers never lease the same rows
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self._conn
+
+    def enqueue(self, rows) -> int:
+        """Add (index, domain) rows; already queued indexes are left alone, so reruns are safe."""
+        conn = self._transaction()
+        try:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO tasks (idx, domain) VALUES (?, ?)",
+                ((index, domain) for index, domain in rows if domain),
+            )
+            added = conn.total_changes - before
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def lease(self, owner: str, batch_size: int, lease_seconds: float = LEASE_SECONDS) -> list[tuple[int, str]]:
+        now = time.time()
+        conn = self._transaction()
+        try:
+            # Reclaim expired leases; domains that keep killing workers are given up on
+            conn.execute(
+                "UPDATE tasks SET state = 'failed', owner = NULL WHERE state = 'leased' "
+                "AND lease_expires < ? AND attempts >= ?", (now, MAX_ATTEMPTS))
+            conn.execute(
+                "INSERT OR IGNORE INTO failures (idx, domain, http_status) "
+                "SELECT idx, domain, NULL FROM tasks WHERE state = 'failed' AND owner IS NULL")
+            conn.execute(
+                "UPDATE tasks SET state = 'pending', owner = NULL WHERE state = 'leased' AND lease_expires < ?",
+                (now,))
+            batch = conn.execute(
+                "SELECT idx, domain FROM tasks WHERE state = 'pending' ORDER BY idx LIMIT ?", (batch_size,)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE tasks SET state = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE idx = ?",
+                ((owner, now + lease_seconds, index) for index, _ in batch),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return batch
+
+    def renew(self, owner: str, lease_seconds: float = LEASE_SECONDS):
+        self._conn.execute(
+            "UPDATE tasks SET lease_expires = ? WHERE owner = ? AND state = 'leased'",
+            (time.time() + lease_seconds, owner),
+        )
+
+    def _finish(self, owner: str, index: int, state: str, table: str, values: tuple):
+        conn = self._transaction()
+        try:
+            # Only the current lease holder may report; a reclaimed task belongs to someone else now
+            updated = conn.execute(
+                "UPDATE tasks SET state = ?, owner = '' WHERE idx = ? AND owner = ? AND state = 'leased'",
+                (state, index, owner),
+            ).rowcount
+            if updated:
+                placeholders = ", ".join("?" for _ in values)
+                conn.execute(f"INSERT OR REPLACE INTO {table} VALUES (?, {placeholders})", (index, *values))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def complete(self, owner: str, index: int, row: dict):
+        self._finish(owner, index, "done", "results",
+                     (row["domain"], row["phone_numbers"], row["social_links"], row["address"]))
+
+    def fail(self, owner: str, index: int, domain: str, status: int | None):
+        self._finish(owner, index, "failed", "failures", (domain, status))
+
+    def counts(self) -> dict[str, int]:
+        return dict(self._conn.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall())
+
+    def outstanding(self) -> int:
+        counts = self.counts()
+        return counts.get("pending", 0) + counts.get("leased", 0)
+
+    def export(self, output_csv: Path, failed_csv: Path) -> tuple[int, int]:
+        """Write results and failures to the usual scraper CSVs, in input order."""
+        written = []
+        for path, query, header in (
+            (output_csv, "SELECT domain, phone_numbers, social_links, address FROM results ORDER BY idx",
+             ["domain", "phone_numbers", "social_links", "address"]),
+            (failed_csv, "SELECT domain, http_status FROM failures ORDER BY idx", ["domain", "http_status"]),
+        ):
+            with open(path, "w", newline="", encoding="utf-8") as file:
+                writer = csv.writer(file)
+                writer.writerow(header)
+                count = 0
+                for row in self._conn.execute(query):
+                    writer.writerow(row)
+                    count += 1
+            written.append(count)
+        return written[0], written[1]
+
+    def iter_outcomes(self):
+        """(index, input domain, result row or None, failure row or None) for every finished task, in input order."""
+        query = ("SELECT t.idx, t.domain, r.domain, r.phone_numbers, r.social_links, r.address, f.http_status, "
+                 "f.idx IS NOT NULL FROM tasks t LEFT JOIN results r ON r.idx = t.idx "
+                 "LEFT JOIN failures f ON f.idx = t.idx WHERE t.state IN ('done', 'failed') ORDER BY t.idx")
+        for idx, domain, url, phones, links, address, status, failed in self._conn.execute(query):
+            if url is not None:
+                yield idx, domain, {"domain": url, "phone_numbers": phones, "social_links": links,
+                                    "address": address}, None
+            elif failed:
+                yield idx, domain, None, {"http_status": status}
+
+    def close(self):
+        self._conn.close()
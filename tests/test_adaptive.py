@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+
+from scraper.adaptive import AdaptiveController, DEFAULT_TIMEOUT, INITIAL_HOST_CONCURRENCY, MIN_CONCURRENCY, \
+    MIN_TIMEOUT
+from scraper.crawler import URL_VARIANTS
+
+
+def test_single_host_failures_only_throttle_that_host():
+    controller = AdaptiveController(initial=20)
+
+    controller.record("https://slow.com", 503, 1.0)
+    assert controller.limit == 20
+    assert controller._host(controller._key("https://slow.com")).limit < INITIAL_HOST_CONCURRENCY
+
+    for _ in range(50):
+        controller.record("https://fast.com", 200, 0.1)
+    assert controller.limit > 20
+
+def test_dead_hosts_do_not_pin_the_global_limit():
+    controller = AdaptiveController(initial=20)
+    for i in range(1000):
+        # Roughly 30% of domains never answer
+        if i % 10 < 3:
+            controller.record(f"https://dead{i}.com", None, 5.0, timed_out=True)
+        else:
+            controller.record(f"https://alive{i}.com", 200, 0.05)
+    assert controller.limit >= 100
+
+def test_congestion_across_answering_hosts_lowers_the_limit():
+    controller = AdaptiveController(initial=40)
+    hosts = [f"https://site{i}.com" for i in range(10)]
+    for host in hosts * 3:
+        controller.record(host, 200, 0.1)
+    limit = controller.limit
+    for host in hosts * 2:
+        controller.record(host, 503, 0.1)
+    assert controller.limit < limit
+
+def test_latency_inflation_lowers_the_limit():
+    controller = AdaptiveController(initial=40)
+    for i in range(60):
+        controller.record(f"https://site{i}.com", 200, 0.05)
+    limit = controller.limit
+    for i in range(60):
+        controller.record(f"https://site{i}.com", 200, 1.0)
+    assert controller.limit < limit
+
+def test_limit_never_drops_below_minimum():
+    controller = AdaptiveController(initial=MIN_CONCURRENCY)
+    controller._global.decrease()
+    controller._global._last_decrease = -100
+    controller._global.decrease()
+    assert controller.limit == MIN_CONCURRENCY
+
+def test_timeout_follows_observed_latency():
+    controller = AdaptiveController()
+    assert controller.timeout_for("https://a.com") == DEFAULT_TIMEOUT
+
+    for _ in range(30):
+        controller.record("https://a.com", 200, 0.5)
+    assert controller.timeout_for("https://a.com") == MIN_TIMEOUT
+    assert controller.timeout_for("https://unseen.com") == MIN_TIMEOUT
+
+def test_host_key_is_scheme_and_hostname():
+    controller = AdaptiveController()
+    assert controller._key("https://www.a.com/x") == controller._key("https://www.a.com/y") == "https://www.a.com"
+    # Each URL variant a domain races has its own limiter
+    assert len({controller._key(prefix + "a.com") for prefix in URL_VARIANTS}) == len(URL_VARIANTS)
+    # Sites sharing a CDN address still get their own limiters
+    assert controller._key("https://b.com") != controller._key("https://a.com")
+
+@pytest.mark.asyncio
+async def test_variant_race_is_not_serialized_after_a_timeout():
+    controller = AdaptiveController()
+    for prefix in URL_VARIANTS:
+        controller.record(prefix + "dead.com", None, 5.0, timed_out=True)
+    active = []
+    peak = []
+
+    async def hit(url):
+        async with controller.slot(url):
+            active.append(1)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.pop()
+
+    await asyncio.gather(*(hit(prefix + "dead.com") for prefix in URL_VARIANTS))
+    assert max(peak) == len(URL_VARIANTS)
+
+@pytest.mark.asyncio
+async def test_slot_respects_per_host_limit():
+    controller = AdaptiveController()
+    active = []
+    peak = []
+
+    async def hit():
+        async with controller.slot("https://a.com"):
+            active.append(1)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.pop()
+
+    await asyncio.gather(*(hit() for _ in range(INITIAL_HOST_CONCURRENCY + 4)))
+    assert max(peak) == INITIAL_HOST_CONCURRENCY
@@ -1,6 +1,6 @@
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from api.api import app
 
 client = TestClient(app)
@@ -17,9 +17,16 @@ mock_company = {
 }
 
 @pytest.fixture
-def es_search_mock():
-    with patch("api.api.es.search") as mock_search:
-        yield mock_search
+def es_mock():
+    es = MagicMock()
+    es.options.return_value.search = AsyncMock()
+    es.options.return_value.cluster.health = AsyncMock()
+    with patch("api.api.es", es):
+        yield es
+
+@pytest.fixture
+def es_search_mock(es_mock):
+    yield es_mock.options.return_value.search
 
 def test_match_company_found(es_search_mock):
     # Mock ES to return a hit
@@ -67,3 +74,232 @@ def test_match_company_partial_fields(es_search_mock):
     assert response.status_code == 200
     data = response.json()
     assert data["match_found"] is True
+
+def test_build_query_uses_exact_keys():
+    from api.api import build_query, CompanyInput
+    query = build_query(CompanyInput(
+        website="https://www.TestCompany.com/about",
+        phone="+1 (123) 456-7890",
+        facebook="https://www.facebook.com/TestCompany/",
+    ))
+    should = query["query"]["bool"]["should"]
+
+    terms = {clause["constant_score"]["filter"]["term"].popitem() for clause in should}
+    assert terms == {("domain_key", "testcompany.com"), ("domain_aliases", "testcompany.com"),
+                     ("phone_digits", "1234567890"), ("facebook_handles", "testcompany")}
+    assert not any("fuzziness" in str(clause) for clause in should)
+
+def test_match_company_without_usable_fields_skips_es(es_search_mock):
+    response = client.post("/match_company", json={"phone": "n/a"})
+    assert response.json() == {"match_found": False, "company_profile": None}
+    es_search_mock.assert_not_called()
+
+def test_health_reports_es_state(es_mock):
+    assert client.get("/health").json() == {"ready": True}
+
+    es_mock.options.return_value.cluster.health.side_effect = ConnectionError("down")
+    response = client.get("/health")
+    assert response.status_code == 503
+    assert response.json() == {"ready": False}
+
+def test_lifespan_warms_up_and_closes_client():
+    with patch("api.api.AsyncElasticsearch") as client_class:
+        instance = client_class.return_value
+        instance.cluster.health = AsyncMock()
+        instance.search = AsyncMock()
+        instance.close = AsyncMock()
+        instance.options.return_value.indices.get_mapping = AsyncMock(
+            return_value={"companies": {"mappings": {"_meta": {"generation": 7}}}})
+
+        with TestClient(app) as lifespan_client:
+            assert app.state.ready is True
+            instance.search.assert_awaited_once()
+            assert lifespan_client.get("/stats").json()["match_cache"]["generation"] == 7
+
+        instance.close.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_warm_up_skips_a_missing_index_without_retrying():
+    from elasticsearch import NotFoundError
+    from api import api
+    es = MagicMock()
+    es.cluster.health = AsyncMock()
+    es.search = AsyncMock(side_effect=NotFoundError("index_not_found_exception", MagicMock(status=404), {}))
+    with patch("api.api.es", es), patch("api.api.asyncio.sleep", AsyncMock()) as sleep:
+        assert await api._warm_up() is True
+    es.search.assert_awaited_once()
+    sleep.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_warm_up_retries_only_connection_errors():
+    from elasticsearch import ConnectionError as ESConnectionError
+    from api import api
+    es = MagicMock()
+    es.cluster.health = AsyncMock(side_effect=ESConnectionError("refused"))
+    with patch("api.api.es", es), patch("api.api.asyncio.sleep", AsyncMock()):
+        assert await api._warm_up() is False
+    assert es.cluster.health.await_count == api.WARMUP_ATTEMPTS
+
+    es.cluster.health = AsyncMock(side_effect=ValueError("bad config"))
+    with patch("api.api.es", es), patch("api.api.asyncio.sleep", AsyncMock()):
+        assert await api._warm_up() is False
+    es.cluster.health.assert_awaited_once()
+
+def _msearch_hit(name, score):
+    return {"hits": {"hits": [{"_score": score, "_source": {"company_commercial_name": name}}]}}
+
+def _ndjson(response):
+    import json
+    return [json.loads(line) for line in response.text.splitlines()]
+
+def test_match_company_batch_json_array(es_mock):
+    es_mock.options.return_value.msearch = AsyncMock(return_value={"responses": [
+        _msearch_hit("Acme", 7.5),
+        {"error": {"reason": "shard failure"}},
+    ]})
+
+    response = client.post("/match_company/batch", json=[
+        {"name": "Acme"},
+        {"phone": "(123) 456-7890"},
+        {},
+        {"name": ["not", "a", "string"]},
+    ])
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = _ndjson(response)
+    assert [line["index"] for line in lines] == [0, 1, 2, 3]
+    assert lines[0]["match_found"] is True and lines[0]["score"] == 7.5
+    assert lines[1]["error"] == "shard failure"
+    assert lines[2]["match_found"] is False
+    assert "error" in lines[3]
+    # Two searchable records -> one _msearch with header/body pairs
+    assert len(es_mock.options.return_value.msearch.call_args.kwargs["searches"]) == 4
+
+def test_match_company_batch_ndjson_chunks(es_mock, monkeypatch):
+    monkeypatch.setattr("api.api.MSEARCH_CHUNK", 2)
+    es_mock.options.return_value.msearch = AsyncMock(side_effect=[
+        {"responses": [_msearch_hit("A", 1.0), _msearch_hit("B", 2.0)]},
+        ConnectionError("es down"),
+    ])
+    body = "\n".join(['{"name": "A"}', '{"name": "B"}', '{"name": "C"}'])
+
+    response = client.post("/match_company/batch", content=body,
+                           headers={"content-type": "application/x-ndjson"})
+
+    lines = _ndjson(response)
+    assert [line.get("company_profile", {}) and line["company_profile"]["company_commercial_name"]
+            for line in lines[:2]] == ["A", "B"]
+    assert "es down" in lines[2]["error"]
+
+def test_match_company_batch_rejects_invalid_json(es_mock):
+    response = client.post("/match_company/batch", content="[{", headers={"content-type": "application/json"})
+    assert response.status_code == 400
+
+def test_match_company_batch_isolates_malformed_ndjson_lines(es_mock):
+    es_mock.options.return_value.msearch = AsyncMock(return_value={"responses": [
+        _msearch_hit("A", 1.0), _msearch_hit("C", 3.0),
+    ]})
+    body = "\n".join(['{"name": "A"}', '{"name": "B"', '{"name": "C"}'])
+
+    response = client.post("/match_company/batch", content=body,
+                           headers={"content-type": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    lines = _ndjson(response)
+    assert [line["index"] for line in lines] == [0, 1, 2]
+    assert lines[0]["match_found"] is True and lines[2]["match_found"] is True
+    assert lines[1]["error"].startswith("Invalid JSON")
+
+def test_match_company_batch_rejects_non_utf8_body(es_mock):
+    response = client.post("/match_company/batch", content=b'{"name": "\xff\xfe"}',
+                           headers={"content-type": "application/x-ndjson"})
+    assert response.status_code == 400
+
+def test_match_company_exact_hit_skips_es(es_search_mock, tmp_path):
+    from api.identifier_index import IdentifierIndex
+    path = tmp_path / "merged.json"
+    path.write_text('{"domain": "acme.com", "company_commercial_name": "Acme", "phone_numbers": "212 555 0100"}\n')
+
+    with patch("api.api.identifier_index", IdentifierIndex(path)):
+        response = client.post("/match_company", json={"website": "www.acme.com", "phone": "212-555-0100"})
+        assert response.json()["company_profile"]["company_commercial_name"] == "Acme"
+        es_search_mock.assert_not_called()
+
+        stats = client.get("/stats").json()
+        assert stats["identifier_index"]["hits"] == 1
+
+        # Name-only input still goes to Elasticsearch
+        es_search_mock.return_value = {"hits": {"hits": []}}
+        client.post("/match_company", json={"name": "Acme"})
+        es_search_mock.assert_awaited_once()
+
+def test_match_company_repeat_lookup_served_from_cache(es_search_mock):
+    from api.match_cache import MatchCache
+    es_search_mock.return_value = {"hits": {"hits": [mock_company]}}
+
+    with patch("api.api.match_cache", MatchCache()) as cache:
+        first = client.post("/match_company", json={"name": "Test Company", "website": "testcompany.com"})
+        again = client.post("/match_company", json={"name": " test  COMPANY ", "website": "https://www.testcompany.com/"})
+
+        assert again.json() == first.json()
+        es_search_mock.assert_awaited_once()
+        assert cache.summary()["hits"] == 1
+
+        # A reindex (new generation) drops the cached answer
+        cache.set_generation(2)
+        client.post("/match_company", json={"name": "Test Company", "website": "testcompany.com"})
+        assert es_search_mock.await_count == 2
+
+@pytest.mark.asyncio
+async def test_identifier_file_reload_clears_match_cache(tmp_path, monkeypatch):
+    import asyncio
+    import os
+    from api.api import _watch_identifier_source
+    from api.identifier_index import IdentifierIndex
+    from api.match_cache import MatchCache
+    path = tmp_path / "merged.json"
+    path.write_text('{"domain": "acme.com", "company_commercial_name": "Acme"}\n')
+    index = IdentifierIndex(path)
+    cache = MatchCache()
+    cache.put(("single", "acme", "acme.com", "", ""), {"match_found": True})
+
+    path.write_text('{"domain": "acme.com", "company_commercial_name": "Acme Renamed"}\n')
+    os.utime(path, (1, 1))
+    monkeypatch.setattr("api.api.IDENTIFIER_RELOAD_INTERVAL", 0)
+    with patch("api.api.match_cache", cache):
+        watcher = asyncio.create_task(_watch_identifier_source(index))
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if len(cache) == 0:
+                break
+        watcher.cancel()
+
+    assert len(cache) == 0 and cache.summary()["invalidations"] == 1
+    assert index.lookup("acme.com")["company_commercial_name"] == "Acme Renamed"
+
+def test_embedded_backend_needs_no_elasticsearch(tmp_path):
+    from api.embedded import EmbeddedMatcher
+    matcher = EmbeddedMatcher.build([{"domain": "acme.com", "company_commercial_name": "Acme Plumbing",
+                                      "company_all_available_names": "Acme Plumbing"}])
+
+    with patch("api.api.es", None), patch("api.api.embedded", matcher):
+        assert client.get("/health").json() == {"ready": True}
+        response = client.post("/match_company", json={"name": "acme plumbng"})
+        assert response.json()["company_profile"]["domain"] == "acme.com"
+
+        lines = _ndjson(client.post("/match_company/batch", json=[{"name": "acme"}, {"name": "zzzz"}]))
+        assert lines[0]["match_found"] is True and lines[0]["score"] > 0
+        assert lines[1]["match_found"] is False
+
+def test_metrics_endpoint_reports_per_shape_timings(es_search_mock):
+    es_search_mock.return_value = {"hits": {"hits": []}}
+    client.post("/match_company", json={"name": "Metrics Co", "phone": "212 555 0100"})
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'api_request_seconds_count{endpoint="match_company",shape="name+phone"}' in response.text
+    assert 'api_es_query_seconds_count{endpoint="match_company",shape="name+phone"}' in response.text
+    assert 'api_match_source_total{source="elasticsearch"}' in response.text
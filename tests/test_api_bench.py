@@ -0,0 +1,32 @@
+import pytest
+
+from benchmarks.api_bench import build_queries, run_in_process, _histogram
+
+
+def test_build_queries_follows_mix_and_seed():
+    queries = build_queries(200, seed=5, mix={"phone": 0.5, "name+website": 0.5})
+
+    assert queries == build_queries(200, seed=5, mix={"phone": 0.5, "name+website": 0.5})
+    assert {frozenset(q) for q in queries} == {frozenset({"phone"}), frozenset({"name", "website"})}
+
+
+def test_histogram_buckets():
+    counts = _histogram([0.5, 1.0, 3.0, 15.0, 5000.0])
+    assert counts["<=1ms"] == 2
+    assert counts["<=5ms"] == 1
+    assert counts["<=20ms"] == 1
+    assert counts["inf"] == 1
+
+
+@pytest.mark.asyncio
+async def test_run_in_process_reports_levels_and_errors():
+    queries = build_queries(50, mix={"name": 1.0})
+    results = await run_in_process(queries, [1, 4], requests=40, es_latency_ms=0, es_error_rate=1.0,
+                                   use_cache=False, use_identifier_index=False)
+
+    assert [r["concurrency"] for r in results] == [1, 4]
+    assert all(r["requests"] == 40 for r in results)
+    # Every stand-in search fails, so every name-only request errors out
+    assert results[0]["error_rate"] == 1.0
+    assert results[0]["errors"] == {"500": 40}
+    assert sum(results[0]["histogram"].values()) == 40
@@ -2,8 +2,8 @@ import aiohttp
 import pytest
 from unittest.mock import AsyncMock, patch
 
-from scraper.crawler import extract_phone_numbers, extract_social_links, extract_address, _decode_response, _fetch, \
-    fetch_html, try_fetch_with_fallback
+from scraper.crawler import extract_phone_numbers, extract_social_links, extract_address, extract_page_data, \
+    _read_body, RawPage, _fetch, fetch_html, try_fetch_with_fallback, UNVERIFIED_SSL
 
 
 @pytest.mark.parametrize("html,expected_phones", [
@@ -37,34 +37,60 @@ def test_extract_address(html, expected_address):
     addr = extract_address(html)
     assert addr == expected_address
 
+class DummyContent:
+    def __init__(self, chunks):
+        self._chunks = list(chunks)
+
+    async def iter_chunked(self, size):
+        while self._chunks:
+            yield self._chunks.pop(0)
+
+    def at_eof(self):
+        return not self._chunks
+
+class DummyBodyResp:
+    def __init__(self, chunks, charset=None, content_length=None):
+        self.content = DummyContent(chunks)
+        self.charset = charset
+        self.content_length = content_length
+        self.url = "http://test.com"
+        self.headers = {"Content-Type": "text/html"}
+
 @pytest.mark.asyncio
-async def test_decode_response_success():
-    # Mock response.text returns "test"
-    class DummyResp:
-        async def text(self):
-            return "test"
-    resp = DummyResp()
-    result = await _decode_response(resp)
-    assert result == "test"
+async def test_read_body_uses_header_charset():
+    resp = DummyBodyResp(["<p>café</p>".encode("latin-1")], charset="ISO-8859-1")
+    page = await _read_body(resp)
+    assert isinstance(page, RawPage)
+    assert page.encoding == "iso8859-1"
+    assert not page.truncated
+    assert extract_page_data(page)["phone_numbers"] == []
 
 @pytest.mark.asyncio
-async def test_decode_response_unicode_error():
-    class DummyResp:
-        async def text(self):
-            raise UnicodeDecodeError("utf-8", b"", 0, 1, "reason")
-        async def read(self):
-            return b"fallback bytes"
-    resp = DummyResp()
-    result = await _decode_response(resp)
-    assert isinstance(result, str)
+async def test_read_body_sniffs_meta_charset_and_parses_bytes():
+    html = '<meta charset="windows-1252"><p>Café (123) 456-7890</p>'.encode("cp1252")
+    page = await _read_body(DummyBodyResp([html]))
+    assert page.encoding == "cp1252"
+    assert extract_page_data(page)["phone_numbers"] == ["(123) 456-7890"]
 
 @pytest.mark.asyncio
-@patch("scraper.crawler._decode_response")
+async def test_read_body_stops_at_cap():
+    from scraper import crawler
+    before = dict(crawler.body_stats)
+    resp = DummyBodyResp([b"a" * 10, b"b" * 10, b"c" * 10], content_length=30)
+    page = await _read_body(resp, max_bytes=15)
+    assert page == b"a" * 10 + b"b" * 5
+    assert page.truncated
+    assert resp.content.at_eof() is False
+    assert crawler.body_stats["truncated"] == before["truncated"] + 1
+    assert crawler.body_stats["oversized"] == before["oversized"] + 1
+
+@pytest.mark.asyncio
+@patch("scraper.crawler._read_body")
 @patch("scraper.crawler.aiohttp.ClientSession.get")
-async def test_fetch_success(mock_get, mock_decode):
+async def test_fetch_success(mock_get, mock_read_body):
     mock_response = AsyncMock()
     mock_response.status = 200
-    mock_decode.return_value = "<html></html>"
+    mock_read_body.return_value = "<html></html>"
     mock_get.return_value.__aenter__.return_value = mock_response
 
     async with aiohttp.ClientSession() as session:
@@ -101,3 +127,84 @@ async def test_try_fetch_with_fallback(mock_fetch_html):
     assert html is not None
     assert status == 200
     assert url.startswith("http://")
+
+def test_extract_page_data_single_parse():
+    html = (
+        '<p>Call (123) 456-7890</p><script>var fake = "555-555-5555";</script>'
+        '<a href="https://facebook.com/acme">fb</a>'
+        '<address>12 Main St, NY 12345</address>'
+    )
+    data = extract_page_data(html)
+
+    assert data["phone_numbers"] == ["(123) 456-7890"]
+    assert data["social_links"] == ["https://facebook.com/acme"]
+    assert data["address"] == "12 Main St, NY 12345"
+
+def test_address_regex_long_text_is_fast():
+    import time
+    text = "1 " * 50000
+    start = time.perf_counter()
+    assert extract_address(f"<p>{text}</p>") is None
+    assert time.perf_counter() - start < 5
+
+@pytest.mark.asyncio
+@patch("scraper.crawler.fetch_html")
+async def test_try_fetch_with_fallback_race_takes_fastest(mock_fetch_html):
+    import asyncio
+    from scraper import crawler
+    crawler.preferred_variants.clear()
+    cancelled = []
+
+    async def fake_fetch(session, url, **kwargs):
+        if url == "https://www.slow.com":
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(url)
+                raise
+        return "<html></html>", 200
+
+    mock_fetch_html.side_effect = fake_fetch
+    url, html, status = await try_fetch_with_fallback(AsyncMock(), "slow.com", stagger=0.01)
+
+    assert url == "https://slow.com"
+    assert status == 200
+    assert cancelled == ["https://www.slow.com"]
+    assert crawler.preferred_variants["slow.com"] == "https://"
+
+@pytest.mark.asyncio
+@patch("scraper.crawler.fetch_html")
+async def test_try_fetch_with_fallback_prefers_previous_winner(mock_fetch_html):
+    from scraper import crawler
+    crawler.preferred_variants["known.com"] = "http://"
+    mock_fetch_html.return_value = ("<html></html>", 200)
+
+    url, html, status = await try_fetch_with_fallback(AsyncMock(), "known.com")
+
+    assert url == "http://known.com"
+    assert mock_fetch_html.call_args_list[0].args[1] == "http://known.com"
+
+@pytest.mark.asyncio
+@patch("scraper.crawler.aiohttp.ClientSession.get")
+async def test_fetch_sends_validators_and_handles_304(mock_get):
+    from scraper.http_cache import HttpCache
+    cache = HttpCache()
+    cache.remember_response("http://test.com", "http://test.com/", '"v1"', None)
+    cache.store("http://test.com", "<html></html>", {"phone_numbers": [], "social_links": [], "address": None})
+
+    mock_response = AsyncMock()
+    mock_response.status = 304
+    mock_get.return_value.__aenter__.return_value = mock_response
+
+    async with aiohttp.ClientSession() as session:
+        html, status = await _fetch(session, "http://test.com", ssl_flag=False, cache=cache)
+
+    assert (html, status) == (None, 304)
+    assert mock_get.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+    assert mock_get.call_args.kwargs["ssl"] is UNVERIFIED_SSL
+
+
+def test_unverified_ssl_context_skips_verification():
+    import ssl
+    assert isinstance(UNVERIFIED_SSL, ssl.SSLContext)
+    assert UNVERIFIED_SSL.verify_mode == ssl.CERT_NONE and not UNVERIFIED_SSL.check_hostname
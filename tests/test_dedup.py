@@ -0,0 +1,74 @@
+import json
+
+import numpy as np
+
+from api.identifier_index import IdentifierIndex
+from indexing.dedup import MAX_BLOCK, Record, candidate_pairs, dedup_file, deduplicate, is_match, lsh_blocks, \
+    minhash_signatures
+
+DOCS = [
+    {"domain": "acmeplumbing.com", "company_commercial_name": "Acme Plumbing",
+     "company_all_available_names": "Acme Plumbing | Acme Plumbing LLC", "phone_numbers": "(626) 483-6280",
+     "social_links": "https://www.facebook.com/AcmePlumbing/", "address": None},
+    {"domain": "acme-plumbing-la.com", "company_commercial_name": "Acme Plumbing Los Angeles",
+     "phone_numbers": "+1 626 483 6280; (626) 483-6281", "social_links": None, "address": "1 Main St, CA 91791"},
+    # Same builder account on both sites, nothing else in common
+    {"domain": "rosebakery.com", "company_commercial_name": "Rose Bakery",
+     "social_links": "https://www.facebook.com/wix; https://twitter.com/wix", "phone_numbers": None},
+    {"domain": "northdental.com", "company_commercial_name": "North Dental",
+     "social_links": "https://www.facebook.com/wix; https://twitter.com/wix", "phone_numbers": None},
+    # Same name, different towns
+    {"domain": "joespizza-ny.com", "company_commercial_name": "Joe's Pizza", "phone_numbers": "212 555 0100"},
+    {"domain": "joespizza-tx.com", "company_commercial_name": "Joe's Pizza", "phone_numbers": "512 555 0199"},
+    {"domain": None, "company_commercial_name": "Acme Plumbing", "phone_numbers": "(626) 483-6280"},
+]
+
+
+def test_match_rules():
+    records = [Record(i, doc) for i, doc in enumerate(DOCS)]
+    assert is_match(records[0], records[1])
+    assert not is_match(records[2], records[3])
+    assert not is_match(records[4], records[5])
+
+
+def test_deduplicate_folds_clusters_into_canonical_profiles():
+    profiles, clusters = deduplicate(DOCS)
+    assert clusters == [["acme-plumbing-la.com", "acmeplumbing.com"]]
+    assert len(profiles) == len(DOCS) - 1
+
+    [acme] = [p for p in profiles if p.get("domain_aliases")]
+    # The record with the most phones and an address is the primary one
+    assert acme["domain"] == "acme-plumbing-la.com"
+    assert acme["domain_aliases"] == ["acmeplumbing.com"]
+    assert acme["phone_digits"] == ["6264836280", "6264836281"]
+    assert acme["facebook_handles"] == ["acmeplumbing"]
+    assert "Acme Plumbing LLC" in acme["company_all_available_names"]
+
+
+def test_minhash_lsh_groups_similar_names_only():
+    tokens = [{"acme", "plumbing", "heating", "cooling"}, {"acme", "plumbing", "heating", "cooling", "la"},
+              {"globex", "logistics"}, set()]
+    signatures = minhash_signatures(tokens)
+    assert (signatures[3] == -1).all()
+    assert np.array_equal(signatures, minhash_signatures(tokens, batch=1))
+    blocks = [sorted(block.tolist()) for block in lsh_blocks(signatures)]
+    assert [0, 1] in blocks
+    assert not any(2 in block or 3 in block for block in blocks)
+
+
+def test_big_blocks_use_a_sorted_window():
+    docs = [{"domain": f"site{i}.com", "company_commercial_name": f"Shop {i:04d}"} for i in range(MAX_BLOCK * 4)]
+    records = [Record(i, doc) for i, doc in enumerate(docs)]
+    pairs = list(candidate_pairs(records, [list(range(len(docs)))], window=3))
+    # Linear in the block size, not quadratic
+    assert len(pairs) < len(docs) * 3
+    assert len(set(pairs)) == len(pairs)
+
+
+def test_dedup_file_feeds_alias_lookups(tmp_path):
+    merged = tmp_path / "merged.json"
+    merged.write_text("".join(json.dumps(doc) + "\n" for doc in DOCS))
+    assert dedup_file(merged, merged, tmp_path / "clusters.json") == (7, 6, 1)
+
+    index = IdentifierIndex(merged)
+    assert index.lookup("https://acmeplumbing.com", None, None)["domain"] == "acme-plumbing-la.com"
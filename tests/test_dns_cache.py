@@ -0,0 +1,68 @@
+import socket
+import pytest
+from unittest.mock import patch
+
+from scraper.dns_cache import DnsCache, PreResolvedResolver, pre_resolve
+
+
+def test_dns_cache_persists_and_expires(tmp_path, monkeypatch):
+    path = tmp_path / "dns.sqlite"
+    cache = DnsCache(path)
+    cache.put("alive.com", ["10.0.0.1"])
+    cache.put("dead.com", [])
+    cache.save()
+
+    reloaded = DnsCache(path)
+    assert reloaded.get("alive.com") == ["10.0.0.1"]
+    assert reloaded.get("dead.com") == []
+    assert reloaded.get("unknown.com") is None
+
+    monkeypatch.setattr("scraper.dns_cache.time.time", lambda: 1e12)
+    assert reloaded.get("alive.com") is None
+
+@pytest.mark.asyncio
+@patch("scraper.dns_cache._resolve_host")
+async def test_pre_resolve_drops_nxdomain(mock_resolve):
+    answers = {
+        "ok.com": ["10.0.0.1"], "www.ok.com": [],
+        "gone.com": [], "www.gone.com": [],
+        "flaky.com": None, "www.flaky.com": None,
+    }
+    mock_resolve.side_effect = lambda host: answers[host]
+    cache = DnsCache()
+
+    alive, dead = await pre_resolve(["ok.com", "gone.com", "flaky.com"], cache)
+
+    assert alive == ["ok.com", "flaky.com"]
+    assert dead == ["gone.com"]
+    assert cache.get("gone.com") == []
+    assert cache.get("flaky.com") is None
+
+@pytest.mark.asyncio
+async def test_pre_resolved_resolver_serves_cache():
+    cache = DnsCache()
+    cache.put("ok.com", ["10.0.0.1"])
+    resolver = PreResolvedResolver(cache)
+
+    results = await resolver.resolve("ok.com", 443, socket.AF_UNSPEC)
+
+    assert results[0]["host"] == "10.0.0.1"
+    assert results[0]["port"] == 443
+
+@pytest.mark.asyncio
+async def test_dns_cache_serves_from_memory_and_flushes_in_batches(tmp_path):
+    path = tmp_path / "dns.sqlite"
+    cache = DnsCache(path)
+    with patch.object(cache._store, "put_many", wraps=cache._store.put_many) as put_many, \
+            patch("scraper.kvstore.SqliteDict.__getitem__", side_effect=AssertionError("SQLite read on lookup")):
+        cache.put("a.com", ["10.0.0.1"])
+        cache.put("b.com", [])
+        assert cache.get("a.com") == ["10.0.0.1"]
+        assert DnsCache(path).get("a.com") is None
+
+        await cache.flush()
+        await cache.flush()
+
+    put_many.assert_called_once()
+    assert put_many.call_args.args[0].keys() == {"a.com", "b.com"}
+    assert DnsCache(path).get("b.com") == []
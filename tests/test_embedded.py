@@ -0,0 +1,67 @@
+import json
+import os
+
+import pytest
+
+from api.embedded import EmbeddedMatcher, normalize_name, trigrams
+
+DOCS = [
+    {"domain": "acme.com", "company_commercial_name": "Acme Plumbing",
+     "company_all_available_names": "Acme Plumbing | Acme Plumbing & Heating LLC",
+     "phone_numbers": "+1 (626) 483-6280", "social_links": "https://www.facebook.com/AcmePlumbing/"},
+    {"domain": "globex.com", "company_commercial_name": "Globex Corporation",
+     "company_all_available_names": "Globex Corporation", "phone_numbers": "212 555 0100"},
+    {"domain": "initech.com", "company_commercial_name": "Initech",
+     "company_all_available_names": "Initech | Initrode", "phone_numbers": None},
+]
+
+
+@pytest.fixture
+def matcher():
+    return EmbeddedMatcher.build(DOCS)
+
+
+def test_normalize_name_and_trigrams():
+    assert normalize_name("  Acme, Plumbing & Heating! ") == "acme plumbing heating"
+    assert trigrams("ab") == {"  a", " ab", "ab "}
+    assert trigrams("") == set()
+
+
+def test_fuzzy_name_match(matcher):
+    score, profile = matcher.match(name="acme plumbin")
+    assert profile["domain"] == "acme.com"
+    assert score > 0
+
+    # A secondary name is matched through company_all_available_names
+    assert matcher.match(name="Initrode")[1]["domain"] == "initech.com"
+    assert matcher.match(name="qqqq zzzz") is None
+
+
+def test_exact_keys_use_es_boosts(matcher):
+    assert matcher.match(website="https://www.globex.com/about") == (4.0, matcher.match(website="globex.com")[1])
+    assert matcher.match(phone="(212) 555-0100")[0] == 5.0
+    assert matcher.match(facebook="facebook.com/acmeplumbing")[0] == 2.0
+    # A phone hit outweighs a weak name resemblance to another company
+    assert matcher.match(name="Acme", phone="212-555-0100")[1]["domain"] == "globex.com"
+
+
+def test_save_load_roundtrip(matcher, tmp_path):
+    path = tmp_path / "index.npz"
+    matcher.save(path)
+    loaded = EmbeddedMatcher.load(path)
+
+    assert len(loaded) == 3
+    for query in ({"name": "globex corp"}, {"phone": "6264836280"}, {"name": "initech", "website": "initech.com"}):
+        assert loaded.match(**query) == matcher.match(**query)
+
+
+def test_load_or_build_rebuilds_stale_index(tmp_path):
+    source, index = tmp_path / "merged.json", tmp_path / "index.npz"
+    source.write_text("\n".join(json.dumps(d) for d in DOCS[:1]) + "\n")
+    assert len(EmbeddedMatcher.load_or_build(index, source)) == 1
+    assert index.exists()
+
+    source.write_text("\n".join(json.dumps(d) for d in DOCS) + "\n")
+    stat = os.stat(index)
+    os.utime(source, (stat.st_atime, stat.st_mtime + 10))
+    assert len(EmbeddedMatcher.load_or_build(index, source)) == 3
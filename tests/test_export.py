@@ -0,0 +1,130 @@
+import csv
+import gzip
+import io
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.api import app
+from api.embedded import EmbeddedMatcher
+from api.export import ExportFilter, export_stream, iter_index_pages, write_stream
+
+client = TestClient(app)
+
+DOCS = [
+    {"domain": "acme.com", "company_commercial_name": "Acme Plumbing", "phone_numbers": "212 555 0100",
+     "social_links": None, "address": "1 Main St", "domain_aliases": ["acme-nyc.com"]},
+    {"domain": "globex.com", "company_commercial_name": "Globex", "phone_numbers": None,
+     "social_links": "https://www.facebook.com/globex", "address": None, "domain_aliases": []},
+]
+
+
+def _hit(doc: dict, position: int) -> dict:
+    return {"_source": doc, "sort": [position]}
+
+
+def _pit_es(*pages) -> MagicMock:
+    es = MagicMock()
+    client = es.options.return_value
+    client.open_point_in_time = AsyncMock(return_value={"id": "pit-1"})
+    client.search = AsyncMock(side_effect=[{"pit_id": "pit-2", "hits": {"hits": page}} for page in pages])
+    client.close_point_in_time = AsyncMock()
+    return es
+
+
+async def _collect(stream) -> list:
+    return [item async for item in stream]
+
+
+@pytest.mark.asyncio
+async def test_index_pages_follow_search_after_within_one_pit():
+    es = _pit_es([_hit(DOCS[0], 0), _hit(DOCS[1], 1)], [_hit(DOCS[0], 2)])
+
+    pages = await _collect(iter_index_pages(es, "companies", {"match_all": {}}, page_size=2))
+
+    assert [len(page) for page in pages] == [2, 1]
+    client = es.options.return_value
+    first, second = (call.kwargs for call in client.search.await_args_list)
+    assert first["search_after"] is None and first["pit"]["id"] == "pit-1"
+    # The next page continues after the last sort value, on the refreshed PIT id
+    assert second["search_after"] == [1] and second["pit"]["id"] == "pit-2"
+    assert first["sort"] == [{"_shard_doc": "asc"}]
+    client.close_point_in_time.assert_awaited_once_with(id="pit-2")
+
+
+@pytest.mark.asyncio
+async def test_index_pages_close_the_pit_on_failure():
+    es = _pit_es()
+    es.options.return_value.search = AsyncMock(side_effect=ConnectionError("es down"))
+
+    with pytest.raises(ConnectionError):
+        await _collect(iter_index_pages(es, "companies", {"match_all": {}}))
+    es.options.return_value.close_point_in_time.assert_awaited_once_with(id="pit-1")
+
+
+def test_filter_query_and_predicate_agree():
+    export_filter = ExportFilter(name="acme", domain="https://www.acme-nyc.com/", has_phone=True)
+    filters = export_filter.query()["bool"]["filter"]
+    assert {"term": {"domain_aliases": "acme-nyc.com"}} in filters[1]["bool"]["should"]
+    assert {"exists": {"field": "phone_digits"}} in filters
+
+    assert [export_filter.matches(doc) for doc in DOCS] == [True, False]
+    assert ExportFilter(facebook="fb.com/globex").matches(DOCS[1])
+    assert not ExportFilter(has_address=True).matches(DOCS[1])
+    assert ExportFilter().query() == {"match_all": {}}
+
+
+@pytest.mark.asyncio
+async def test_gzip_csv_stream_round_trips(tmp_path):
+    async def pages():
+        yield DOCS
+        yield DOCS[:1]
+
+    output = tmp_path / "companies.csv.gz"
+    await write_stream(export_stream(pages(), "csv", compress=True), output)
+
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(output.read_bytes()).decode())))
+    assert [row["domain"] for row in rows] == ["acme.com", "globex.com", "acme.com"]
+    assert rows[0]["domain_aliases"] == "acme-nyc.com" and rows[1]["phone_numbers"] == ""
+    assert not (tmp_path / "companies.csv.gz.tmp").exists()
+
+
+def test_export_endpoint_streams_the_index_as_ndjson():
+    es = _pit_es([_hit(DOCS[0], 0), _hit(DOCS[1], 1)])
+
+    with patch("api.api.es", es), patch("api.api.embedded", None):
+        response = client.get("/export", params={"has_phone": "true"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line)["domain"] for line in response.text.splitlines()] == ["acme.com", "globex.com"]
+    query = es.options.return_value.search.await_args.kwargs["query"]
+    assert query == {"bool": {"filter": [{"exists": {"field": "phone_digits"}}]}}
+
+
+def test_export_endpoint_gzip_csv_from_embedded_backend():
+    with patch("api.api.es", None), patch("api.api.embedded", EmbeddedMatcher.build(DOCS)):
+        response = client.get("/export", params={"format": "csv", "gzip": "true", "name": "globex"})
+
+    assert response.headers["content-type"] == "application/gzip"
+    assert 'filename="companies.csv.gz"' in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.content).decode())))
+    assert [row["domain"] for row in rows] == ["globex.com"]
+
+
+def test_export_rejects_unknown_format():
+    assert client.get("/export", params={"format": "pdf"}).status_code == 400
+
+
+def test_batch_results_as_csv():
+    with patch("api.api.es", None), patch("api.api.embedded", EmbeddedMatcher.build(DOCS)):
+        response = client.post("/match_company/batch", params={"format": "csv"},
+                               json=[{"name": "acme plumbing"}, {"name": "zzzz"}, {"name": 5}])
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["index"] for row in rows] == ["0", "1", "2"]
+    assert rows[0]["match_found"] == "True" and rows[0]["domain"] == "acme.com"
+    assert rows[1]["match_found"] == "False" and rows[1]["domain"] == ""
+    assert rows[2]["error"]
@@ -0,0 +1,46 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from scraper.extraction import ExtractionStage, StageTimings
+from scraper.run_scraper import process_domain
+
+HTML = '<p>Call (123) 456-7890</p><a href="https://twitter.com/acme">tw</a>'
+
+
+def test_stage_timings_snapshot():
+    timings = StageTimings()
+    timings.record("fetch", 1.0)
+    timings.record("fetch", 3.0)
+
+    stats = timings.snapshot()["fetch"]
+    assert stats["count"] == 2
+    assert stats["avg"] == 2.0
+    assert stats["max"] == 3.0
+
+@pytest.mark.asyncio
+async def test_extraction_stage_process_pool():
+    with ExtractionStage(workers=1) as stage:
+        data = await stage.extract(HTML)
+
+    assert data["phone_numbers"] == ["(123) 456-7890"]
+    assert data["social_links"] == ["https://twitter.com/acme"]
+    assert "extract" in stage.timings.snapshot()
+
+@pytest.mark.asyncio
+async def test_extraction_stage_inline():
+    with ExtractionStage(workers=0) as stage:
+        data = await stage.extract(HTML)
+
+    assert data["phone_numbers"] == ["(123) 456-7890"]
+    assert "extract_cpu" in stage.timings.snapshot()
+
+@pytest.mark.asyncio
+@patch("scraper.run_scraper.try_fetch_with_fallback")
+async def test_process_domain_uses_stage(mock_try_fetch):
+    mock_try_fetch.return_value = ("https://acme.com", HTML, 200)
+
+    with ExtractionStage(workers=0) as stage:
+        result, failure = await process_domain(AsyncMock(), "acme.com", 1, stage)
+
+    assert result["phone_numbers"] == ["(123) 456-7890"]
+    assert "fetch" in stage.timings.snapshot()
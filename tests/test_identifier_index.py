@@ -0,0 +1,65 @@
+import json
+import os
+
+from api.identifier_index import IdentifierIndex
+
+
+def _write(path, docs):
+    path.write_text("\n".join(json.dumps(d) for d in docs) + "\n")
+
+
+DOCS = [
+    {"domain": "acme.com", "company_commercial_name": "Acme", "phone_numbers": "+1 (626) 483-6280",
+     "social_links": "https://www.facebook.com/AcmeCo/"},
+    {"domain": "acme-west.com", "company_commercial_name": "Acme West", "phone_numbers": "626-483-6280"},
+    {"domain": "globex.com", "company_commercial_name": "Globex", "phone_numbers": "212 555 0100"},
+]
+
+
+def test_lookup_exact_identifiers(tmp_path):
+    path = tmp_path / "merged.json"
+    _write(path, DOCS)
+    index = IdentifierIndex(path)
+
+    assert len(index) == 3
+    assert index.lookup(website="https://www.Globex.com/about")["company_commercial_name"] == "Globex"
+    assert index.lookup(phone="(212) 555-0100")["domain"] == "globex.com"
+    assert index.lookup(website="acme.com", facebook="facebook.com/acmeco")["domain"] == "acme.com"
+
+
+def test_lookup_leaves_ambiguous_and_unknown_inputs_to_es(tmp_path):
+    path = tmp_path / "merged.json"
+    _write(path, DOCS)
+    index = IdentifierIndex(path)
+
+    # Shared phone, conflicting identifiers, unknown domain, name-only input
+    assert index.lookup(phone="6264836280") is None
+    assert index.lookup(website="globex.com", phone="6264836280") is None
+    assert index.lookup(website="initech.com") is None
+    assert index.lookup() is None
+
+    assert index.lookup(website="acme.com")["domain"] == "acme.com"
+    # Name-only lookups are not counted
+    assert index.summary()["lookups"] == 4
+    assert index.summary()["hit_ratio"] == 0.25
+
+
+def test_reload_if_changed_swaps_in_new_data(tmp_path):
+    path = tmp_path / "merged.json"
+    _write(path, DOCS[:1])
+    index = IdentifierIndex(path)
+    assert not index.reload_if_changed()
+    assert index.lookup(website="globex.com") is None
+
+    _write(path, DOCS)
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+    assert index.reload_if_changed()
+    assert index.lookup(website="globex.com")["domain"] == "globex.com"
+
+
+def test_missing_file_gives_empty_index(tmp_path):
+    index = IdentifierIndex(tmp_path / "missing.json")
+    assert len(index) == 0
+    assert index.lookup(website="acme.com") is None
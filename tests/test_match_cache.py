@@ -0,0 +1,50 @@
+from unittest.mock import patch
+
+from api.match_cache import MatchCache, cache_key
+
+
+def test_cache_key_normalizes_inputs():
+    assert cache_key("  ACME   Inc ", "https://www.acme.com/", "+1 (626) 483-6280", None) == \
+        cache_key("acme inc", "acme.com", "6264836280", "")
+
+
+def test_lru_eviction_and_counters():
+    cache = MatchCache(max_entries=2, ttl=60)
+    cache.put(("a",), {"v": 1})
+    cache.put(("b",), {"v": 2})
+    assert cache.get(("a",)) == {"v": 1}  # "a" is now most recently used
+    cache.put(("c",), {"v": 3})
+
+    assert cache.get(("b",)) is None
+    assert cache.get(("c",)) == {"v": 3}
+    assert cache.stats == {"hits": 2, "misses": 1, "evictions": 1, "expirations": 0, "invalidations": 0}
+
+
+def test_ttl_expiry():
+    cache = MatchCache(ttl=10)
+    with patch("api.match_cache.time.monotonic", return_value=100.0):
+        cache.put(("a",), {"v": 1})
+    with patch("api.match_cache.time.monotonic", return_value=111.0):
+        assert cache.get(("a",)) is None
+    assert cache.stats["expirations"] == 1
+    assert len(cache) == 0
+
+
+def test_generation_change_invalidates():
+    cache = MatchCache()
+    assert cache.set_generation(1)
+    cache.put(("a",), {"v": 1})
+    assert not cache.set_generation(1)
+    assert cache.get(("a",)) == {"v": 1}
+
+    assert cache.set_generation(2)
+    assert cache.get(("a",)) is None
+    assert cache.summary()["invalidations"] == 1
+
+
+def test_invalidate_drops_everything():
+    cache = MatchCache()
+    cache.put(("a",), {"v": 1})
+    cache.invalidate()
+    assert cache.get(("a",)) is None
+    assert cache.summary()["invalidations"] == 1
@@ -0,0 +1,67 @@
+import io
+import json
+
+import pandas as pd
+
+from indexing.merge import merge_frames, record_fingerprint, write_delta
+from scraper.kvstore import SqliteDict
+
+
+def _read(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_merge_frames_outer_join_with_keys():
+    scraped = pd.DataFrame([{"domain": "https://www.acme.com", "phone_numbers": "212 555 0100",
+                             "social_links": None, "address": None}])
+    sample = pd.DataFrame([
+        {"domain": "acme.com", "company_commercial_name": "Acme", "company_legal_name": None,
+         "company_all_available_names": "Acme"},
+        {"domain": "globex.com", "company_commercial_name": "Globex", "company_legal_name": None,
+         "company_all_available_names": "Globex"},
+    ])
+
+    merged = merge_frames(scraped, sample).set_index("domain")
+
+    assert merged.loc["acme.com", "phone_digits"] == ["2125550100"]
+    assert merged.loc["globex.com", "company_commercial_name"] == "Globex"
+
+
+def test_merge_frames_tolerates_blank_domains():
+    scraped = pd.DataFrame([{"domain": "https://acme.com", "phone_numbers": None, "social_links": None,
+                             "address": None}])
+    # A blank domain cell in the names CSV reads back as NaN
+    sample = pd.read_csv(io.StringIO("domain,company_commercial_name,company_legal_name,company_all_available_names\n"
+                                     "acme.com,Acme,,Acme\n,Nameless,,Nameless\n"))
+
+    merged = merge_frames(scraped, sample)
+
+    assert sorted(merged["domain_key"]) == ["", "acme.com"]
+
+
+def test_record_fingerprint_ignores_key_order():
+    assert record_fingerprint({"a": 1, "b": [2]}) == record_fingerprint({"b": [2], "a": 1})
+    assert record_fingerprint({"a": 1}) != record_fingerprint({"a": 2})
+
+
+def test_write_delta_emits_only_changes(tmp_path):
+    fingerprints = SqliteDict()
+    delta = tmp_path / "delta.json"
+    first = [{"domain": "acme.com", "phone_numbers": "1"}, {"domain": "globex.com", "phone_numbers": "2"},
+             {"domain": None, "phone_numbers": "3"}]
+
+    assert write_delta(first, fingerprints, delta) == {"inserted": 2, "changed": 0, "deleted": 0, "unchanged": 0}
+
+    second = [{"domain": "acme.com", "phone_numbers": "1"}, {"domain": "initech.com", "phone_numbers": "4"},
+              {"domain": "globex.com", "phone_numbers": "22"}]
+    assert write_delta(second, fingerprints, delta) == {"inserted": 1, "changed": 1, "deleted": 0, "unchanged": 1}
+
+    third = [{"domain": "acme.com", "phone_numbers": "1"}]
+    assert write_delta(third, fingerprints, delta)["deleted"] == 2
+
+    # Appended across runs, in order
+    ops = [(change["op"], change["domain"]) for change in _read(delta)]
+    assert ops == [("upsert", "acme.com"), ("upsert", "globex.com"),
+                   ("upsert", "initech.com"), ("upsert", "globex.com"),
+                   ("delete", "globex.com"), ("delete", "initech.com")]
+    assert set(fingerprints) == {"acme.com"}
@@ -0,0 +1,90 @@
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from observability.metrics import Registry, write_metrics
+from scraper.crawler import FETCH_PHASE_SECONDS, failure_reason, fetch_trace_config
+
+
+def test_counter_and_gauge_render():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests", ("status",))
+    requests.inc(status="200")
+    requests.inc(2, status='5"x"')
+    in_flight = registry.gauge("in_flight", "Open requests")
+    with in_flight.track_inprogress():
+        assert in_flight.value() == 1
+    limit = registry.gauge("limit", "Current limit")
+    limit.set_function(lambda: 7)
+
+    text = registry.render()
+
+    assert "# TYPE requests_total counter\n" in text
+    assert 'requests_total{status="200"} 1\n' in text
+    assert 'requests_total{status="5\\"x\\""} 2\n' in text
+    assert "in_flight 0\n" in text
+    assert "limit 7\n" in text
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    latency = registry.histogram("latency_seconds", "Latency", ("phase",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, phase="ttfb")
+
+    text = registry.render()
+
+    assert 'latency_seconds_bucket{phase="ttfb",le="0.1"} 2\n' in text
+    assert 'latency_seconds_bucket{phase="ttfb",le="1"} 3\n' in text
+    assert 'latency_seconds_bucket{phase="ttfb",le="+Inf"} 4\n' in text
+    assert 'latency_seconds_count{phase="ttfb"} 4\n' in text
+    assert 'latency_seconds_sum{phase="ttfb"} 3.65\n' in text
+
+
+def test_registry_reuses_and_validates_metrics(tmp_path):
+    registry = Registry()
+    counter = registry.counter("hits_total", "Hits")
+    assert registry.counter("hits_total", "Hits") is counter
+    with pytest.raises(ValueError):
+        registry.gauge("hits_total", "Hits")
+    with pytest.raises(ValueError):
+        counter.inc(kind="x")
+
+    counter.inc()
+    path = tmp_path / "metrics.prom"
+    write_metrics(path, registry)
+    assert "hits_total 1" in path.read_text()
+
+
+def test_failure_reason_classes():
+    assert failure_reason(asyncio.TimeoutError()) == "timeout"
+    assert failure_reason(aiohttp.ClientPayloadError()) == "payload"
+    assert failure_reason(ValueError()) == "other"
+    assert failure_reason(status=404) == "http_4xx"
+    assert failure_reason(status=503) == "http_5xx"
+
+
+@pytest.mark.asyncio
+async def test_trace_config_records_fetch_phases():
+    async def ok(request):
+        return web.Response(text="ok")
+
+    app = web.Application()
+    app.router.add_get("/", ok)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    before = {phase: FETCH_PHASE_SECONDS.count(phase=phase) for phase in ("connect", "ttfb")}
+    try:
+        async with aiohttp.ClientSession(trace_configs=[fetch_trace_config()]) as session:
+            async with session.get(f"http://127.0.0.1:{port}/") as response:
+                assert await response.text() == "ok"
+    finally:
+        await runner.cleanup()
+
+    for phase in ("connect", "ttfb"):
+        assert FETCH_PHASE_SECONDS.count(phase=phase) == before[phase] + 1
@@ -0,0 +1,44 @@
+import pytest
+
+from indexing.normalize import normalize_phone, normalize_domain, facebook_handle, key_fields
+
+
+@pytest.mark.parametrize("raw,expected", [
+    ("(626) 483-6280", "6264836280"),
+    ("+1 626 483 6280", "6264836280"),
+    ("207.762.9321", "2077629321"),
+    ("n/a", ""),
+    (float("nan"), ""),
+])
+def test_normalize_phone(raw, expected):
+    assert normalize_phone(raw) == expected
+
+@pytest.mark.parametrize("raw,expected", [
+    ("https://www.Acme.com/about-us", "acme.com"),
+    ("https://https//acornlawpc.com/", "acornlawpc.com"),
+    ("acme.com", "acme.com"),
+    (None, ""),
+    (float("nan"), ""),
+])
+def test_normalize_domain(raw, expected):
+    assert normalize_domain(raw) == expected
+
+@pytest.mark.parametrize("raw,expected", [
+    ("https://www.facebook.com/Acme-Co-123/?fref=ts", "acme-co-123"),
+    ("https://www.facebook.com/home.php#!/pages/GentXt/126974930683972", "126974930683972"),
+    ("https://www.facebook.com/profile.php?id=42", "42"),
+    ("http://www.facebook.com/", ""),
+    ("https://www.facebook.com/sharer/sharer.php?u=x", ""),
+    ("https://twitter.com/acme", ""),
+    (float("nan"), ""),
+])
+def test_facebook_handle(raw, expected):
+    assert facebook_handle(raw) == expected
+
+def test_key_fields_from_joined_strings():
+    keys = key_fields({
+        "domain": "www.acme.com",
+        "phone_numbers": "(626) 483-6280; 626.483.6280",
+        "social_links": "https://www.facebook.com/Acme/; https://twitter.com/acme",
+    })
+    assert keys == {"domain_key": "acme.com", "phone_digits": ["6264836280"], "facebook_handles": ["acme"]}
@@ -0,0 +1,86 @@
+import csv
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from scraper.crawler import RawPage
+from scraper.page_archive import PageArchive, decode_record, encode_record, index_path, iter_pages, read_index
+from scraper.reextract import reextract
+from scraper.run_scraper import process_domain
+
+
+def _page(body: bytes, encoding=None) -> RawPage:
+    page = RawPage(body)
+    page.encoding = encoding
+    page.headers = [("Content-Type", "text/html"), ("Content-Length", "999")]
+    return page
+
+
+def test_record_roundtrip():
+    body = "<p>Café (123) 456-7890</p>".encode("cp1252")
+    warc, page = decode_record(encode_record("https://acme.com/", 200, [("Content-Type", "text/html")], body,
+                                             {"X-Sniffed-Charset": "cp1252"}))
+    assert warc["WARC-Type"] == "response" and warc["status"] == "200"
+    assert page == body
+    assert page.url == "https://acme.com/"
+    assert page.encoding == "cp1252"
+    assert ("Content-Type", "text/html") in page.headers
+
+
+@pytest.mark.asyncio
+async def test_archive_appends_across_runs_and_cuts_torn_tail(tmp_path):
+    path = tmp_path / "pages.warc.gz"
+    archive = PageArchive(path)
+    await archive.append(0, "acme.com", "https://acme.com", 200, _page(b"<p>old</p>"))
+    await archive.append(1, "globex.com", "https://globex.com", 200, _page(b"<p>globex</p>", "utf-8"))
+    archive.close()
+
+    # Crash after a record was written but before its index line
+    with open(path, "ab") as file:
+        file.write(b"\x1f\x8b torn")
+    archive = PageArchive(path)
+    await archive.append(0, "acme.com", "https://www.acme.com", 200, _page(b"<p>new</p>"))
+    archive.close()
+
+    assert [entry["domain"] for entry in read_index(path)] == ["acme.com", "globex.com", "acme.com"]
+    pages = {entry["domain"]: (entry["url"], page) for entry, page in iter_pages(path)}
+    assert pages["acme.com"] == ("https://www.acme.com", b"<p>new</p>")
+    assert pages["globex.com"][1].encoding == "utf-8"
+
+    # A torn index line is dropped too
+    with open(index_path(path), "a") as file:
+        file.write("123\t4")
+    PageArchive(path).close()
+    assert len(read_index(path)) == 3
+
+
+@pytest.mark.asyncio
+@patch("scraper.run_scraper.try_fetch_with_fallback")
+async def test_process_domain_archives_fetched_page(mock_try_fetch, tmp_path):
+    archive = PageArchive(tmp_path / "pages.warc.gz")
+    mock_try_fetch.return_value = ("https://acme.com", _page(b"<p>Call (123) 456-7890</p>"), 200)
+    await process_domain(AsyncMock(), "acme.com", 5, archive=archive)
+    archive.close()
+
+    [(entry, page)] = list(iter_pages(tmp_path / "pages.warc.gz"))
+    assert (entry["index"], entry["domain"], entry["status"]) == (4, "acme.com", 200)
+    assert page == b"<p>Call (123) 456-7890</p>"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("workers", [0, 2])
+async def test_reextract_from_archive(tmp_path, workers):
+    path = tmp_path / "pages.warc.gz"
+    archive = PageArchive(path)
+    for i in range(10):
+        body = f"<p>Call (555) 201-{1000 + i}</p><a href='https://facebook.com/site{i}'>fb</a>".encode()
+        await archive.append(i, f"site{i}.com", f"https://site{i}.com", 200, _page(body))
+    archive.close()
+
+    output = tmp_path / "reextracted.csv"
+    stats = reextract(path, output, tmp_path / "store", workers=workers, chunk_records=3)
+    assert stats["pages"] == 10
+    with open(output, newline="") as file:
+        rows = list(csv.DictReader(file))
+    assert [row["domain"] for row in rows] == [f"https://site{i}.com" for i in range(10)]
+    assert rows[3]["phone_numbers"] == "(555) 201-1003"
+    assert rows[3]["social_links"] == "https://facebook.com/site3"
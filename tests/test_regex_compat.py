@@ -0,0 +1,81 @@
+import glob
+import json
+import os
+import re
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+import api.embedded
+import api.match_cache
+import indexing.normalize
+import scraper.crawler
+import scraper.render
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python 3.10
+    import sre_parse
+
+ROOT = Path(__file__).resolve().parent.parent
+MODULES = [scraper.crawler, scraper.render, api.embedded, api.match_cache, indexing.normalize]
+# Regex syntax added in Python 3.11
+NEWER_OPCODES = {"POSSESSIVE_REPEAT", "ATOMIC_GROUP"}
+
+
+def _module_patterns() -> list[tuple[str, str, int]]:
+    return [(f"{module.__name__}.{name}", value.pattern, value.flags)
+            for module in MODULES for name, value in vars(module).items() if isinstance(value, re.Pattern)]
+
+
+def _opcodes(parsed):
+    for op, av in parsed:
+        yield str(op)
+        for item in av if isinstance(av, (tuple, list)) else [av]:
+            if isinstance(item, sre_parse.SubPattern):
+                yield from _opcodes(item)
+            elif isinstance(item, (tuple, list)):
+                for nested in item:
+                    if isinstance(nested, sre_parse.SubPattern):
+                        yield from _opcodes(nested)
+
+
+def _venv_version() -> str | None:
+    cfg = ROOT / "venv" / "pyvenv.cfg"
+    if not cfg.exists():
+        return None
+    match = re.search(r"^version\s*=\s*(\d+\.\d+)", cfg.read_text(), re.MULTILINE)
+    return match.group(1) if match else None
+
+
+def _interpreter(version: str) -> str | None:
+    candidates = [shutil.which(f"python{version}")]
+    candidates += sorted(glob.glob(os.path.expanduser(f"~/.pyenv/versions/{version}.*/bin/python{version}")))
+    for candidate in filter(None, candidates):
+        probe = subprocess.run([candidate, "-c", "import sys; print('%d.%d' % sys.version_info[:2])"],
+                               capture_output=True, text=True)
+        if probe.returncode == 0 and probe.stdout.strip() == version:
+            return candidate
+    return None
+
+
+@pytest.mark.parametrize("name,pattern,flags", _module_patterns())
+def test_patterns_avoid_syntax_newer_than_python_3_10(name, pattern, flags):
+    assert not NEWER_OPCODES & set(_opcodes(sre_parse.parse(pattern, flags))), name
+
+
+def test_patterns_compile_under_the_venv_interpreter():
+    version = _venv_version()
+    interpreter = _interpreter(version) if version else None
+    if interpreter is None:
+        pytest.skip(f"no python{version} interpreter available")
+    # Bytes patterns travel as latin-1 text and are turned back into bytes on the other side
+    payload = [(name, pattern.decode("latin-1") if isinstance(pattern, bytes) else pattern,
+                isinstance(pattern, bytes), flags) for name, pattern, flags in _module_patterns()]
+    script = ("import json, re, sys\n"
+              "for name, pattern, is_bytes, flags in json.load(sys.stdin):\n"
+              "    re.compile(pattern.encode('latin-1') if is_bytes else pattern, flags)\n")
+    result = subprocess.run([interpreter, "-c", script], input=json.dumps(payload), capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
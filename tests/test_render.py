@@ -0,0 +1,159 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from scraper import render
+from scraper.http_cache import HttpCache
+from scraper.render import RenderPool, looks_like_js_shell, needs_render, _block_heavy_resources
+from scraper.run_scraper import process_domain
+
+WIX_SHELL = "<html><head><script>var wixBiSession = {};</script></head><body><div id='SITE'></div></body></html>"
+EMPTY_SPA = "<html><body><div id=\"root\"></div><script src='/app.js'></script></body></html>"
+STATIC = "<html><body>" + "<p>We fix pipes and drains across the county.</p>" * 20 + "</body></html>"
+RENDERED = "<html><body><p>Call (123) 456-7890</p><div class='address'>1 Main St, Springfield</div></body></html>"
+NOTHING = {"phone_numbers": [], "social_links": [], "address": None}
+
+
+def test_js_shell_detection():
+    assert looks_like_js_shell(WIX_SHELL)
+    assert looks_like_js_shell(EMPTY_SPA.encode())
+    assert not looks_like_js_shell(STATIC)
+
+
+def test_needs_render():
+    assert needs_render(STATIC, NOTHING)
+    # Only socials found: render just when the page is a shell
+    socials = {**NOTHING, "social_links": ["https://facebook.com/acme"]}
+    assert needs_render(WIX_SHELL, socials)
+    assert not needs_render(STATIC, socials)
+    assert not needs_render(WIX_SHELL, {**NOTHING, "phone_numbers": ["(123) 456-7890"]})
+
+
+class FakeRenderer:
+    def __init__(self, html):
+        self.html = html
+        self.urls = []
+        self.improved = []
+
+    async def render(self, url):
+        self.urls.append(url)
+        return self.html
+
+    def record(self, improved):
+        self.improved.append(improved)
+
+
+@pytest.mark.asyncio
+@patch("scraper.run_scraper.try_fetch_with_fallback")
+async def test_process_domain_escalates_empty_page(mock_try_fetch):
+    mock_try_fetch.return_value = ("https://acme.com", EMPTY_SPA, 200)
+    cache = HttpCache()
+    renderer = FakeRenderer(RENDERED)
+
+    row, _ = await process_domain(AsyncMock(), "acme.com", 1, cache=cache, renderer=renderer)
+    assert renderer.urls == ["https://acme.com"] and renderer.improved == [True]
+    assert row["phone_numbers"] == ["(123) 456-7890"]
+    assert row["address"] == "1 Main St, Springfield"
+
+    # The unchanged static body now maps to the rendered extraction: no second render
+    row, _ = await process_domain(AsyncMock(), "acme.com", 1, cache=cache, renderer=renderer)
+    assert len(renderer.urls) == 1
+    assert row["phone_numbers"] == ["(123) 456-7890"]
+
+
+@pytest.mark.asyncio
+@patch("scraper.run_scraper.try_fetch_with_fallback")
+async def test_process_domain_skips_render_when_static_has_contacts(mock_try_fetch):
+    mock_try_fetch.return_value = ("https://acme.com", RENDERED, 200)
+    renderer = FakeRenderer(RENDERED)
+    await process_domain(AsyncMock(), "acme.com", 1, renderer=renderer)
+    assert renderer.urls == []
+
+
+@pytest.mark.asyncio
+async def test_blocked_resource_types_are_aborted():
+    for kind, aborted in [("image", True), ("font", True), ("media", True), ("script", False), ("document", False)]:
+        route = MagicMock(abort=AsyncMock(), continue_=AsyncMock())
+        route.request.resource_type = kind
+        await _block_heavy_resources(route)
+        assert route.abort.called == aborted
+        assert route.continue_.called != aborted
+
+
+@pytest.mark.asyncio
+async def test_render_pool_bounds_and_recycles_contexts(monkeypatch):
+    monkeypatch.setattr(render, "PAGES_PER_CONTEXT", 2)
+    active = peak = 0
+
+    async def fake_render_page(context, url):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return f"<html>{url}</html>"
+
+    browser = MagicMock()
+    browser.new_context = AsyncMock(side_effect=lambda **kwargs: MagicMock(route=AsyncMock(), close=AsyncMock()))
+    browser.close = AsyncMock()
+    pool = RenderPool(contexts=2)
+    pool._browser = browser
+    for _ in range(pool.size):
+        pool._contexts.put_nowait(await pool._new_context())
+    pool._render_page = fake_render_page
+
+    pages = await asyncio.gather(*(pool.render(f"https://site{i}.com") for i in range(6)))
+    assert pages[0] == "<html>https://site0.com</html>"
+    assert peak == 2
+    assert pool.stats["rendered"] == 6
+    # Both initial contexts are replaced after their second page; the replacements serve one each
+    assert browser.new_context.call_count == 2 + 2
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_render_pool_times_out_and_unavailable():
+    pool = RenderPool(contexts=1, timeout=0.05)
+    assert await pool.render("https://acme.com") is None
+
+    async def hang(context, url):
+        await asyncio.sleep(10)
+
+    pool._browser = MagicMock(close=AsyncMock())
+    pool._pages_served[context := MagicMock(close=AsyncMock())] = 0
+    pool._contexts.put_nowait(context)
+    pool._render_page = hang
+    assert await pool.render("https://acme.com") is None
+    assert pool.stats["failed"] == 1
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_render_pool_keeps_slot_when_recycling_fails(monkeypatch):
+    monkeypatch.setattr(render, "PAGES_PER_CONTEXT", 1)
+    opened = 0
+
+    async def new_context(**kwargs):
+        nonlocal opened
+        opened += 1
+        # The replacement for the first context cannot be opened; the one after that can
+        if opened == 2:
+            raise RuntimeError("browser crashed")
+        return MagicMock(route=AsyncMock(), close=AsyncMock())
+
+    async def fake_render_page(context, url):
+        return f"<html>{url}</html>"
+
+    browser = MagicMock(new_context=new_context, close=AsyncMock())
+    pool = RenderPool(contexts=1)
+    pool._browser = browser
+    pool._contexts.put_nowait(await pool._new_context())
+    pool._render_page = fake_render_page
+
+    first = await pool.render("https://a.com")
+    second = await asyncio.wait_for(pool.render("https://b.com"), timeout=1)
+
+    assert first == "<html>https://a.com</html>"
+    assert second == "<html>https://b.com</html>"
+    assert pool._contexts.qsize() == 1
+    await pool.close()
@@ -0,0 +1,95 @@
+import pyarrow.parquet as pq
+
+from scraper.analyze_scrape import compute_metrics
+from scraper.scrape_store import ScrapeStore, read_scrape_store, scrape_store_rows
+
+
+def _fill(store: ScrapeStore):
+    store.append(0, "acme.com", "scraped", url="https://acme.com", http_status=200,
+                 phone_numbers=["(123) 456-7890"], social_links=[], address="1 Main St",
+                 fetch_seconds=0.2, total_seconds=0.3)
+    store.append(1, "globex.com", "scraped", url="https://globex.com", http_status=200,
+                 phone_numbers=[], social_links=["https://facebook.com/globex"], address="",
+                 fetch_seconds=0.4, total_seconds=0.5)
+    store.append(2, "gone.com", "unresolvable")
+    store.append(3, "broken.com", "failed", http_status=404, total_seconds=1.5)
+
+
+def test_store_roundtrip_in_row_groups(tmp_path):
+    store = ScrapeStore(tmp_path, row_group_rows=2)
+    _fill(store)
+    store.close()
+
+    # Each flush is a finished part of its own
+    parts = sorted(tmp_path.glob("part-*.parquet"))
+    assert [pq.read_metadata(part).num_rows for part in parts] == [2, 2]
+    assert scrape_store_rows(tmp_path) == 4
+    table = read_scrape_store(tmp_path, columns=["domain", "phone_numbers", "http_status"])
+    assert table.column_names == ["domain", "phone_numbers", "http_status"]
+    assert table.column("phone_numbers").to_pylist() == [["(123) 456-7890"], [], None, None]
+    assert table.column("http_status").to_pylist() == [200, 200, None, 404]
+
+
+def test_store_append_adds_part_and_crash_loses_only_the_buffer(tmp_path):
+    first = ScrapeStore(tmp_path)
+    _fill(first)
+    first.close()
+    # A crashed run never flushes its buffer, but leaves no torn part behind
+    crashed = ScrapeStore(tmp_path, append=True)
+    crashed.append(4, "late.com", "scraped")
+    second = ScrapeStore(tmp_path, append=True)
+    second.append(5, "later.com", "failed", http_status=500)
+    second.close()
+
+    assert read_scrape_store(tmp_path, columns=["index"]).column("index").to_pylist() == [0, 1, 2, 3, 5]
+    assert scrape_store_rows(tmp_path) == 5
+
+    ScrapeStore(tmp_path).close()
+    assert read_scrape_store(tmp_path).num_rows == 0
+
+
+def _write_csvs(tmp_path):
+    scraped_csv, failed_csv = tmp_path / "scraped.csv", tmp_path / "failed.csv"
+    scraped_csv.write_text("domain,phone_numbers,social_links,address\n"
+                           "https://acme.com,(123) 456-7890,,1 Main St\nhttps://globex.com,,https://facebook.com/globex,\n")
+    failed_csv.write_text("domain,http_status\ngone.com,\nbroken.com,404\n")
+    input_csv = tmp_path / "input.csv"
+    input_csv.write_text("domain\nacme.com\nglobex.com\ngone.com\nbroken.com\n")
+    return scraped_csv, failed_csv, input_csv
+
+
+def test_compute_metrics_from_store_and_csv(tmp_path):
+    store_dir = tmp_path / "scrape"
+    store = ScrapeStore(store_dir)
+    _fill(store)
+    store.close()
+    scraped_csv, failed_csv, input_csv = _write_csvs(tmp_path)
+
+    metrics = compute_metrics(store=store_dir, scraped_csv=scraped_csv, failed_csv=failed_csv, input_csv=input_csv)
+    assert (metrics["total_domains"], metrics["scraped"]) == (4, 2)
+    assert (metrics["phone_fill"], metrics["social_fill"], metrics["address_fill"]) == (1, 1, 1)
+    assert sorted(metrics["failures"], key=str) == [("failed", 404, 1), ("unresolvable", None, 1)]
+    assert metrics["total_seconds"]["max"] == 1.5
+
+    from_csv = compute_metrics(store=store_dir, scraped_csv=scraped_csv, failed_csv=failed_csv,
+                               input_csv=input_csv, use_store=False)
+    assert {key: from_csv[key] for key in ("scraped", "phone_fill", "social_fill", "address_fill", "finished")} == \
+        {"scraped": 2, "phone_fill": 1, "social_fill": 1, "address_fill": 1, "finished": 4}
+
+
+def test_compute_metrics_falls_back_to_csv_after_a_crash(tmp_path):
+    store_dir = tmp_path / "scrape"
+    scraped_csv, failed_csv, input_csv = _write_csvs(tmp_path)
+    # Killed before the store flushed its last rows: the CSVs hold all four, the store one
+    store = ScrapeStore(store_dir, row_group_rows=1)
+    store.append(0, "acme.com", "scraped", url="https://acme.com", total_seconds=0.3)
+
+    metrics = compute_metrics(store=store_dir, scraped_csv=scraped_csv, failed_csv=failed_csv, input_csv=input_csv)
+    assert (metrics["scraped"], metrics["finished"], metrics["total_seconds"]) == (2, 4, {})
+
+    # A part without a footer (an older writer's crash) also sends the analysis to the CSVs
+    (store_dir / "part-00099.parquet").write_bytes(b"PAR1 torn")
+    _fill(store)
+    store.close()
+    metrics = compute_metrics(store=store_dir, scraped_csv=scraped_csv, failed_csv=failed_csv, input_csv=input_csv)
+    assert (metrics["scraped"], metrics["total_seconds"]) == (2, {})
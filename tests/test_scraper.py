@@ -1,6 +1,10 @@
+import csv
 import pytest
 from unittest.mock import AsyncMock, patch
-from scraper.run_scraper import process_domain, failed_domains, run_scraper
+from scraper.run_scraper import process_domain, run_scraper, csv_row, make_controller, CONCURRENCY
+from scraper.adaptive import AdaptiveController
+from scraper.scrape_store import read_scrape_store
+from scraper.journal import CrawlJournal
 
 @pytest.mark.asyncio
 @patch("scraper.run_scraper.try_fetch_with_fallback")
@@ -9,43 +13,134 @@ async def test_process_domain_failure(mock_try_fetch):
 
     session = AsyncMock()
 
-    # Clear failed_domains before test
-    failed_domains.clear()
-
-    result = await process_domain(session, "nonexistent.com", 2)
+    result, failure = await process_domain(session, "nonexistent.com", 2)
 
     assert result is None
-    assert ("nonexistent.com", 404) in failed_domains
+    assert failure == ("nonexistent.com", 404)
+
+@pytest.fixture
+def scraper_paths(tmp_path, monkeypatch):
+    input_csv = tmp_path / "input.csv"
+    input_csv.write_text("domain\nexample.com\n\ntest.com\ngone.com\n")
+    paths = {
+        "INPUT_CSV": input_csv,
+        "OUTPUT_CSV": tmp_path / "scraped.csv",
+        "FAILED_CSV": tmp_path / "failed.csv",
+        "JOURNAL": tmp_path / "journal.log",
+        "VARIANTS_DB": tmp_path / "url_variants.sqlite",
+        "DNS_CACHE_DB": tmp_path / "dns_cache.sqlite",
+        "HTTP_CACHE_DB": tmp_path / "http_cache.sqlite",
+        "METRICS_FILE": tmp_path / "scrape_metrics.prom",
+        "SCRAPE_STORE": tmp_path / "scrape",
+    }
+    for name, path in paths.items():
+        monkeypatch.setattr(f"scraper.run_scraper.{name}", path)
+
+    async def fake_pre_resolve(domains, cache):
+        return [d for d in domains if d != "gone.com"], [d for d in domains if d == "gone.com"]
+    monkeypatch.setattr("scraper.run_scraper.pre_resolve", fake_pre_resolve)
+    return paths
+
+def _read(path):
+    with open(path, newline="") as file:
+        return list(csv.DictReader(file))
 
 @pytest.mark.asyncio
-@patch("scraper.run_scraper.pd.read_csv")
-@patch("scraper.run_scraper.pd.DataFrame.to_csv")
 @patch("scraper.run_scraper.process_domain")
 @patch("aiohttp.ClientSession")
-async def test_run_scraper(mock_session_class, mock_process_domain, mock_to_csv, mock_read_csv):
-    # Setup mock CSV reading to return a dataframe with domains
-    import pandas as pd
-    mock_read_csv.return_value = pd.DataFrame({"domain": ["example.com", "test.com"]})
-
+async def test_run_scraper(mock_session_class, mock_process_domain, scraper_paths):
     # Mock aiohttp.ClientSession context manager
     mock_session = AsyncMock()
     mock_session_class.return_value.__aenter__.return_value = mock_session
 
-    # Mock process_domain to return dummy data for both domains
-    mock_process_domain.side_effect = [
-        {"domain": "example.com", "phone_numbers": "123", "social_links": "fb", "address": "addr1"},
-        {"domain": "test.com", "phone_numbers": "456", "social_links": "tw", "address": "addr2"},
-    ]
+    # Mock process_domain to return dummy data for both resolvable domains
+    async def fake_process(session, domain, i, *args):
+        return {"domain": domain, "phone_numbers": "123", "social_links": "fb", "address": "addr"}, None
+    mock_process_domain.side_effect = fake_process
 
     # Run scraper
-    await run_scraper()
-
-    # Assert read_csv called once with input path
-    mock_read_csv.assert_called_once()
+    await run_scraper(extract_workers=0, in_flight=2)
 
-    # Assert process_domain called twice
+    # process_domain called for the two resolvable domains only
     assert mock_process_domain.call_count == 2
 
-    # Assert to_csv called at least once for output CSV
-    assert mock_to_csv.call_count >= 1
+    # Results and failures are written incrementally to their CSVs
+    assert sorted(row["domain"] for row in _read(scraper_paths["OUTPUT_CSV"])) == ["example.com", "test.com"]
+    assert _read(scraper_paths["FAILED_CSV"]) == [{"domain": "gone.com", "http_status": ""}]
+
+    # The columnar store has every finished domain, with real list columns
+    table = read_scrape_store(scraper_paths["SCRAPE_STORE"]).sort_by("index")
+    assert table.column("domain").to_pylist() == ["example.com", "test.com", "gone.com"]
+    assert table.column("result").to_pylist() == ["scraped", "scraped", "unresolvable"]
+    assert table.column("phone_numbers").to_pylist() == [["123"], ["123"], None]
+
+@pytest.mark.asyncio
+@patch("scraper.run_scraper.process_domain")
+@patch("aiohttp.ClientSession")
+async def test_run_scraper_resume_skips_finished_rows(mock_session_class, mock_process_domain, scraper_paths):
+    mock_session_class.return_value.__aenter__.return_value = AsyncMock()
+
+    async def fake_process(session, domain, i, *args):
+        return {"domain": domain, "phone_numbers": "", "social_links": "", "address": ""}, None
+    mock_process_domain.side_effect = fake_process
+
+    # Pretend a previous run finished the first row before dying
+    journal = CrawlJournal(scraper_paths["JOURNAL"])
+    journal.mark(0)
+    journal.close()
+    scraper_paths["OUTPUT_CSV"].write_text("domain,phone_numbers,social_links,address\nexample.com,,,\n")
+
+    await run_scraper(extract_workers=0, resume=True, in_flight=2)
+
+    assert [call.args[1] for call in mock_process_domain.call_args_list] == ["test.com"]
+    assert sorted(row["domain"] for row in _read(scraper_paths["OUTPUT_CSV"])) == ["example.com", "test.com"]
+
+@pytest.mark.asyncio
+async def test_make_controller_is_fixed_unless_adaptive(tmp_path):
+    from scraper.dns_cache import DnsCache
+    dns_cache = DnsCache(tmp_path / "dns.sqlite")
+    controller, connector = make_controller(False, dns_cache)
+    assert controller is None and connector.limit == CONCURRENCY
+    await connector.close()
+
+    controller, connector = make_controller(True, dns_cache)
+    assert isinstance(controller, AdaptiveController) and connector.limit == 0
+    await connector.close()
+
+def test_journal_replays_watermark_and_gaps(tmp_path):
+    path = tmp_path / "journal.log"
+    journal = CrawlJournal(path)
+    for index in [0, 1, 3]:
+        journal.mark(index)
+    journal.close()
+
+    resumed = CrawlJournal(path, resume=True)
+    assert resumed.watermark == 2
+    assert resumed.is_done(1) and resumed.is_done(3)
+    assert not resumed.is_done(2)
+
+    fresh = CrawlJournal(path)
+    assert not fresh.is_done(0)
+
+@pytest.mark.asyncio
+@patch("scraper.run_scraper.try_fetch_with_fallback")
+async def test_process_domain_reuses_cached_extraction(mock_try_fetch):
+    from scraper.http_cache import HttpCache
+    cache = HttpCache()
+    html = "<p>Call (123) 456-7890</p>"
+    mock_try_fetch.return_value = ("https://acme.com", html, 200)
+
+    first, _ = await process_domain(AsyncMock(), "acme.com", 1, cache=cache)
+    assert cache.stats["extracted"] == 1
+
+    # Same body again: the hash matches, so extraction is skipped
+    second, _ = await process_domain(AsyncMock(), "acme.com", 1, cache=cache)
+    assert cache.stats["unchanged"] == 1
 
+    # 304 from the server: the stored result is reused without a body
+    mock_try_fetch.return_value = ("https://acme.com", None, 304)
+    third, failure = await process_domain(AsyncMock(), "acme.com", 1, cache=cache)
+    assert cache.stats["not_modified"] == 1
+    assert failure is None
+    assert csv_row(first) == csv_row(second) == csv_row(third)
+    assert first["phone_numbers"] == ["(123) 456-7890"]
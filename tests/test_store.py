@@ -0,0 +1,114 @@
+import json
+from unittest.mock import MagicMock, patch
+
+from indexing.store import iter_actions, bulk_load
+
+
+def test_iter_actions_uses_domain_as_id(tmp_path):
+    path = tmp_path / "merged.json"
+    path.write_text("\n".join(json.dumps(d) for d in [
+        {"domain": "acme.com", "company_commercial_name": "Acme"},
+        {"domain": None, "company_commercial_name": "No domain"},
+    ]) + "\n")
+
+    actions = list(iter_actions(path, "companies"))
+
+    assert len(actions) == 1
+    assert actions[0]["_id"] == "acme.com"
+    assert actions[0]["_source"]["company_commercial_name"] == "Acme"
+    assert actions[0]["_source"]["domain_key"] == "acme.com"
+
+@patch("indexing.store.helpers.parallel_bulk")
+def test_bulk_load_toggles_refresh_and_replicas(mock_parallel_bulk):
+    es = MagicMock()
+    es.indices.get_settings.return_value = {"companies": {"settings": {"index": {"number_of_replicas": "1"}}}}
+    mock_parallel_bulk.return_value = iter([(True, {}), (True, {}), (False, {"index": {"error": "boom"}})])
+
+    indexed, failed = bulk_load(es, iter([]), "companies", chunk_size=500, threads=4)
+
+    assert (indexed, failed) == (2, 1)
+    first, restore = es.indices.put_settings.call_args_list
+    assert first.kwargs["settings"] == {"refresh_interval": "-1", "number_of_replicas": 0}
+    assert restore.kwargs["settings"] == {"refresh_interval": None, "number_of_replicas": "1"}
+    es.indices.refresh.assert_called_once_with(index="companies")
+
+def test_bump_generation_stamps_mapping_meta():
+    from indexing.mapping import bump_generation, generation_of
+    es = MagicMock()
+
+    generation = bump_generation(es, "companies")
+
+    es.indices.put_mapping.assert_called_once_with(index="companies", meta={"generation": generation})
+    assert generation_of({"companies": {"mappings": {"_meta": {"generation": generation}}}}) == generation
+    assert generation_of({"companies": {"mappings": {}}}) is None
+
+def test_iter_delta_actions_keeps_last_operation_per_domain(tmp_path):
+    from indexing.store import iter_delta_actions
+    delta = tmp_path / "delta.json"
+    delta.write_text("\n".join(json.dumps(c) for c in [
+        {"op": "upsert", "domain": "acme.com", "doc": {"domain": "acme.com", "phone_numbers": "1"}},
+        {"op": "upsert", "domain": "globex.com", "doc": {"domain": "globex.com"}},
+        {"op": "delete", "domain": "acme.com"},
+        {"op": "upsert", "domain": "globex.com", "doc": {"domain": "globex.com", "phone_numbers": "212 555 0100"}},
+    ]) + "\n")
+
+    actions = {a["_id"]: a for a in iter_delta_actions(delta, "companies")}
+
+    assert actions["acme.com"]["_op_type"] == "delete"
+    assert actions["globex.com"]["_source"]["phone_digits"] == ["2125550100"]
+
+@patch("indexing.store.helpers.streaming_bulk")
+def test_apply_delta_tolerates_missing_deletes(mock_streaming_bulk, tmp_path):
+    from indexing.store import apply_delta
+    delta = tmp_path / "delta.json"
+    delta.write_text('{"op": "delete", "domain": "gone.com"}\n')
+    mock_streaming_bulk.return_value = iter([
+        (False, {"delete": {"_id": "gone.com", "status": 404, "result": "not_found"}}),
+        (False, {"index": {"_id": "x.com", "status": 400, "error": "mapper_parsing_exception"}}),
+    ])
+    es = MagicMock()
+
+    assert apply_delta(es, delta, "companies") == (1, 1)
+    es.indices.refresh.assert_called_once_with(index="companies")
+
+def test_swap_alias_moves_alias_atomically():
+    from indexing.store import swap_alias
+    es = MagicMock()
+    es.indices.exists_alias.return_value = True
+    es.indices.get_alias.return_value = {"companies-1": {}, "companies-2": {}}
+
+    previous = swap_alias(es, "companies", "companies-3")
+
+    assert previous == ["companies-1", "companies-2"]
+    es.indices.update_aliases.assert_called_once_with(actions=[
+        {"remove": {"index": "companies-1", "alias": "companies"}},
+        {"remove": {"index": "companies-2", "alias": "companies"}},
+        {"add": {"index": "companies-3", "alias": "companies"}},
+    ])
+
+def test_swap_alias_replaces_legacy_concrete_index():
+    from indexing.store import swap_alias
+    es = MagicMock()
+    es.indices.exists_alias.return_value = False
+    es.indices.exists.return_value = True
+
+    assert swap_alias(es, "companies", "companies-3") == []
+    es.indices.update_aliases.assert_called_once_with(actions=[
+        {"remove_index": {"index": "companies"}},
+        {"add": {"index": "companies-3", "alias": "companies"}},
+    ])
+
+@patch("indexing.store.bulk_load", return_value=(10, 0))
+def test_full_rebuild_loads_new_index_then_swaps(mock_bulk_load, tmp_path):
+    from indexing.store import full_rebuild
+    es = MagicMock()
+    es.indices.exists_alias.return_value = True
+    es.indices.get_alias.return_value = {"companies-old": {}}
+
+    new_index, indexed, failed = full_rebuild(es, tmp_path / "merged.json", "companies")
+
+    assert new_index.startswith("companies-") and (indexed, failed) == (10, 0)
+    es.indices.create.assert_called_once_with(index=new_index)
+    assert mock_bulk_load.call_args.args[2] == new_index
+    es.indices.put_mapping.assert_called_once()
+    es.indices.delete.assert_called_once_with(index="companies-old")
@@ -0,0 +1,42 @@
+import aiohttp
+import pytest
+
+from benchmarks.scraper_bench import compare
+from benchmarks.web_farm import FarmResolver, WebFarm, farm_plan
+
+
+def test_farm_plan_is_deterministic():
+    assert farm_plan(200, seed=3) == farm_plan(200, seed=3)
+    assert farm_plan(200, seed=3) != farm_plan(200, seed=4)
+    assert set(farm_plan(50, mix={})) == {f"site{i:05d}.bench.test" for i in range(50)}
+    assert set(farm_plan(50, mix={}).values()) == {"ok"}
+
+
+@pytest.mark.asyncio
+async def test_farm_serves_virtual_hosts_with_faults():
+    plan = {"good.bench.test": "ok", "gone.bench.test": "not_found", "moved.bench.test": "redirect",
+            "nodns.bench.test": "nxdomain"}
+    farm = WebFarm(plan, latency_ms=1)
+    await farm.start()
+    connector = aiohttp.TCPConnector(resolver=FarmResolver(plan, farm.http_port, farm.https_port))
+    try:
+        async with aiohttp.ClientSession(connector=connector) as session:
+            async with session.get("https://www.good.bench.test", ssl=False) as response:
+                assert response.status == 200
+                assert "(555) 201-" in await response.text()
+            async with session.get("http://gone.bench.test") as response:
+                assert response.status == 404
+            async with session.get("http://moved.bench.test") as response:
+                assert response.status == 200
+                assert response.url.path == "/home"
+            with pytest.raises(aiohttp.ClientConnectorError):
+                await session.get("http://nodns.bench.test")
+    finally:
+        await farm.stop()
+
+
+def test_compare_flags_regressions_only_beyond_tolerance(capsys):
+    baseline = {"scrape": {"domains_per_sec": 100.0, "latency_p99_s": 1.0}, "extract": {"pages_per_sec": 50.0}}
+    current = {"scrape": {"domains_per_sec": 80.0, "latency_p99_s": 1.05}, "extract": {"pages_per_sec": 60.0}}
+
+    assert compare(current, baseline, tolerance=0.1) == ["scrape.domains_per_sec"]
@@ -0,0 +1,172 @@
+import asyncio
+import csv
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from scraper.work_queue import WorkQueue, MAX_ATTEMPTS
+
+
+def test_enqueue_is_idempotent(tmp_path):
+    queue = WorkQueue(tmp_path / "queue.sqlite")
+    assert queue.enqueue([(0, "a.com"), (1, ""), (2, "b.com")]) == 2
+    assert queue.enqueue([(0, "a.com"), (2, "b.com")]) == 0
+    assert queue.counts() == {"pending": 2}
+
+def test_lease_hands_out_disjoint_batches(tmp_path):
+    path = tmp_path / "queue.sqlite"
+    WorkQueue(path).enqueue([(i, f"d{i}.com") for i in range(5)])
+
+    first = WorkQueue(path).lease("w1", 3)
+    second = WorkQueue(path).lease("w2", 3)
+
+    assert [i for i, _ in first] == [0, 1, 2]
+    assert [i for i, _ in second] == [3, 4]
+
+def test_expired_lease_is_reclaimed_and_stale_owner_ignored(tmp_path):
+    queue = WorkQueue(tmp_path / "queue.sqlite")
+    queue.enqueue([(0, "a.com")])
+
+    assert queue.lease("dead-worker", 10, lease_seconds=-1) == [(0, "a.com")]
+    assert queue.lease("w2", 10) == [(0, "a.com")]
+
+    # The first worker's late report must not overwrite the new lease holder
+    queue.fail("dead-worker", 0, "a.com", 500)
+    queue.complete("w2", 0, {"domain": "https://a.com", "phone_numbers": "", "social_links": "", "address": ""})
+    assert queue.counts() == {"done": 1}
+    assert queue.outstanding() == 0
+
+def test_poison_domain_is_given_up(tmp_path):
+    queue = WorkQueue(tmp_path / "queue.sqlite")
+    queue.enqueue([(0, "poison.com")])
+    for _ in range(MAX_ATTEMPTS):
+        queue.lease("w", 10, lease_seconds=-1)
+
+    assert queue.lease("w", 10) == []
+    assert queue.counts() == {"failed": 1}
+
+def test_export_writes_scraper_csvs(tmp_path):
+    queue = WorkQueue(tmp_path / "queue.sqlite")
+    queue.enqueue([(0, "a.com"), (1, "b.com")])
+    queue.lease("w", 10)
+    queue.complete("w", 0, {"domain": "https://a.com", "phone_numbers": "1", "social_links": "", "address": ""})
+    queue.fail("w", 1, "b.com", 404)
+
+    scraped, failed = queue.export(tmp_path / "out.csv", tmp_path / "failed.csv")
+
+    assert (scraped, failed) == (1, 1)
+    with open(tmp_path / "failed.csv", newline="") as file:
+        assert list(csv.DictReader(file)) == [{"domain": "b.com", "http_status": "404"}]
+
+def test_coordinator_store_export_replaces_stale_parts(tmp_path):
+    from scraper.distributed import export_store
+    from scraper.scrape_store import ScrapeStore, read_scrape_store
+    store_dir = tmp_path / "scrape"
+    stale = ScrapeStore(store_dir)
+    stale.append(0, "old.com", "scraped")
+    stale.close()
+
+    queue = WorkQueue(tmp_path / "queue.sqlite")
+    queue.enqueue([(0, "a.com"), (1, "b.com"), (2, "c.com")])
+    queue.lease("w", 10)
+    queue.complete("w", 0, {"domain": "https://a.com", "phone_numbers": "1; 2", "social_links": "", "address": ""})
+    queue.fail("w", 1, "b.com", 404)
+
+    assert export_store(queue, store_dir) == 2
+    rows = read_scrape_store(store_dir).to_pylist()
+    assert [(row["domain"], row["result"]) for row in rows] == [("a.com", "scraped"), ("b.com", "failed")]
+    assert rows[0]["phone_numbers"] == ["1", "2"] and rows[1]["http_status"] == 404
+
+def test_coordinator_backs_off_and_gives_up_on_a_crashing_worker(tmp_path, monkeypatch):
+    from scraper import distributed
+    input_csv = tmp_path / "input.csv"
+    input_csv.write_text("domain\na.com\n")
+    for name, path in [("INPUT_CSV", input_csv), ("OUTPUT_CSV", tmp_path / "out.csv"),
+                       ("FAILED_CSV", tmp_path / "failed.csv"), ("SCRAPE_STORE", tmp_path / "scrape")]:
+        monkeypatch.setattr(distributed.scraper, name, path)
+    clock = [0.0]
+    monkeypatch.setattr(distributed.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(distributed.time, "sleep", lambda seconds: clock.__setitem__(0, clock[0] + 1))
+
+    class CrashingProcess:
+        started = []
+
+        def __init__(self, *args, **kwargs):
+            self.started.append(clock[0])
+            self.returncode = 1
+
+        def poll(self):
+            return self.returncode
+
+        def wait(self):
+            return self.returncode
+
+    monkeypatch.setattr(distributed.subprocess, "Popen", CrashingProcess)
+    distributed.run_coordinator(tmp_path / "queue.sqlite", workers=1)
+
+    # One start plus WORKER_MAX_RESTARTS restarts, each waiting twice as long as the one before
+    assert len(CrashingProcess.started) == 1 + distributed.WORKER_MAX_RESTARTS
+    gaps = [later - earlier for earlier, later in zip(CrashingProcess.started, CrashingProcess.started[1:])]
+    assert gaps == sorted(gaps) and gaps[-1] >= distributed.RESTART_BACKOFF_BASE * 2 ** (len(gaps) - 1)
+    assert WorkQueue(tmp_path / "queue.sqlite").outstanding() == 1
+
+@pytest.mark.asyncio
+@patch("scraper.run_scraper.process_domain")
+@patch("aiohttp.ClientSession")
+async def test_run_worker_drains_queue(mock_session_class, mock_process_domain, tmp_path, monkeypatch):
+    from scraper.distributed import run_worker
+    for name in ["VARIANTS_DB", "DNS_CACHE_DB", "HTTP_CACHE_DB"]:
+        monkeypatch.setattr(f"scraper.run_scraper.{name}", tmp_path / f"{name}.sqlite")
+
+    async def fake_pre_resolve(domains, cache):
+        return [d for d in domains if d != "gone.com"], [d for d in domains if d == "gone.com"]
+    monkeypatch.setattr("scraper.distributed.pre_resolve", fake_pre_resolve)
+    mock_session_class.return_value.__aenter__.return_value = AsyncMock()
+
+    async def fake_process(session, domain, i, *args):
+        return {"domain": domain, "phone_numbers": "", "social_links": "", "address": ""}, None
+    mock_process_domain.side_effect = fake_process
+
+    path = tmp_path / "queue.sqlite"
+    WorkQueue(path).enqueue([(0, "a.com"), (1, "gone.com"), (2, "b.com")])
+
+    await run_worker(path, batch_size=2, extract_workers=0, owner="w1")
+
+    assert WorkQueue(path).counts() == {"done": 2, "failed": 1}
+
+@pytest.mark.asyncio
+@patch("scraper.run_scraper.process_domain")
+@patch("aiohttp.ClientSession")
+async def test_run_worker_keeps_leasing_while_a_domain_is_slow(mock_session_class, mock_process_domain, tmp_path,
+                                                               monkeypatch):
+    from scraper.distributed import run_worker
+    for name in ["VARIANTS_DB", "DNS_CACHE_DB", "HTTP_CACHE_DB"]:
+        monkeypatch.setattr(f"scraper.run_scraper.{name}", tmp_path / f"{name}.sqlite")
+
+    async def fake_pre_resolve(domains, cache):
+        return list(domains), []
+    monkeypatch.setattr("scraper.distributed.pre_resolve", fake_pre_resolve)
+    mock_session_class.return_value.__aenter__.return_value = AsyncMock()
+
+    path = tmp_path / "queue.sqlite"
+    domains = [(0, "slow.com")] + [(i, f"fast{i}.com") for i in range(1, 8)]
+    WorkQueue(path).enqueue(domains)
+    finished_while_slow = []
+    slow_started = asyncio.Event()
+
+    async def fake_process(session, domain, i, *args):
+        if domain == "slow.com":
+            slow_started.set()
+            # Still running when every other domain is done: only possible if slots are refilled
+            while len(finished_while_slow) < len(domains) - 1:
+                await asyncio.sleep(0.01)
+        else:
+            await slow_started.wait()
+            finished_while_slow.append(domain)
+        return {"domain": domain, "phone_numbers": "", "social_links": "", "address": ""}, None
+    mock_process_domain.side_effect = fake_process
+
+    await asyncio.wait_for(run_worker(path, batch_size=3, in_flight=3, extract_workers=0, owner="w1"), timeout=10)
+
+    assert WorkQueue(path).counts() == {"done": len(domains)}
+    # Never more leased than there are slots
+    assert mock_process_domain.call_count == len(domains)